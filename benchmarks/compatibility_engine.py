@@ -0,0 +1,88 @@
+"""Pairwise vs vectorized compatibility scoring of one user against many candidates.
+
+Checks that services.compatibility_engine.CompatibilityEngine agrees with the
+scalar CompatibilityService._calculate_*_compatibility rules, then times both.
+
+    python benchmarks/compatibility_engine.py [--candidates 5000] [--seed 7]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.compatibility_engine import CompatibilityEngine
+from services.compatibility_service import CompatibilityService
+
+INTERESTS = ["Music", "Travel", "Cooking", "Fitness", "Reading", "Movies", "Gaming",
+             "Art", "Dancing", "Photography", "Hiking", "Yoga", "Cricket", "Fashion"]
+HABITS = [None, "Never", "Socially", "Regularly"]
+DIETS = [None, "Vegetarian", "Non-Vegetarian", "Vegan", "Eggetarian"]
+RELIGIONS = [None, "Hindu", "Muslim", "Christian", "Sikh", "Other"]
+ACTIVITY = [None, "Low", "Medium", "High"]
+
+
+def random_user(rng: random.Random, user_id: int) -> dict:
+    user = {
+        "id": user_id,
+        "interests": json.dumps(rng.sample(INTERESTS, rng.randint(0, 6))),
+        "smoking": rng.choice(HABITS),
+        "drinking": rng.choice(HABITS),
+        "diet_preference": rng.choice(DIETS),
+        "religion": rng.choice(RELIGIONS),
+    }
+    activity = rng.choice(ACTIVITY)
+    if activity:
+        user["activity_level"] = activity
+    return user
+
+
+def pairwise(user: dict, candidates: list) -> np.ndarray:
+    scores = []
+    for candidate in candidates:
+        interest = CompatibilityService._calculate_interest_compatibility(user, candidate)
+        lifestyle = CompatibilityService._calculate_lifestyle_compatibility(user, candidate)
+        activity = CompatibilityService._calculate_activity_compatibility(user, candidate)
+        scores.append(interest * 0.4 + lifestyle * 0.4 + activity * 0.2)
+    return np.array(scores)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    users = [random_user(rng, i) for i in range(args.users)]
+    candidates = [random_user(rng, 1000 + i) for i in range(args.candidates)]
+
+    # Sanity check: identical scores for every viewer
+    for user in users:
+        expected = pairwise(user, candidates)
+        actual = CompatibilityEngine.score_batch(user, candidates)["overall"]
+        assert np.allclose(expected, actual), f"mismatch for user {user['id']}"
+
+    start = time.perf_counter()
+    for user in users:
+        pairwise(user, candidates)
+    scalar = (time.perf_counter() - start) / args.users
+
+    start = time.perf_counter()
+    for user in users:
+        CompatibilityEngine.score_batch(user, candidates)
+    vectorized = (time.perf_counter() - start) / args.users
+
+    print(f"{args.candidates} candidates per viewer")
+    print(f"pairwise   {scalar * 1000:8.2f}ms ({args.candidates / scalar:10.0f} pairs/s)")
+    print(f"vectorized {vectorized * 1000:8.2f}ms ({args.candidates / vectorized:10.0f} pairs/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Measure event-loop lag while slow SQLite queries are running.
+
+Compares the old behaviour (sqlite3 called directly on the event loop) with
+config.database.Database, which runs queries on its own thread.
+
+    python benchmarks/event_loop_lag.py [--rows 200000] [--queries 20]
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import Database
+
+TICK = 0.005  # heartbeat interval, like a WebSocket ping handler
+SLOW_QUERY = "SELECT COUNT(*) FROM users a JOIN users b ON a.age = b.age WHERE a.id < 2000"
+
+
+def build_db(path: str, rows: int):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, age INTEGER)")
+    conn.executemany(
+        "INSERT INTO users (name, age) VALUES (?, ?)",
+        ((f"user{i}", 18 + i % 40) for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+async def heartbeat(lags: list, stop: asyncio.Event):
+    """Record how late each tick fires compared to when it was scheduled"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append((time.perf_counter() - start - TICK) * 1000)
+
+
+async def run_inline(path: str, queries: int) -> list:
+    conn = sqlite3.connect(path)
+    lags, stop = [], asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    for _ in range(queries):
+        conn.execute(SLOW_QUERY).fetchone()
+        await asyncio.sleep(0)
+    stop.set()
+    await beat
+    conn.close()
+    return lags
+
+
+async def run_threaded(path: str, queries: int) -> list:
+    database = Database()
+    database.db_path = path
+    await database.connect()
+    lags, stop = [], asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    for _ in range(queries):
+        await database.fetchone(SLOW_QUERY)
+    stop.set()
+    await beat
+    await database.close()
+    return lags
+
+
+def report(label: str, lags: list):
+    lags = sorted(lags) or [0.0]
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+    print(f"{label:<10} ticks={len(lags):<6} p50={statistics.median(lags):8.2f}ms "
+          f"p99={p99:8.2f}ms max={lags[-1]:8.2f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        build_db(path, args.rows)
+        print(f"{args.queries} slow queries over {args.rows} rows, heartbeat every {TICK * 1000:.0f}ms")
+        report("inline", await run_inline(path, args.queries))
+        report("threaded", await run_threaded(path, args.queries))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""Radius and k-nearest query latency of services.geo_index.GeoIndex.
+
+Compares the grid index with a full haversine scan over the same points.
+
+    python benchmarks/geo_index.py [--users 100000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.geo_index import GeoIndex, haversine_km
+
+# Roughly India, where most users are
+LAT_RANGE = (8.0, 32.0)
+LON_RANGE = (68.0, 92.0)
+
+
+def timed(fn, queries):
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(*q)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    points = {
+        user_id: (rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE))
+        for user_id in range(1, args.users + 1)
+    }
+
+    index = GeoIndex()
+    start = time.perf_counter()
+    for user_id, (lat, lon) in points.items():
+        index.update(user_id, lat, lon)
+    print(f"indexed {len(index)} users in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    queries = [(rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for _ in range(args.queries)]
+
+    def scan(lat, lon, radius_km):
+        hits = [(uid, d) for uid, (plat, plon) in points.items()
+                if (d := haversine_km(lat, lon, plat, plon)) <= radius_km]
+        return sorted(hits, key=lambda h: h[1])
+
+    # Sanity check: the index returns exactly what a full scan does
+    lat, lon = queries[0]
+    assert [h[0] for h in index.within(lat, lon, 50)] == [h[0] for h in scan(lat, lon, 50)]
+
+    for radius in (5, 25, 100):
+        p50, p99 = timed(lambda a, b: index.within(a, b, radius), queries)
+        print(f"within {radius:>3}km   index p50={p50:7.3f}ms p99={p99:7.3f}ms")
+    for k in (20, 100):
+        p50, p99 = timed(lambda a, b: index.nearest(a, b, k), queries)
+        print(f"nearest k={k:<4} index p50={p50:7.3f}ms p99={p99:7.3f}ms")
+
+    p50, p99 = timed(lambda a, b: scan(a, b, 25), queries[:max(5, args.queries // 20)])
+    print(f"within  25km   scan  p50={p50:7.3f}ms p99={p99:7.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
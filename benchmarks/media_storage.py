@@ -0,0 +1,66 @@
+"""Put/stat/get throughput of the media storage backends.
+
+Only the local backend runs offline; pass --backend telegram with a real
+TELEGRAM_BOT_TOKEN (and a migrated DB) to measure the Bot API instead.
+
+    python benchmarks/media_storage.py [--objects 500] [--size 60000] [--backend local]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.media_storage import LocalMediaStorage, create_storage
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--objects", type=int, default=500)
+    parser.add_argument("--size", type=int, default=60000)  # about a card-size WebP
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--backend", default="local")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = LocalMediaStorage(tmp) if args.backend == "local" else create_storage(args.backend)
+        blobs = [b"RIFF\0\0\0\0WEBP" + os.urandom(args.size) for _ in range(args.objects)]
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def bounded(coro):
+            async with semaphore:
+                return await coro
+
+        start = time.perf_counter()
+        keys = await asyncio.gather(*(bounded(storage.put(blob)) for blob in blobs))
+        put = time.perf_counter() - start
+
+        # Same bytes again: content addressing makes these no-ops
+        start = time.perf_counter()
+        again = await asyncio.gather(*(bounded(storage.put(blob)) for blob in blobs))
+        reput = time.perf_counter() - start
+        assert again == keys
+
+        start = time.perf_counter()
+        stats = await asyncio.gather(*(bounded(storage.stat(key)) for key in keys))
+        stat = time.perf_counter() - start
+        assert all(s.content_type == "image/webp" for s in stats)
+
+        start = time.perf_counter()
+        data = await asyncio.gather(*(bounded(storage.get(key)) for key in keys))
+        get = time.perf_counter() - start
+        assert data == blobs
+
+        megabytes = args.objects * args.size / (1024 * 1024)
+        print(f"{storage.name}: {args.objects} objects x {args.size} bytes")
+        print(f"put     {args.objects / put:9.0f} obj/s {megabytes / put:8.1f} MB/s")
+        print(f"re-put  {args.objects / reput:9.0f} obj/s (deduplicated)")
+        print(f"stat    {args.objects / stat:9.0f} obj/s")
+        print(f"get     {args.objects / get:9.0f} obj/s {megabytes / get:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""Login throughput and event-loop lag with bcrypt inline vs on the hasher pool.
+
+A burst of concurrent password checks is run twice: with passlib called
+directly on the event loop (the old verify_password) and through
+services.password_hasher. A heartbeat task records how late it wakes up,
+like a WebSocket ping would.
+
+    python benchmarks/password_hashing.py [--logins 40] [--rounds 12] [--workers 2]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.password_hasher import PasswordHasher
+
+TICK = 0.005
+
+
+async def heartbeat(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append((time.perf_counter() - start - TICK) * 1000)
+
+
+async def burst(check, logins: int) -> tuple:
+    lags, stop = [], asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(TICK * 2)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(check() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    assert all(results)
+    return elapsed, lags
+
+
+def report(label: str, logins: int, elapsed: float, lags: list):
+    lags = sorted(lags) or [0.0]
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+    print(f"{label:<8} {logins / elapsed:7.1f} logins/s  heartbeat p50={statistics.median(lags):8.2f}ms "
+          f"p99={p99:8.2f}ms max={lags[-1]:8.2f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    hasher = PasswordHasher(rounds=args.rounds, workers=args.workers, queue=args.logins)
+    stored = hasher.context.hash("correct horse battery staple")
+    print(f"{args.logins} concurrent logins, bcrypt cost {args.rounds}, {args.workers} workers")
+
+    async def inline():
+        return hasher.context.verify("correct horse battery staple", stored)
+
+    async def pooled():
+        return await hasher.verify("correct horse battery staple", stored)
+
+    report("inline", args.logins, *await burst(inline, args.logins))
+    report("pooled", args.logins, *await burst(pooled, args.logins))
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""Concurrent read throughput for different DB_READ_POOL_SIZE values.
+
+    python benchmarks/read_pool.py [--rows 200000] [--queries 64] [--sizes 0,1,4]
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import Database
+
+QUERY = "SELECT COUNT(*), AVG(age) FROM users WHERE name LIKE ?"
+
+
+def build_db(path: str, rows: int):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, age INTEGER)")
+    conn.executemany(
+        "INSERT INTO users (name, age) VALUES (?, ?)",
+        ((f"user{i}", 18 + i % 40) for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+async def run(path: str, pool_size: int, queries: int) -> float:
+    database = Database()
+    database.db_path = path
+    database.read_pool_size = pool_size
+    await database.connect()
+    start = time.perf_counter()
+    await asyncio.gather(*(database.fetchone(QUERY, (f"%{i % 10}%",)) for i in range(queries)))
+    elapsed = time.perf_counter() - start
+    await database.close()
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--sizes", default="0,1,4")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        build_db(path, args.rows)
+        for size in (int(s) for s in args.sizes.split(",")):
+            elapsed = await run(path, size, args.queries)
+            print(f"readers={size:<3} {args.queries} queries in {elapsed:6.2f}s "
+                  f"({args.queries / elapsed:7.1f} q/s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""Anti-scam scan throughput: the old per-rule loop against the compiled matcher.
+
+The legacy loop ran one re.search per phone pattern and one substring test
+per keyword; the matcher makes one Aho-Corasick pass plus its phone
+patterns, which only run when the text has a digit. Before timing, both
+are scored on SAMPLES and every generated message and must agree.
+
+    python benchmarks/scam_matcher.py [--messages 100000] [--flagged-every 50]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import settings
+from services.scam_matcher import scam_matcher
+
+WORDS = (
+    "hey how are you doing today i was thinking we could grab coffee sometime this "
+    "weekend what do you like to do for fun haha that sounds great love your photos"
+).split()
+FLAGGED = [" call me 9876543210", " add me on insta", " send money via bitcoin", " my number is +91 9876543210"]
+# Texts whose old scores must be kept: one phone number matches several patterns
+SAMPLES = [
+    "1234567890",
+    "+91 9876543210",
+    "my phone number is 1234567890 call me later",
+    "123-456-7890 or whatsapp me",
+    "send money via bitcoin, urgent",
+]
+
+
+def legacy_rules():
+    """The rules as the old code held them: (pattern, score) and (keyword, score) lists"""
+    patterns, keywords = [], []
+    with open(settings.ANTI_SCAM_RULES_PATH) as rules:
+        for rule in json.load(rules)["categories"].values():
+            patterns.extend((pattern, rule["score"]) for pattern in rule.get("patterns", {}).values())
+            keywords.extend((keyword.lower(), rule["score"]) for keyword in rule.get("keywords", []))
+    return patterns, keywords
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--flagged-every", type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(1)
+    messages = [
+        " ".join(random.choices(WORDS, k=random.randint(3, 25)))
+        + (random.choice(FLAGGED) if i % args.flagged_every == 0 else "")
+        for i in range(args.messages)
+    ]
+    patterns, keywords = legacy_rules()
+
+    def legacy(text):
+        lowered = text.lower()
+        hits = [(pattern, score) for pattern, score in patterns if re.search(pattern, text)]
+        return hits + [(keyword, score) for keyword, score in keywords if keyword in lowered]
+
+    # The old analyzer added a rule's score once for every rule that matched
+    for text in SAMPLES + messages:
+        old = sum(score for _, score in legacy(text))
+        new, _ = scam_matcher.score(scam_matcher.scan(text))
+        if old != new:
+            sys.exit(f"score mismatch for {text!r}: legacy {old}, matcher {new}")
+    print(f"scores match on {len(SAMPLES)} samples and {len(messages)} messages")
+
+    start = time.perf_counter()
+    legacy_flagged = sum(1 for text in messages if legacy(text))
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher_flagged = sum(1 for text in messages if scam_matcher.scan(text))
+    matcher_time = time.perf_counter() - start
+
+    print(f"{args.messages} messages, {len(keywords)} keywords, {len(patterns)} phone patterns")
+    for name, elapsed, flagged in (
+        ("legacy loop", legacy_time, legacy_flagged),
+        ("matcher", matcher_time, matcher_flagged),
+    ):
+        print(f"{name:12} {args.messages / elapsed:9.0f} msg/s {elapsed / args.messages * 1e6:6.2f} us/msg  flagged={flagged}")
+
+
+if __name__ == "__main__":
+    main()
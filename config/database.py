@@ -1,336 +1,210 @@
 import sqlite3
 import asyncio
+import contextlib
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 import os
 from .settings import settings
 
+# Per-task state: inside db.transaction() statements join the open
+# transaction and reads go through the writer to see its own rows
+_in_transaction = contextvars.ContextVar("heartlink_db_in_transaction", default=False)
+
 class Database:
+    """SQLite access: one writer connection and a pool of WAL readers.
+
+    The writer runs in autocommit mode, so a statement outside
+    db.transaction() commits on its own and no request can leave writes
+    pending for another one to commit. Writes that must land together go
+    in one db.transaction() block; commit() and rollback() only remain for
+    callers that still call them after a single statement.
+    """
+
     def __init__(self):
-        self.db_path = "heartlink.db"
-        self.conn = None
+        self.db_path = settings.DB_PATH
+        self.read_pool_size = settings.DB_READ_POOL_SIZE
+        self.conn = None  # single writer connection
+        # Every sqlite3 call runs off the event loop. Writes are serialized on
+        # one thread (its work queue is the writer queue); reads are spread
+        # over a pool of read-only WAL connections.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="heartlink-db-writer")
+        self._read_executor: Optional[ThreadPoolExecutor] = None
+        self._readers: Optional[asyncio.Queue] = None
+        self._write_lock = asyncio.Lock()
+    
+    async def _run(self, func, *args):
+        """Run a blocking sqlite3 call on the writer thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+    
+    def _apply_pragmas(self, conn):
+        conn.execute(f"PRAGMA synchronous = {settings.DB_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA mmap_size = {int(settings.DB_MMAP_SIZE)}")
+        conn.execute(f"PRAGMA cache_size = {int(settings.DB_CACHE_SIZE)}")
+    
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA journal_mode = {settings.DB_JOURNAL_MODE}")
+        self._apply_pragmas(conn)
+        return conn
+    
+    def _open_reader(self):
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        self._apply_pragmas(conn)
+        return conn
+    
+    def _fetch(self, conn, query: str, params: tuple, many: bool):
+        cursor = conn.execute(query, params)
+        try:
+            return cursor.fetchall() if many else cursor.fetchone()
+        finally:
+            # Reset the statement so a half-read INSERT ... RETURNING
+            # does not block the following COMMIT
+            cursor.close()
     
     async def connect(self):
         """Connect to SQLite database"""
         try:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
-            print("✅ Connected to SQLite database")
+            self.conn = await self._run(self._open)
+            if self.read_pool_size > 0:
+                self._read_executor = ThreadPoolExecutor(
+                    max_workers=self.read_pool_size, thread_name_prefix="heartlink-db-reader"
+                )
+                self._readers = asyncio.Queue()
+                loop = asyncio.get_running_loop()
+                for _ in range(self.read_pool_size):
+                    reader = await loop.run_in_executor(self._read_executor, self._open_reader)
+                    self._readers.put_nowait(reader)
+            print(f"✅ Connected to SQLite database ({self.read_pool_size} readers)")
             return self.conn
         except Exception as e:
             print(f"❌ Database connection error: {e}")
             raise
     
+    async def close(self):
+        """Close all connections and stop the database threads"""
+        if self._readers is not None:
+            while not self._readers.empty():
+                self._readers.get_nowait().close()
+            self._readers = None
+            self._read_executor.shutdown(wait=True)
+        if self.conn:
+            await self._run(self.conn.close)
+            self.conn = None
+        self._executor.shutdown(wait=True)
+    
+    async def _write(self, func, *args):
+        """Run on the writer, waiting for any open transaction() block to finish first"""
+        if _in_transaction.get():
+            return await self._run(func, *args)
+        async with self._write_lock:
+            return await self._run(func, *args)
+    
     async def execute(self, query: str, params: tuple = ()):
         """Execute SQL query"""
         if not self.conn:
             await self.connect()
         
         try:
-            cursor = self.conn.execute(query, params)
-            return cursor
+            return await self._write(self.conn.execute, query, params)
+        except Exception as e:
+            print(f"❌ Query execution error: {e}")
+            raise
+    
+    async def executemany(self, query: str, seq_of_params):
+        """Execute SQL query once per parameter tuple, all in one transaction"""
+        if not self.conn:
+            await self.connect()
+        
+        try:
+            async with self.transaction():
+                return await self._run(self.conn.executemany, query, list(seq_of_params))
+        except Exception as e:
+            print(f"❌ Query execution error: {e}")
+            raise
+    
+    async def _read(self, query: str, params: tuple, many: bool):
+        if not self.conn:
+            await self.connect()
+        
+        use_writer = (
+            self._readers is None
+            or _in_transaction.get()
+            or not query.lstrip().upper().startswith("SELECT")
+        )
+        
+        try:
+            if use_writer:
+                return await self._write(self._fetch, self.conn, query, params, many)
+            
+            reader = await self._readers.get()
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._read_executor,
+                    functools.partial(self._fetch, reader, query, params, many)
+                )
+            finally:
+                self._readers.put_nowait(reader)
         except Exception as e:
             print(f"❌ Query execution error: {e}")
             raise
     
     async def fetchone(self, query: str, params: tuple = ()):
         """Fetch single row"""
-        cursor = await self.execute(query, params)
-        return cursor.fetchone()
+        return await self._read(query, params, False)
     
     async def fetchall(self, query: str, params: tuple = ()):
         """Fetch all rows"""
-        cursor = await self.execute(query, params)
-        return cursor.fetchall()
+        return await self._read(query, params, True)
     
     async def commit(self):
-        """Commit transaction"""
-        if self.conn:
-            self.conn.commit()
+        """No-op: statements outside transaction() have already committed, and transaction() commits on exit"""
+    
+    async def rollback(self):
+        """No-op: only a transaction() block can roll back, by raising out of it"""
+    
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        """Run the enclosed statements as one atomic write transaction.
+        
+        Holds the writer for the whole block, so other requests' writes queue
+        behind it instead of interleaving. Commits on exit, rolls back on error.
+        Nested blocks join the outer transaction.
+        """
+        if _in_transaction.get():
+            yield self
+            return
+        
+        if not self.conn:
+            await self.connect()
+        
+        async with self._write_lock:
+            token = _in_transaction.set(True)
+            try:
+                await self._run(self.conn.execute, "BEGIN IMMEDIATE")
+                try:
+                    yield self
+                except BaseException:
+                    await self._run(self.conn.rollback)
+                    raise
+                await self._run(self.conn.commit)
+            finally:
+                _in_transaction.reset(token)
 
 # Global database instance
 db = Database()
 
 async def init_db():
-    """Initialize database tables"""
+    """Connect and bring the schema up to date"""
     await db.connect()
     
-    # Users table
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            name TEXT NOT NULL,
-            age INTEGER,
-            bio TEXT,
-            location TEXT,
-            latitude REAL,
-            longitude REAL,
-            gps_updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            
-            -- Rich Profile Data
-            job_title TEXT,
-            company TEXT,
-            education_level TEXT, -- 'High School', 'Bachelor', 'Master', 'PhD', 'Other'
-            education_details TEXT,
-            height INTEGER, -- in cm
-            body_type TEXT, -- 'Slim', 'Average', 'Athletic', 'Curvy', 'Plus Size'
-            smoking TEXT, -- 'Never', 'Occasionally', 'Regularly', 'Trying to quit'
-            drinking TEXT, -- 'Never', 'Socially', 'Regularly', 'Occasionally'
-            religion TEXT,
-            caste TEXT,
-            mother_tongue TEXT,
-            diet_preference TEXT, -- 'Vegetarian', 'Non-Vegetarian', 'Vegan', 'Jain'
-            
-            -- Lifestyle & Preferences
-            gym_frequency TEXT, -- 'Never', 'Rarely', 'Sometimes', 'Often', 'Daily'
-            travel_frequency TEXT, -- 'Never', 'Rarely', 'Sometimes', 'Often', 'Love to travel'
-            
-            -- Profile Prompts (JSON)
-            profile_prompts TEXT, -- JSON: {"ideal_date": "...", "fun_fact": "...", etc.}
-            
-            -- Activity Tracking
-            last_active DATETIME DEFAULT CURRENT_TIMESTAMP,
-            response_time_avg INTEGER DEFAULT 0, -- in minutes
-            activity_level TEXT DEFAULT 'Medium', -- 'Low', 'Medium', 'High'
-            fcm_token TEXT, -- Firebase Cloud Messaging token
-            
-            interests TEXT, -- JSON array of interests
-            relationship_intent TEXT, -- "serious", "casual", "friends"
-            profile_images TEXT, -- JSON array of Telegram file IDs
-            preferences TEXT, -- JSON preferences
-            is_verified BOOLEAN DEFAULT FALSE,
-            is_premium BOOLEAN DEFAULT FALSE,
-            flag_count INTEGER DEFAULT 0,
-            is_blocked BOOLEAN DEFAULT FALSE,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Swipes table
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS swipes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            swiper_id INTEGER NOT NULL,
-            swiped_id INTEGER NOT NULL,
-            is_like BOOLEAN NOT NULL,
-            is_undone BOOLEAN DEFAULT FALSE,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (swiper_id) REFERENCES users (id),
-            FOREIGN KEY (swiped_id) REFERENCES users (id),
-            UNIQUE(swiper_id, swiped_id)
-        )
-    """)
-    
-    # Matches table
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS matches (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user1_id INTEGER NOT NULL,
-            user2_id INTEGER NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user1_id) REFERENCES users (id),
-            FOREIGN KEY (user2_id) REFERENCES users (id),
-            UNIQUE(user1_id, user2_id)
-        )
-    """)
-    
-    # Messages table
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            match_id INTEGER NOT NULL,
-            sender_id INTEGER NOT NULL,
-            content TEXT NOT NULL,
-            message_type TEXT DEFAULT 'text', -- text, image, emoji, voice
-            is_read BOOLEAN DEFAULT FALSE,
-            is_flagged BOOLEAN DEFAULT FALSE,
-            risk_score INTEGER DEFAULT 0,
-            
-            -- Message Reactions
-            reactions TEXT, -- JSON: {"user_id": "reaction_type"}
-            
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            read_at DATETIME,
-            FOREIGN KEY (match_id) REFERENCES matches (id),
-            FOREIGN KEY (sender_id) REFERENCES users (id)
-        )
-    """)
-    
-    # Profile views table
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS profile_views (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            viewer_id INTEGER NOT NULL,
-            viewed_id INTEGER NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (viewer_id) REFERENCES users (id),
-            FOREIGN KEY (viewed_id) REFERENCES users (id)
-        )
-    """)
-    
-    # Location sharing table
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS location_shares (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            shared_with_user_id INTEGER NOT NULL,
-            latitude REAL NOT NULL,
-            longitude REAL NOT NULL,
-            expires_at DATETIME NOT NULL,
-            emergency_contact_name TEXT,
-            emergency_contact_phone TEXT,
-            is_active BOOLEAN DEFAULT TRUE,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (shared_with_user_id) REFERENCES users (id)
-        )
-    """)
-    
-    # User flags table
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS user_flags (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            reason TEXT NOT NULL,
-            reported_by INTEGER,
-            evidence TEXT, -- JSON evidence
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (reported_by) REFERENCES users (id)
-        )
-    """)
-    
-    # Compatibility scores table
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS compatibility_scores (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user1_id INTEGER NOT NULL,
-            user2_id INTEGER NOT NULL,
-            interest_score REAL DEFAULT 0,
-            lifestyle_score REAL DEFAULT 0,
-            activity_score REAL DEFAULT 0,
-            overall_score REAL DEFAULT 0,
-            calculated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user1_id) REFERENCES users (id),
-            FOREIGN KEY (user2_id) REFERENCES users (id),
-            UNIQUE(user1_id, user2_id)
-        )
-    """)
-    
-    # Safety tips table
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS safety_tips (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            content TEXT NOT NULL,
-            category TEXT NOT NULL, -- 'meeting', 'online', 'general'
-            is_active BOOLEAN DEFAULT TRUE,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Feed posts table
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS feed_posts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            image_file_id TEXT NOT NULL,
-            likes_count INTEGER DEFAULT 0,
-            is_active BOOLEAN DEFAULT TRUE,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    """)
-    
-    # Feed likes table
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS feed_likes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            post_id INTEGER NOT NULL,
-            user_id INTEGER NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (post_id) REFERENCES feed_posts (id),
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            UNIQUE(post_id, user_id)
-        )
-    """)
-    
-    # Feed favorites table
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS feed_favorites (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            post_id INTEGER NOT NULL,
-            user_id INTEGER NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (post_id) REFERENCES feed_posts (id),
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            UNIQUE(post_id, user_id)
-        )
-    """)
-    
-    # User settings table
-    await db.execute("""
-        CREATE TABLE IF NOT EXISTS user_settings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            feed_visibility BOOLEAN DEFAULT TRUE,
-            show_in_feed BOOLEAN DEFAULT TRUE,
-            notifications_enabled BOOLEAN DEFAULT TRUE,
-            location_sharing BOOLEAN DEFAULT TRUE,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            UNIQUE(user_id)
-        )
-    """)
-    
-    await db.commit()
-    print("✅ Database tables initialized")
-    
-    # Initialize game tables
-    from .game_database import init_game_tables
-    await init_game_tables(db)
-    print("✅ Game tables initialized")
-    
-    # Add missing columns if they don't exist
-    try:
-        # Check if fcm_token column exists
-        columns = await db.fetchall("PRAGMA table_info(users)")
-        column_names = [col[1] for col in columns]
-        
-        if 'fcm_token' not in column_names:
-            await db.execute("ALTER TABLE users ADD COLUMN fcm_token TEXT")
-            await db.commit()
-            print("✅ Added fcm_token column")
-        else:
-            print("✅ fcm_token column already exists")
-            
-        # Add gender and verification columns
-        if 'gender' not in column_names:
-            await db.execute("ALTER TABLE users ADD COLUMN gender TEXT")
-            await db.commit()
-            print("✅ Added gender column")
-        else:
-            print("✅ gender column already exists")
-            
-        if 'verification_confidence' not in column_names:
-            await db.execute("ALTER TABLE users ADD COLUMN verification_confidence REAL")
-            await db.commit()
-            print("✅ Added verification_confidence column")
-        else:
-            print("✅ verification_confidence column already exists")
-            
-        if 'verified_at' not in column_names:
-            await db.execute("ALTER TABLE users ADD COLUMN verified_at DATETIME")
-            await db.commit()
-            print("✅ Added verified_at column")
-        else:
-            print("✅ verified_at column already exists")
-            
-    except Exception as e:
-        print(f"⚠️ Error checking/adding columns: {e}")
+    from .migrations import run_migrations
+    await run_migrations(db)
 
 async def get_db():
     """Dependency to get database connection"""
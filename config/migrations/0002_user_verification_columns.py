@@ -0,0 +1,17 @@
+"""Columns that used to be patched onto users with ALTER TABLE at every boot"""
+
+COLUMNS = [
+    ("fcm_token", "TEXT"),
+    ("gender", "TEXT"),
+    ("verification_confidence", "REAL"),
+    ("verified_at", "DATETIME"),
+]
+
+
+async def upgrade(db):
+    # Databases created before migrations may already have some of these
+    existing = {col[1] for col in await db.fetchall("PRAGMA table_info(users)")}
+    
+    for name, column_type in COLUMNS:
+        if name not in existing:
+            await db.execute(f"ALTER TABLE users ADD COLUMN {name} {column_type}")
@@ -0,0 +1,17 @@
+"""Precomputed per-user discovery queue"""
+
+
+async def upgrade(db):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS discovery_decks (
+            user_id INTEGER NOT NULL,
+            candidate_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            score REAL DEFAULT 0,
+            served_at DATETIME, -- set once returned by /discover
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, candidate_id),
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (candidate_id) REFERENCES users (id)
+        )
+    """)
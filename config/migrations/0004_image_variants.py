@@ -0,0 +1,16 @@
+"""Resized / blurred WebP renditions of uploaded images"""
+
+
+async def upgrade(db):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS image_variants (
+            file_id TEXT NOT NULL, -- id kept in profile_images (the 'full' variant)
+            variant TEXT NOT NULL, -- avatar, card, full, avatar_blur, card_blur
+            variant_file_id TEXT NOT NULL,
+            width INTEGER,
+            height INTEGER,
+            bytes INTEGER,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (file_id, variant)
+        )
+    """)
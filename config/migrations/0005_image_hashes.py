@@ -0,0 +1,11 @@
+"""Content hash of every processed upload, for reusing file_ids"""
+
+
+async def upgrade(db):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS image_hashes (
+            content_hash TEXT PRIMARY KEY, -- sha256 of the uploaded bytes
+            file_id TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
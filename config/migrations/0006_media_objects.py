@@ -0,0 +1,13 @@
+"""Content hash -> Telegram file_id for the telegram media storage backend"""
+
+
+async def upgrade(db):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS media_objects (
+            content_hash TEXT PRIMARY KEY, -- sha256 of the stored bytes
+            file_id TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            content_type TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
@@ -0,0 +1,26 @@
+"""Per-(match, user) read watermarks replacing per-message is_read updates"""
+
+
+async def upgrade(db):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS read_watermarks (
+            match_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            last_read_message_id INTEGER NOT NULL DEFAULT 0, -- every message with id <= this is read
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (match_id, user_id)
+        )
+    """)
+    
+    # Carry over what was already marked read: the newest read message
+    # from the partner becomes the reader's watermark
+    await db.execute("""
+        INSERT OR IGNORE INTO read_watermarks (match_id, user_id, last_read_message_id)
+        SELECT m.match_id,
+               CASE WHEN m.sender_id = mt.user1_id THEN mt.user2_id ELSE mt.user1_id END,
+               MAX(m.id)
+        FROM messages m
+        JOIN matches mt ON mt.id = m.match_id
+        WHERE m.is_read = TRUE
+        GROUP BY 1, 2
+    """)
@@ -0,0 +1,53 @@
+"""Denormalized chat list: one row per (user, match) with the last message and unread count"""
+
+
+async def upgrade(db):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS inbox_entries (
+            user_id INTEGER NOT NULL,
+            match_id INTEGER NOT NULL,
+            partner_id INTEGER NOT NULL,
+            last_message_id INTEGER,
+            last_message_sender_id INTEGER,
+            last_message_preview TEXT,
+            last_message_type TEXT,
+            last_activity_at DATETIME NOT NULL, -- last message, or when the match was made
+            unread_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, match_id)
+        )
+    """)
+    
+    # Both sides of every existing match
+    await db.execute("""
+        INSERT OR IGNORE INTO inbox_entries (user_id, match_id, partner_id, last_activity_at)
+        SELECT user1_id, id, user2_id, created_at FROM matches
+        UNION ALL
+        SELECT user2_id, id, user1_id, created_at FROM matches
+    """)
+    
+    # Latest message of each conversation (preview length matches InboxService)
+    await db.execute("""
+        UPDATE inbox_entries SET
+            (last_message_id, last_message_sender_id, last_message_preview,
+             last_message_type, last_activity_at) = (
+                SELECT id, sender_id, substr(content, 1, 100), message_type, created_at
+                FROM messages
+                WHERE match_id = inbox_entries.match_id
+                ORDER BY id DESC
+                LIMIT 1
+            )
+        WHERE EXISTS (SELECT 1 FROM messages WHERE match_id = inbox_entries.match_id)
+    """)
+    
+    # Partner messages above each reader's watermark
+    await db.execute("""
+        UPDATE inbox_entries SET unread_count = (
+            SELECT COUNT(*) FROM messages m
+            WHERE m.match_id = inbox_entries.match_id
+              AND m.sender_id != inbox_entries.user_id
+              AND m.id > COALESCE((
+                  SELECT w.last_read_message_id FROM read_watermarks w
+                  WHERE w.match_id = inbox_entries.match_id AND w.user_id = inbox_entries.user_id
+              ), 0)
+        )
+    """)
@@ -0,0 +1,9 @@
+"""Per-side (user, created_at) indexes on matches for keyset pagination.
+
+The indexes themselves are declared in indexes.py; this version bump makes
+startup sync the catalog, which creates them and drops idx_matches_user2.
+"""
+
+
+async def upgrade(db):
+    pass
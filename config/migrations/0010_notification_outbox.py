@@ -0,0 +1,19 @@
+"""Durable push notification outbox, one pending row per (user, collapse key)"""
+
+
+async def upgrade(db):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS notification_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            collapse_key TEXT NOT NULL, -- e.g. message:<match_id>; later pushes replace the pending one
+            title TEXT NOT NULL,
+            body TEXT NOT NULL,
+            data TEXT, -- JSON object of string values
+            pending_count INTEGER NOT NULL DEFAULT 1, -- pushes collapsed into this row and not yet sent
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (user_id, collapse_key)
+        )
+    """)
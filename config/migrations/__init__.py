@@ -0,0 +1,91 @@
+"""Versioned schema migrations.
+
+Migrations are the ``NNNN_<name>.py`` modules in this package, applied in
+order. Each defines ``async def upgrade(db)`` and runs in its own
+``db.transaction()`` together with its ``schema_version`` row.
+
+Startup only checks the recorded version; when it is current nothing else
+runs. After any migration run the index catalog in ``indexes.py`` is
+synced, so adding an index to the catalog must ship with a migration.
+"""
+import importlib
+import os
+import re
+
+from .indexes import INDEXES
+
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+
+def discover_migrations():
+    """Return [(version, name, module)] sorted by version"""
+    migrations = []
+    for filename in os.listdir(os.path.dirname(__file__)):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            module = importlib.import_module(f"{__name__}.{filename[:-3]}")
+            migrations.append((int(match.group(1)), match.group(2), module))
+    
+    migrations.sort(key=lambda m: m[0])
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return migrations
+
+
+async def current_version(db) -> int:
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await db.commit()
+    row = await db.fetchone("SELECT MAX(version) AS version FROM schema_version")
+    return row["version"] or 0
+
+
+async def sync_indexes(db):
+    """Create missing catalog indexes and drop managed ones no longer declared"""
+    rows = await db.fetchall(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name GLOB 'idx_*'"
+    )
+    existing = {row["name"] for row in rows}
+    declared = {name for name, _, _ in INDEXES}
+    
+    for name, table, columns in INDEXES:
+        if name not in existing:
+            await db.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+            print(f"✅ Created index {name}")
+    
+    for name in existing - declared:
+        await db.execute(f"DROP INDEX IF EXISTS {name}")
+        print(f"✅ Dropped index {name}")
+    
+    await db.execute("PRAGMA optimize")
+
+
+async def run_migrations(db):
+    """Apply pending migrations; returns the resulting schema version"""
+    version = await current_version(db)
+    pending = [m for m in discover_migrations() if m[0] > version]
+    
+    if not pending:
+        print(f"✅ Database schema up to date (version {version})")
+        return version
+    
+    for number, name, module in pending:
+        async with db.transaction():
+            await module.upgrade(db)
+            await db.execute(
+                "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                (number, name)
+            )
+        print(f"✅ Applied migration {number:04d}_{name}")
+        version = number
+    
+    async with db.transaction():
+        await sync_indexes(db)
+    
+    return version
@@ -0,0 +1,44 @@
+"""Secondary index catalog.
+
+Every managed index is named ``idx_*`` and declared here as
+(name, table, columns). After migrations run, indexes missing from the
+database are created and ``idx_*`` indexes no longer listed are dropped.
+
+SQLite appends the rowid to every index entry, so an index on
+(x, created_at) already serves keyset pages ordered by (created_at, id).
+"""
+
+INDEXES = [
+    # Swipes: who-liked-me and mutual-like lookups, undo ordering
+    ("idx_swipes_swiped_created", "swipes", "swiped_id, created_at"),
+    ("idx_swipes_swiper_created", "swipes", "swiper_id, created_at"),
+    
+    # Matches: one (user, created_at) range per side for the paged list
+    ("idx_matches_user1_created", "matches", "user1_id, created_at"),
+    ("idx_matches_user2_created", "matches", "user2_id, created_at"),
+    
+    # Messages: conversation history, per-sender lookups, and unread
+    # counts as a covering range scan above the reader's watermark
+    ("idx_messages_match_created", "messages", "match_id, created_at"),
+    ("idx_messages_match_id_sender", "messages", "match_id, id, sender_id"),
+    ("idx_messages_sender_created", "messages", "sender_id, created_at"),
+    
+    # Inbox: a user's conversations by last activity
+    ("idx_inbox_entries_user_activity", "inbox_entries", "user_id, last_activity_at, match_id"),
+    
+    # Notification outbox: rows due for a send attempt
+    ("idx_notification_outbox_next_attempt", "notification_outbox", "next_attempt_at"),
+    
+    # Feed
+    ("idx_feed_posts_active_created", "feed_posts", "is_active, created_at"),
+    ("idx_feed_posts_user", "feed_posts", "user_id"),
+    ("idx_feed_favorites_user_created", "feed_favorites", "user_id, created_at"),
+    
+    # Discovery decks: unserved cards are consumed in position order
+    ("idx_discovery_decks_user_served_position", "discovery_decks", "user_id, served_at, position"),
+    
+    # Profile views and safety
+    ("idx_profile_views_viewed_created", "profile_views", "viewed_id, created_at"),
+    ("idx_location_shares_expires", "location_shares", "expires_at"),
+    ("idx_user_flags_user", "user_flags", "user_id"),
+]
@@ -9,19 +9,49 @@ class Settings(BaseSettings):
     TURSO_DATABASE_URL: str = os.getenv("TURSO_DATABASE_URL", "libsql://your-db.turso.io")
     TURSO_AUTH_TOKEN: str = os.getenv("TURSO_AUTH_TOKEN", "your-auth-token")
     
+    # SQLite
+    DB_PATH: str = os.getenv("DB_PATH", "heartlink.db")
+    DB_READ_POOL_SIZE: int = int(os.getenv("DB_READ_POOL_SIZE", "4"))  # 0 = all queries on the writer
+    DB_JOURNAL_MODE: str = os.getenv("DB_JOURNAL_MODE", "WAL")
+    DB_SYNCHRONOUS: str = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+    DB_MMAP_SIZE: int = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+    DB_CACHE_SIZE: int = int(os.getenv("DB_CACHE_SIZE", "-16000"))  # negative = KiB
+    
     # JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY", "heartlink-secret-key-change-in-production")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "10080"))
+    AUTH_CACHE_SIZE: int = int(os.getenv("AUTH_CACHE_SIZE", "10000"))  # users kept by get_current_user
+    AUTH_CACHE_TTL: int = int(os.getenv("AUTH_CACHE_TTL", "60"))  # seconds; 0 disables the cache
+    
+    # Password hashing
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))  # hashes with another cost are replaced at login
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_QUEUE: int = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))  # waiting calls before 503
     
     # Telegram Bot
     TELEGRAM_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
     TELEGRAM_CHAT_ID: str = os.getenv("TELEGRAM_CHAT_ID", "@storagecat")
     TELEGRAM_ADMIN_CHAT_ID: str = os.getenv("TELEGRAM_ADMIN_CHAT_ID", "@storagecat")
+    TELEGRAM_FILE_CACHE_SIZE: int = int(os.getenv("TELEGRAM_FILE_CACHE_SIZE", "10000"))
+    TELEGRAM_FILE_CACHE_TTL: int = int(os.getenv("TELEGRAM_FILE_CACHE_TTL", "3300"))  # seconds; paths last ~1 hour
+    TELEGRAM_MAX_CONNECTIONS: int = int(os.getenv("TELEGRAM_MAX_CONNECTIONS", "32"))
+    IMAGE_URL_CONCURRENCY: int = int(os.getenv("IMAGE_URL_CONCURRENCY", "16"))  # getFile calls in flight per process
+    IMAGE_URL_DEADLINE: float = float(os.getenv("IMAGE_URL_DEADLINE", "2.0"))  # seconds a list response waits for URLs
     
     # Firebase Cloud Messaging
     FCM_SERVER_KEY: str = os.getenv("FCM_SERVER_KEY", "")
     FIREBASE_PROJECT_ID: str = os.getenv("FIREBASE_PROJECT_ID", "heartlink")
+    FCM_MAX_CONNECTIONS: int = int(os.getenv("FCM_MAX_CONNECTIONS", "32"))
+    
+    # Notification outbox
+    NOTIFICATION_BATCH_SIZE: int = int(os.getenv("NOTIFICATION_BATCH_SIZE", "100"))  # pushes sent concurrently per batch
+    NOTIFICATION_POLL_INTERVAL: float = float(os.getenv("NOTIFICATION_POLL_INTERVAL", "1.0"))  # seconds
+    NOTIFICATION_COLLAPSE_SECONDS: int = int(os.getenv("NOTIFICATION_COLLAPSE_SECONDS", "3"))  # burst window per (user, conversation)
+    NOTIFICATION_MAX_ATTEMPTS: int = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "6"))
+    NOTIFICATION_RETRY_BASE: int = int(os.getenv("NOTIFICATION_RETRY_BASE", "5"))  # seconds, doubled per attempt
+    NOTIFICATION_RETRY_MAX: int = int(os.getenv("NOTIFICATION_RETRY_MAX", "600"))
+    NOTIFICATION_LEASE_SECONDS: int = int(os.getenv("NOTIFICATION_LEASE_SECONDS", "60"))  # claimed rows are retried after this
     
     # App Settings
     APP_NAME: str = "HeartLink"
@@ -29,6 +59,51 @@ class Settings(BaseSettings):
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
     
+    # Anti-scam rules (keywords and phone patterns per category)
+    ANTI_SCAM_RULES_PATH: str = os.getenv(
+        "ANTI_SCAM_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "anti_scam_rules.json")
+    )
+    
+    # Per-user rate limits, "requests/seconds" (0 requests = unlimited)
+    RATE_LIMIT_MESSAGE: str = os.getenv("RATE_LIMIT_MESSAGE", "30/60")
+    RATE_LIMIT_SWIPE: str = os.getenv("RATE_LIMIT_SWIPE", "120/60")  # a swipe batch counts each swipe
+    RATE_LIMIT_REPORT: str = os.getenv("RATE_LIMIT_REPORT", "5/3600")
+    RATE_TRACKER_MAX_KEYS: int = int(os.getenv("RATE_TRACKER_MAX_KEYS", "100000"))  # (user, action) pairs kept
+    
+    # Post-commit event bus (notifications and side effects)
+    EVENT_BUS_WORKERS: int = int(os.getenv("EVENT_BUS_WORKERS", "4"))
+    EVENT_BUS_QUEUE_SIZE: int = int(os.getenv("EVENT_BUS_QUEUE_SIZE", "10000"))  # per worker; beyond this events are dropped
+    
+    # Chat moderation pipeline
+    MODERATION_WORKERS: int = int(os.getenv("MODERATION_WORKERS", "2"))
+    MODERATION_BATCH_SIZE: int = int(os.getenv("MODERATION_BATCH_SIZE", "100"))  # messages scored per write-back
+    MODERATION_QUEUE_SIZE: int = int(os.getenv("MODERATION_QUEUE_SIZE", "10000"))  # messages beyond this go unscored
+    
+    # Discovery
+    DISCOVERY_DECK_SIZE: int = int(os.getenv("DISCOVERY_DECK_SIZE", "100"))
+    DISCOVERY_DECK_LOW_WATER: int = int(os.getenv("DISCOVERY_DECK_LOW_WATER", "20"))
+    
+    # Geo index
+    GEO_INDEX_CELL_DEG: float = float(os.getenv("GEO_INDEX_CELL_DEG", "0.1"))  # ~11 km cells
+    GEO_SORT_CANDIDATES: int = int(os.getenv("GEO_SORT_CANDIDATES", "2000"))  # nearest users ranked for sort_by=distance
+    
+    # Compatibility recompute job
+    COMPATIBILITY_RECOMPUTE_INTERVAL: int = int(os.getenv("COMPATIBILITY_RECOMPUTE_INTERVAL", "60"))  # seconds
+    COMPATIBILITY_RECOMPUTE_BATCH: int = int(os.getenv("COMPATIBILITY_RECOMPUTE_BATCH", "100"))  # dirty users per transaction
+    COMPATIBILITY_ACTIVE_DAYS: int = int(os.getenv("COMPATIBILITY_ACTIVE_DAYS", "30"))
+    
+    # Media proxy
+    MEDIA_PROXY: bool = os.getenv("MEDIA_PROXY", "True").lower() == "true"  # serve images via /media instead of Telegram URLs
+    PUBLIC_BASE_URL: str = os.getenv("PUBLIC_BASE_URL", "http://127.0.0.1:8000").rstrip("/")
+    MEDIA_CACHE_DIR: str = os.getenv("MEDIA_CACHE_DIR", "media_cache")
+    MEDIA_CACHE_MAX_BYTES: int = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+    MEDIA_STORAGE_BACKEND: str = os.getenv("MEDIA_STORAGE_BACKEND", "telegram")  # telegram or local
+    MEDIA_STORAGE_DIR: str = os.getenv("MEDIA_STORAGE_DIR", "media_storage")  # local backend root
+    
+    # Image pipeline
+    IMAGE_PROCESS_WORKERS: int = int(os.getenv("IMAGE_PROCESS_WORKERS", "2"))
+    IMAGE_WEBP_QUALITY: int = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+    
     # File Upload
     MAX_FILE_SIZE: int = 5 * 1024 * 1024  # 5MB
     ALLOWED_IMAGE_TYPES: list = ["image/jpeg", "image/png", "image/webp"]
@@ -5,9 +5,10 @@ from fastapi.responses import FileResponse
 import uvicorn
 import os
 
-from routes import auth, users, matches, chat, safety, enhanced_chat, safety_tips, fcm, gender_verification, calls, profile_features, games, feed
+from routes import auth, users, matches, chat, safety, enhanced_chat, safety_tips, fcm, gender_verification, calls, profile_features, games, feed, media
 from routes import settings as user_settings
-from config.database import init_db
+from config.database import init_db, db
+from services.pagination import NEXT_CURSOR_HEADER, LATEST_CURSOR_HEADER
 from config.settings import settings
 
 # Initialize FastAPI app
@@ -28,6 +29,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, LATEST_CURSOR_HEADER],
 )
 
 # Mount static files for website
@@ -47,6 +49,7 @@ app.include_router(profile_features.router, prefix="/api/profile", tags=["Profil
 app.include_router(games.router, prefix="/api/games", tags=["Friend Zone Games"])
 app.include_router(feed.router, tags=["Feed"])
 app.include_router(user_settings.router, tags=["Settings"])
+app.include_router(media.router, tags=["Media"])
 
 app.include_router(fcm.router, prefix="/api/users", tags=["FCM"])
 
@@ -58,8 +61,52 @@ app.websocket("/api/chat/ws/{user_id}")(websocket_endpoint)
 async def startup_event():
     """Initialize database on startup"""
     await init_db()
+    
+    from services.geo_index import geo_index
+    await geo_index.load(db)
+    
+    from services.compatibility_job import compatibility_job
+    await compatibility_job.start()
+    
+    from services.moderation_pipeline import moderation_pipeline
+    moderation_pipeline.start()
+    
+    import services.event_handlers  # registers the subscribers
+    from services.event_bus import event_bus
+    event_bus.start()
+    
+    from services.notification_outbox import notification_outbox
+    notification_outbox.start()
+    
+    from services.media_cache import media_cache
+    await media_cache.load()
     print("🚀 HeartLink API Started!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close database connections on shutdown"""
+    from services.discovery_service import discovery_deck_service
+    from services.compatibility_job import compatibility_job
+    from services.moderation_pipeline import moderation_pipeline
+    await compatibility_job.shutdown()
+    await discovery_deck_service.shutdown()
+    await moderation_pipeline.shutdown()
+    
+    from services.event_bus import event_bus
+    from services.notification_outbox import notification_outbox
+    from services.fcm_notification_service import fcm_service
+    await event_bus.shutdown()
+    await notification_outbox.shutdown()
+    await fcm_service.close()
+    
+    from services.telegram_service import telegram_service
+    from services.image_pipeline import image_pipeline
+    from services.password_hasher import password_hasher
+    await telegram_service.close()
+    image_pipeline.shutdown()
+    password_hasher.shutdown()
+    await db.close()
+
 # Website routes
 @app.get("/")
 async def serve_website():
@@ -91,6 +138,30 @@ async def api_root():
 async def health_check():
     return {"status": "healthy", "service": "heartlink-api"}
 
+@app.get("/api/metrics")
+async def metrics():
+    """Counters of the background jobs and caches"""
+    from services.compatibility_job import compatibility_job
+    from services.telegram_service import telegram_service
+    from services.media_cache import media_cache
+    from services.auth_cache import principal_cache
+    from services.password_hasher import password_hasher
+    from services.moderation_pipeline import moderation_pipeline
+    from services.rate_limiter import rate_tracker
+    from services.event_bus import event_bus
+    from services.notification_outbox import notification_outbox
+    return {
+        "compatibility_recompute": compatibility_job.stats(),
+        "telegram_file_cache": telegram_service.file_cache_stats(),
+        "media_cache": media_cache.stats(),
+        "auth_principal_cache": principal_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "moderation": moderation_pipeline.stats(),
+        "rate_limits": rate_tracker.stats(),
+        "event_bus": event_bus.stats(),
+        "notification_outbox": notification_outbox.stats()
+    }
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -1,9 +1,11 @@
 from .schemas import (
     UserCreate, UserLogin, Token, UserProfile, UserUpdate, ImageUpload,
-    SwipeCreate, SwipeResponse, Match, MessageCreate, Message
+    SwipeCreate, SwipeResponse, SwipeBatch, SwipeResult, SwipeBatchResponse,
+    Match, MessageCreate, Message
 )
 
 __all__ = [
     'UserCreate', 'UserLogin', 'Token', 'UserProfile', 'UserUpdate', 'ImageUpload',
-    'SwipeCreate', 'SwipeResponse', 'Match', 'MessageCreate', 'Message'
+    'SwipeCreate', 'SwipeResponse', 'SwipeBatch', 'SwipeResult', 'SwipeBatchResponse',
+    'Match', 'MessageCreate', 'Message'
 ]
@@ -88,6 +88,18 @@ class SwipeResponse(BaseModel):
     is_match: bool
     match_id: Optional[int] = None
 
+class SwipeBatch(BaseModel):
+    swipes: List[SwipeCreate] = Field(..., min_length=1, max_length=100)
+
+class SwipeResult(BaseModel):
+    swiped_user_id: int
+    is_match: bool
+    match_id: Optional[int] = None
+
+class SwipeBatchResponse(BaseModel):
+    processed: int
+    matches: List[SwipeResult]
+
 class Match(BaseModel):
     id: int
     user1_id: int
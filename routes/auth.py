@@ -2,24 +2,24 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 import json
 
 from models.schemas import UserCreate, UserLogin, Token, UserProfile
 from config.database import get_db
 from config.settings import settings
+from services.auth_cache import principal_cache
+from services.password_hasher import password_hasher
 
 router = APIRouter()
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# bcrypt runs on the password hasher's worker pool, not the event loop
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -40,7 +40,7 @@ def safe_json_loads(value, default):
     except:
         return default
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -54,11 +54,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get
     except JWTError:
         raise credentials_exception
     
-    user = await db.fetchone("SELECT * FROM users WHERE email = ?", (email,))
+    # Slim record from the principal cache instead of the full users row
+    user = await principal_cache.get(email)
     if user is None:
         raise credentials_exception
     
-    return dict(user)
+    return user
 
 @router.post("/register", response_model=Token)
 async def register(user: UserCreate, db = Depends(get_db)):
@@ -87,7 +88,7 @@ async def register(user: UserCreate, db = Depends(get_db)):
         )
     
     # Hash password
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     
     # Create user
     await db.execute("""
@@ -162,25 +163,30 @@ async def login(user_login: UserLogin, db = Depends(get_db)):
         )
     
     # Verify password
-    if not verify_password(user_login.password, user["password_hash"]):
+    verified, new_hash = await password_hasher.verify_and_update(user_login.password, user["password_hash"])
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Stored hash used a different bcrypt cost: replace it while we have the password
+    if new_hash:
+        await db.execute("UPDATE users SET password_hash = ? WHERE id = ?", (new_hash, user["id"]))
+        await db.commit()
+    
     user_dict = dict(user)
     
-    # Send welcome notification
+    # Queue welcome notification
     try:
-        from services.fcm_notification_service import FCMNotificationService
-        fcm_service = FCMNotificationService()
+        from services.notification_outbox import notification_outbox
         
         # Get user's FCM token from database
         fcm_token = user_dict.get("fcm_token")
         if fcm_token:
-            await fcm_service.send_notification(
-                fcm_token=fcm_token,
+            await notification_outbox.enqueue(
+                user_dict["id"], "welcome",
                 title="Welcome back! 👋",
                 body=f"Hi {user_dict['name']}, you're successfully logged in to HeartLink!",
                 data={"type": "welcome", "timestamp": str(datetime.utcnow())}
@@ -250,17 +256,12 @@ async def login(user_login: UserLogin, db = Depends(get_db)):
 
 @router.get("/me")
 async def get_current_user_profile(current_user: dict = Depends(get_current_user)):
-    from services.telegram_service import get_image_url
+    from services.telegram_service import get_image_urls, parse_image_ids
     
     # Convert file_ids to URLs
-    profile_images = safe_json_loads(current_user.get("profile_images"), [])
-    image_urls = []
-    for file_id in profile_images:
-        try:
-            url = await get_image_url(file_id)
-            image_urls.append(url)
-        except:
-            image_urls.append("https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink")
+    profile_images = parse_image_ids(current_user.get("profile_images"))
+    urls = await get_image_urls(profile_images, variant='full')
+    image_urls = [urls[file_id] for file_id in profile_images]
     
     return {
         "id": current_user["id"],
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, WebSocket, WebSocketDisconnect
+from typing import List, Optional
 import json
 from datetime import datetime
 
@@ -8,19 +8,89 @@ from routes.auth import get_current_user
 from config.database import get_db
 from services.websocket_manager import manager
 from services.anti_scam_service import AntiScamService
-from services.notification_service import send_message_notification
+from services.scam_matcher import scam_matcher
+from services.moderation_pipeline import moderation_pipeline
+from services.rate_limiter import rate_tracker
+from services.event_bus import event_bus
+from services.events import MessageSent
+from services.read_receipts import ReadReceiptService
+from services.inbox_service import InboxService
+from services.pagination import (
+    encode_cursor, decode_cursor, next_cursor, NEXT_CURSOR_HEADER, LATEST_CURSOR_HEADER
+)
 
 router = APIRouter()
 
+@router.get("/inbox")
+async def get_inbox(
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Chat list in one call: partner, last message and unread count per match, latest activity first"""
+    before = decode_cursor(cursor, 2)
+    try:
+        from services.telegram_service import get_image_urls, parse_image_ids, PLACEHOLDER_URL
+        
+        entries = await InboxService.get_page(current_user["id"], limit, before)
+        
+        avatar_ids = {entry["match_id"]: parse_image_ids(entry["partner_images"])[:1] for entry in entries}
+        urls = await get_image_urls((file_id for ids in avatar_ids.values() for file_id in ids), variant='avatar')
+        
+        conversations = []
+        for entry in entries:
+            last_message = None
+            if entry["last_message_id"]:
+                last_message = {
+                    "id": entry["last_message_id"],
+                    "sender_id": entry["last_message_sender_id"],
+                    "preview": entry["last_message_preview"],
+                    "message_type": entry["last_message_type"],
+                    "created_at": entry["last_activity_at"]
+                }
+            conversations.append({
+                "match_id": entry["match_id"],
+                "other_user": {
+                    "id": entry["partner_id"],
+                    "name": entry["partner_name"],
+                    "age": entry["partner_age"],
+                    "profile_images": [urls[file_id] for file_id in avatar_ids[entry["match_id"]]] or [PLACEHOLDER_URL]
+                },
+                "last_message": last_message,
+                "last_activity_at": entry["last_activity_at"],
+                "unread_count": entry["unread_count"]
+            })
+        
+        return {
+            "conversations": conversations,
+            "next_cursor": next_cursor(entries, limit, "last_activity_at", "match_id")
+        }
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch inbox: {str(e)}"
+        )
+
 @router.get("/{match_id}/messages", response_model=List[Message])
 async def get_messages(
     match_id: int,
-    limit: int = 50,
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
     offset: int = 0,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Get messages for a match"""
+    """Get messages for a match in chronological order.
+    
+    Pages go backwards from the newest message; pass X-Next-Cursor as
+    `before` for older history. A reconnecting client passes its last
+    X-Latest-Cursor as `after` to get only the messages it missed.
+    """
+    before_key = decode_cursor(before, 2)
+    after_key = decode_cursor(after, 2)
     try:
         # Verify user is part of this match
         match = await db.fetchone(
@@ -34,38 +104,66 @@ async def get_messages(
                 detail="Match not found"
             )
         
-        # Get messages
-        messages = await db.fetchall("""
-            SELECT m.*, u.name as sender_name
-            FROM messages m
-            JOIN users u ON m.sender_id = u.id
-            WHERE m.match_id = ?
-            ORDER BY m.created_at DESC
-            LIMIT ? OFFSET ?
-        """, (match_id, limit, offset))
+        # Keyset pages on (created_at, id), an index range on idx_messages_match_created
+        if after_key:
+            messages = await db.fetchall("""
+                SELECT m.*, u.name as sender_name
+                FROM messages m
+                JOIN users u ON m.sender_id = u.id
+                WHERE m.match_id = ? AND (m.created_at, m.id) > (?, ?)
+                ORDER BY m.created_at ASC, m.id ASC
+                LIMIT ?
+            """, (match_id, *after_key, limit))
+            newest = messages[-1] if messages else None
+        else:
+            keyset = "AND (m.created_at, m.id) < (?, ?)" if before_key else ""
+            messages = await db.fetchall(f"""
+                SELECT m.*, u.name as sender_name
+                FROM messages m
+                JOIN users u ON m.sender_id = u.id
+                WHERE m.match_id = ? {keyset}
+                ORDER BY m.created_at DESC, m.id DESC
+                LIMIT ? OFFSET ?
+            """, (match_id, *(before_key or ()), limit, 0 if before_key else offset))
+            newest = messages[0] if messages else None
+            cursor = next_cursor(messages, limit, "created_at", "id")
+            if cursor:
+                response.headers[NEXT_CURSOR_HEADER] = cursor
+            messages = list(reversed(messages))
+        
+        if newest:
+            response.headers[LATEST_CURSOR_HEADER] = encode_cursor(newest["created_at"], newest["id"])
+        elif after:
+            response.headers[LATEST_CURSOR_HEADER] = after
+        
+        # Read state comes from the watermarks: own messages are read once the
+        # partner's watermark passes them, received ones once ours does
+        partner_id = match["user1_id"] if match["user2_id"] == current_user["id"] else match["user2_id"]
+        watermarks = await ReadReceiptService.get_watermarks(match_id)
+        own_watermark = watermarks.get(current_user["id"], 0)
+        partner_watermark = watermarks.get(partner_id, 0)
         
         message_list = []
         for msg in messages:
             msg_dict = dict(msg)
+            watermark = partner_watermark if msg_dict["sender_id"] == current_user["id"] else own_watermark
             message_list.append(Message(
                 id=msg_dict["id"],
                 match_id=msg_dict["match_id"],
                 sender_id=msg_dict["sender_id"],
                 content=msg_dict["content"],
                 message_type=msg_dict["message_type"],
-                is_read=msg_dict["is_read"],
+                is_read=msg_dict["id"] <= watermark,
                 created_at=msg_dict["created_at"],
                 sender_name=msg_dict["sender_name"]
             ))
         
-        # Mark messages as read
-        await db.execute(
-            "UPDATE messages SET is_read = TRUE, read_at = CURRENT_TIMESTAMP WHERE match_id = ? AND sender_id != ?",
-            (match_id, current_user["id"])
-        )
-        await db.commit()
+        # Mark the conversation read by moving our watermark, not by rewriting rows
+        latest_id = await ReadReceiptService.latest_message_id(match_id)
+        if latest_id > own_watermark:
+            await ReadReceiptService.mark_read(match_id, current_user["id"], latest_id)
         
-        return list(reversed(message_list))  # Return in chronological order
+        return message_list
         
     except Exception as e:
         raise HTTPException(
@@ -81,6 +179,7 @@ async def send_message(
     db = Depends(get_db)
 ):
     """Send a message in a match"""
+    rate_tracker.hit(current_user["id"], "message")
     try:
         # Verify user is part of this match
         match = await db.fetchone(
@@ -95,50 +194,31 @@ async def send_message(
             )
         
         # Anti-scam check for phone numbers and social media
-        content = message.content.lower()
-        blocked_patterns = [
-            # Phone patterns
-            r'\b\d{10}\b',  # 10 digit numbers
-            r'\b\d{3}[-.]\d{3}[-.]\d{4}\b',  # xxx-xxx-xxxx
-            r'\+\d{1,3}\s?\d{10}',  # +91 xxxxxxxxxx
-            # Social media
-            'instagram', 'insta', 'ig:', '@',
-            'whatsapp', 'telegram', 'snapchat',
-            'facebook', 'twitter', 'tiktok'
-        ]
-        
-        import re
-        for pattern in blocked_patterns:
-            if re.search(pattern, content):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Messages containing phone numbers or social media handles are not allowed for safety reasons."
-                )
-        
-        # Insert message
-        await db.execute("""
-            INSERT INTO messages (match_id, sender_id, content, message_type)
-            VALUES (?, ?, ?, ?)
-        """, (
-            match_id, 
-            current_user["id"], 
-            message.content, 
-            message.message_type
-        ))
+        if scam_matcher.is_blocked(scam_matcher.scan(message.content)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Messages containing phone numbers or social media handles are not allowed for safety reasons."
+            )
         
-        # Get the created message
-        created_message = await db.fetchone("""
-            SELECT m.*, u.name as sender_name
-            FROM messages m
-            JOIN users u ON m.sender_id = u.id
-            WHERE m.match_id = ? AND m.sender_id = ?
-            ORDER BY m.created_at DESC
-            LIMIT 1
-        """, (match_id, current_user["id"]))
+        receiver_id = match["user1_id"] if match["user2_id"] == current_user["id"] else match["user2_id"]
         
-        await db.commit()
+        # Insert the message and update both inbox rows in one transaction
+        async with db.transaction():
+            created_message = await db.fetchone("""
+                INSERT INTO messages (match_id, sender_id, content, message_type)
+                VALUES (?, ?, ?, ?)
+                RETURNING *
+            """, (
+                match_id, 
+                current_user["id"], 
+                message.content, 
+                message.message_type
+            ))
+            await InboxService.record_message(match_id, current_user["id"], receiver_id, dict(created_message))
+        moderation_pipeline.submit(created_message)
         
         msg_dict = dict(created_message)
+        msg_dict["sender_name"] = current_user["name"]
         new_message = Message(
             id=msg_dict["id"],
             match_id=msg_dict["match_id"],
@@ -150,51 +230,8 @@ async def send_message(
             sender_name=msg_dict["sender_name"]
         )
         
-        # Send WebSocket notification to receiver
-        receiver_id = match["user1_id"] if match["user2_id"] == current_user["id"] else match["user2_id"]
-        
-        # Send Firebase push notification
-        try:
-            from services.fcm_notification_service import fcm_service
-            receiver = await db.fetchone("SELECT fcm_token, name FROM users WHERE id = ?", (receiver_id,))
-            print(f"\n=== MESSAGE NOTIFICATION ===")
-            print(f"Receiver ID: {receiver_id}")
-            print(f"Receiver data: {dict(receiver) if receiver else 'None'}")
-            if receiver and receiver['fcm_token']:
-                print(f"FCM token found: {receiver['fcm_token'][:20]}...")
-                result = await fcm_service.send_message_notification(
-                    fcm_token=receiver['fcm_token'],
-                    sender_name=current_user['name'],
-                    message_content=message.content
-                )
-                print(f"FCM result: {result}")
-            else:
-                print(f"❌ No FCM token for user {receiver_id}")
-                if receiver:
-                    print(f"User exists but fcm_token is: {receiver['fcm_token'] if receiver['fcm_token'] else 'NULL'}")
-                else:
-                    print(f"User {receiver_id} not found in database")
-            print(f"=== END MESSAGE NOTIFICATION ===")
-        except Exception as e:
-            print(f"FCM notification error: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        # Send real-time notification via WebSocket
-        await manager.send_message_to_user(receiver_id, {
-            "type": "new_message",
-            "message": {
-                "id": msg_dict["id"],
-                "match_id": msg_dict["match_id"],
-                "sender_id": msg_dict["sender_id"],
-                "content": msg_dict["content"],
-                "sender_name": msg_dict["sender_name"],
-                "created_at": msg_dict["created_at"]
-            }
-        })
-        
-        # Send notification service alert
-        await send_message_notification(current_user["id"], receiver_id, message.content)
+        # WebSocket delivery and push notifications run after the response
+        event_bus.publish(MessageSent(msg_dict, current_user["name"], receiver_id))
         
         return new_message
         
@@ -252,13 +289,10 @@ async def get_unread_count(
                 detail="Match not found"
             )
         
-        # Count unread messages
-        unread_count = await db.fetchone(
-            "SELECT COUNT(*) as count FROM messages WHERE match_id = ? AND sender_id != ? AND is_read = FALSE",
-            (match_id, current_user["id"])
-        )
+        # Count messages above the read watermark
+        unread_count = await ReadReceiptService.unread_count(match_id, current_user["id"])
         
-        return {"unread_count": unread_count["count"]}
+        return {"unread_count": unread_count}
         
     except Exception as e:
         raise HTTPException(
@@ -6,6 +6,11 @@ from datetime import datetime
 from routes.auth import get_current_user
 from config.database import get_db
 from services.anti_scam_service import AntiScamService
+from services.inbox_service import InboxService
+from services.moderation_pipeline import moderation_pipeline
+from services.rate_limiter import rate_tracker
+from services.event_bus import event_bus
+from services.events import MessageSent
 
 router = APIRouter()
 
@@ -16,6 +21,7 @@ async def send_message(
     db = Depends(get_db)
 ):
     """Send message with enhanced features"""
+    rate_tracker.hit(current_user["id"], "message")
     try:
         match_id = message_data.get('match_id')
         content = message_data.get('content', '').strip()
@@ -39,17 +45,21 @@ async def send_message(
                 detail="Match not found"
             )
         
-        # Insert message
-        cursor = await db.execute("""
-            INSERT INTO messages (match_id, sender_id, content, message_type)
-            VALUES (?, ?, ?, ?)
-        """, (match_id, current_user["id"], content, message_type))
+        receiver_id = match["user1_id"] if match["user2_id"] == current_user["id"] else match["user2_id"]
         
-        message_id = cursor.lastrowid
-        await db.commit()
+        # Insert the message and update both inbox rows in one transaction
+        async with db.transaction():
+            created_message = await db.fetchone("""
+                INSERT INTO messages (match_id, sender_id, content, message_type)
+                VALUES (?, ?, ?, ?)
+                RETURNING *
+            """, (match_id, current_user["id"], content, message_type))
+            await InboxService.record_message(match_id, current_user["id"], receiver_id, dict(created_message))
+        moderation_pipeline.submit(created_message)
+        event_bus.publish(MessageSent(dict(created_message), current_user["name"], receiver_id))
         
         return {
-            "message_id": message_id,
+            "message_id": created_message["id"],
             "status": "sent"
         }
         
@@ -88,7 +98,10 @@ async def delete_message(
             )
         
         if for_everyone:
-            await db.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+            async with db.transaction():
+                await db.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+                # The deleted message may have been the inbox preview
+                await InboxService.refresh_match(message['match_id'])
         else:
             # Mark as deleted for current user only
             await db.execute(
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from pydantic import BaseModel
 from typing import List, Optional
 import json
 from datetime import datetime, timedelta
 from config.database import get_db
 from routes.auth import get_current_user
-from services.telegram_service import get_image_url
+from services.telegram_service import get_image_urls, parse_image_ids
+from services.pagination import decode_cursor, next_cursor, NEXT_CURSOR_HEADER
 
 router = APIRouter(prefix="/api/feed", tags=["feed"])
 
@@ -22,16 +23,21 @@ class FeedPost(BaseModel):
 
 @router.get("/posts", response_model=List[FeedPost])
 async def get_feed_posts(
+    response: Response,
     page: int = 1,
-    limit: int = 20,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Get feed posts with user photos"""
-    offset = (page - 1) * limit
+    """Get feed posts with user photos, newest first; pass X-Next-Cursor as `cursor` for the next page"""
+    before = decode_cursor(cursor, 2)
+    # page is kept for older clients; a cursor makes it irrelevant
+    offset = 0 if before else (page - 1) * limit
+    keyset = "AND (fp.created_at, fp.id) < (?, ?)" if before else ""
     
     # Get posts from users who have feed visibility enabled
-    posts = await db.fetchall("""
+    posts = await db.fetchall(f"""
         SELECT 
             fp.id,
             fp.user_id,
@@ -50,17 +56,23 @@ async def get_feed_posts(
         WHERE fp.is_active = 1 
         AND us.show_in_feed = 1 
         AND fp.user_id != ?
-        ORDER BY fp.created_at DESC
+        {keyset}
+        ORDER BY fp.created_at DESC, fp.id DESC
         LIMIT ? OFFSET ?
-    """, (current_user["id"], current_user["id"], current_user["id"], limit, offset))
+    """, (current_user["id"], current_user["id"], current_user["id"], *(before or ()), limit, offset))
+    
+    page_cursor = next_cursor(posts, limit, "created_at", "id")
+    if page_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page_cursor
+    
+    urls = await get_image_urls((post["image_file_id"] for post in posts), variant='card')
     
     feed_posts = []
     for post in posts:
-        image_url = await get_image_url(post["image_file_id"])
         feed_posts.append(FeedPost(
             id=post["id"],
             user_id=post["user_id"],
-            image_url=image_url,
+            image_url=urls[post["image_file_id"]],
             likes_count=post["likes_count"],
             is_liked=bool(post["is_liked"]),
             is_favorited=bool(post["is_favorited"]),
@@ -85,27 +97,27 @@ async def like_post(
     
     if existing_like:
         # Unlike
-        await db.execute("""
-            DELETE FROM feed_likes WHERE post_id = ? AND user_id = ?
-        """, (post_id, current_user["id"]))
-        
-        await db.execute("""
-            UPDATE feed_posts SET likes_count = likes_count - 1 WHERE id = ?
-        """, (post_id,))
+        async with db.transaction():
+            await db.execute("""
+                DELETE FROM feed_likes WHERE post_id = ? AND user_id = ?
+            """, (post_id, current_user["id"]))
+            
+            await db.execute("""
+                UPDATE feed_posts SET likes_count = likes_count - 1 WHERE id = ?
+            """, (post_id,))
         
-        await db.commit()
         return {"liked": False, "message": "Post unliked"}
     else:
         # Like
-        await db.execute("""
-            INSERT INTO feed_likes (post_id, user_id) VALUES (?, ?)
-        """, (post_id, current_user["id"]))
-        
-        await db.execute("""
-            UPDATE feed_posts SET likes_count = likes_count + 1 WHERE id = ?
-        """, (post_id,))
+        async with db.transaction():
+            await db.execute("""
+                INSERT INTO feed_likes (post_id, user_id) VALUES (?, ?)
+            """, (post_id, current_user["id"]))
+            
+            await db.execute("""
+                UPDATE feed_posts SET likes_count = likes_count + 1 WHERE id = ?
+            """, (post_id,))
         
-        await db.commit()
         return {"liked": True, "message": "Post liked"}
 
 @router.post("/posts/{post_id}/favorite")
@@ -136,12 +148,19 @@ async def favorite_post(
 
 @router.get("/favorites", response_model=List[FeedPost])
 async def get_favorites(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Get user's favorite posts"""
-    posts = await db.fetchall("""
+    """Get user's favorite posts, most recently saved first; pass X-Next-Cursor as `cursor` for the next page"""
+    before = decode_cursor(cursor, 2)
+    keyset = "AND (ff.created_at, ff.id) < (?, ?)" if before else ""
+    posts = await db.fetchall(f"""
         SELECT 
+            ff.id AS favorite_id,
+            ff.created_at AS favorited_at,
             fp.id,
             fp.user_id,
             fp.image_file_id,
@@ -155,16 +174,23 @@ async def get_favorites(
         JOIN feed_posts fp ON ff.post_id = fp.id
         JOIN users u ON fp.user_id = u.id
         WHERE ff.user_id = ? AND fp.is_active = 1
-        ORDER BY ff.created_at DESC
-    """, (current_user["id"],))
+        {keyset}
+        ORDER BY ff.created_at DESC, ff.id DESC
+        LIMIT ?
+    """, (current_user["id"], *(before or ()), limit))
+    
+    page_cursor = next_cursor(posts, limit, "favorited_at", "favorite_id")
+    if page_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page_cursor
+    
+    urls = await get_image_urls((post["image_file_id"] for post in posts), variant='card')
     
     favorites = []
     for post in posts:
-        image_url = await get_image_url(post["image_file_id"])
         favorites.append(FeedPost(
             id=post["id"],
             user_id=post["user_id"],
-            image_url=image_url,
+            image_url=urls[post["image_file_id"]],
             likes_count=post["likes_count"],
             is_liked=True,
             is_favorited=True,
@@ -199,12 +225,9 @@ async def get_post_user_profile(
         raise HTTPException(status_code=404, detail="User not found")
     
     # Get profile images
-    profile_images = []
-    if user["profile_images"]:
-        image_ids = json.loads(user["profile_images"])
-        for img_id in image_ids:
-            url = await get_image_url(img_id)
-            profile_images.append(url)
+    image_ids = parse_image_ids(user["profile_images"])
+    urls = await get_image_urls(image_ids, variant='full')
+    profile_images = [urls[img_id] for img_id in image_ids]
     
     return {
         "id": user["id"],
@@ -230,17 +253,17 @@ async def refresh_user_posts(
     if not user or not user["profile_images"]:
         return {"message": "No profile images found"}
     
-    # Clear existing posts
-    await db.execute("""
-        UPDATE feed_posts SET is_active = 0 WHERE user_id = ?
-    """, (current_user["id"],))
-    
-    # Add new posts from profile images
     image_ids = json.loads(user["profile_images"])
-    for img_id in image_ids:
+    async with db.transaction():
+        # Clear existing posts
         await db.execute("""
-            INSERT INTO feed_posts (user_id, image_file_id) VALUES (?, ?)
-        """, (current_user["id"], img_id))
+            UPDATE feed_posts SET is_active = 0 WHERE user_id = ?
+        """, (current_user["id"],))
+        
+        # Add new posts from profile images
+        for img_id in image_ids:
+            await db.execute("""
+                INSERT INTO feed_posts (user_id, image_file_id) VALUES (?, ?)
+            """, (current_user["id"], img_id))
     
-    await db.commit()
     return {"message": f"Added {len(image_ids)} posts to feed"}
\ No newline at end of file
@@ -1,14 +1,63 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from typing import List, Optional
 import json
 
-from models.schemas import SwipeCreate, SwipeResponse, Match, UserProfile
+from models.schemas import SwipeCreate, SwipeResponse, SwipeBatch, SwipeResult, SwipeBatchResponse, Match, UserProfile
 from routes.auth import get_current_user
 from config.database import get_db
-from services.notification_service import send_match_notification
+from services.inbox_service import InboxService
+from services.rate_limiter import rate_tracker
+from services.event_bus import event_bus
+from services.events import MatchCreated
+from services.pagination import decode_cursor, next_cursor, NEXT_CURSOR_HEADER
 
 router = APIRouter()
 
+async def _record_swipe(db, swiper_id: int, swiped_id: int, is_like: bool):
+    """Store a swipe and create the match if it is mutual.
+    
+    Must run inside db.transaction(). Returns (is_match, match_id, is_new_match).
+    """
+    # Insert, or revive a previously undone swipe; no row back means the
+    # user already swiped on this person
+    swipe_row = await db.fetchone("""
+        INSERT INTO swipes (swiper_id, swiped_id, is_like) VALUES (?, ?, ?)
+        ON CONFLICT(swiper_id, swiped_id) DO UPDATE SET
+            is_like = excluded.is_like, is_undone = 0, created_at = CURRENT_TIMESTAMP
+        WHERE swipes.is_undone = 1
+        RETURNING id
+    """, (swiper_id, swiped_id, is_like))
+    
+    if not swipe_row or not is_like:
+        return False, None, False
+    
+    # Mutual like and existing match in one lookup
+    state = await db.fetchone("""
+        SELECT
+            EXISTS(
+                SELECT 1 FROM swipes
+                WHERE swiper_id = ? AND swiped_id = ? AND is_like = 1
+                AND (is_undone = 0 OR is_undone IS NULL)
+            ) AS is_mutual,
+            (
+                SELECT id FROM matches
+                WHERE (user1_id = ? AND user2_id = ?) OR (user1_id = ? AND user2_id = ?)
+            ) AS match_id
+    """, (swiped_id, swiper_id, swiper_id, swiped_id, swiped_id, swiper_id))
+    
+    if not state["is_mutual"]:
+        return False, None, False
+    
+    if state["match_id"]:
+        return True, state["match_id"], False
+    
+    match_row = await db.fetchone(
+        "INSERT INTO matches (user1_id, user2_id) VALUES (?, ?) RETURNING id",
+        (swiper_id, swiped_id)
+    )
+    await InboxService.open_match(match_row["id"], swiper_id, swiped_id)
+    return True, match_row["id"], True
+
 @router.post("/swipe", response_model=SwipeResponse)
 async def swipe_user(
     swipe: SwipeCreate,
@@ -16,90 +65,17 @@ async def swipe_user(
     db = Depends(get_db)
 ):
     """Swipe on a user (like or pass)"""
+    rate_tracker.hit(current_user["id"], "swipe")
     try:
-        print(f"\n=== SWIPE REQUEST ===")
-        print(f"Swiper: {current_user['id']}")
-        print(f"Swiped: {swipe.swiped_user_id}")
-        print(f"Is Like: {swipe.is_like}")
-        
-        # Check if already swiped (including undone)
-        existing = await db.fetchone(
-            "SELECT * FROM swipes WHERE swiper_id = ? AND swiped_id = ?",
-            (current_user["id"], swipe.swiped_user_id)
-        )
-        
-        if existing:
-            print(f"Already swiped: {dict(existing)}")
-            # If undone, update the existing swipe
-            if existing['is_undone'] == 1:
-                await db.execute(
-                    "UPDATE swipes SET is_like = ?, is_undone = 0, created_at = CURRENT_TIMESTAMP WHERE id = ?",
-                    (swipe.is_like, existing['id'])
-                )
-                await db.commit()
-                print(f"Updated existing undone swipe")
-            else:
-                return SwipeResponse(is_match=False, match_id=None)
-        else:
-            # Store new swipe
-            await db.execute(
-                "INSERT INTO swipes (swiper_id, swiped_id, is_like) VALUES (?, ?, ?)",
-                (current_user["id"], swipe.swiped_user_id, swipe.is_like)
+        async with db.transaction():
+            is_match, match_id, is_new_match = await _record_swipe(
+                db, current_user["id"], swipe.swiped_user_id, swipe.is_like
             )
-            await db.commit()
-            print(f"New swipe saved successfully")
         
-        # Check for mutual like (match)
-        is_match = False
-        match_id = None
-        
-        if swipe.is_like:
-            mutual_like = await db.fetchone(
-                "SELECT * FROM swipes WHERE swiper_id = ? AND swiped_id = ? AND is_like = 1 AND (is_undone = 0 OR is_undone IS NULL)",
-                (swipe.swiped_user_id, current_user["id"])
-            )
-            
-            if mutual_like:
-                # Check if match already exists
-                existing_match = await db.fetchone(
-                    "SELECT * FROM matches WHERE (user1_id = ? AND user2_id = ?) OR (user1_id = ? AND user2_id = ?)",
-                    (current_user["id"], swipe.swiped_user_id, swipe.swiped_user_id, current_user["id"])
-                )
-                
-                if not existing_match:
-                    # Create match
-                    cursor = await db.execute(
-                        "INSERT INTO matches (user1_id, user2_id) VALUES (?, ?)",
-                        (current_user["id"], swipe.swiped_user_id)
-                    )
-                    match_id = cursor.lastrowid
-                    await db.commit()
-                    is_match = True
-                    
-                    # Send notification service alert
-                    await send_match_notification(current_user["id"], swipe.swiped_user_id)
-                    
-                    # Send FCM notification
-                    from services.fcm_notification_service import fcm_service
-                    other_user = await db.fetchone("SELECT fcm_token, name FROM users WHERE id = ?", (swipe.swiped_user_id,))
-                    print(f"\n=== MATCH NOTIFICATION ===")
-                    print(f"Other user: {other_user}")
-                    if other_user and other_user['fcm_token']:
-                        print(f"Sending FCM to token: {other_user['fcm_token'][:20]}...")
-                        result = await fcm_service.send_match_notification(
-                            fcm_token=other_user['fcm_token'],
-                            matched_user_name=current_user['name']
-                        )
-                        print(f"FCM result: {result}")
-                    else:
-                        print(f"No FCM token for user {swipe.swiped_user_id}")
-                    print(f"=== END MATCH NOTIFICATION ===")
-                else:
-                    match_id = existing_match['id']
-                    is_match = True
+        if is_new_match:
+            event_bus.publish(MatchCreated(match_id, current_user["id"], current_user["name"], swipe.swiped_user_id))
         
-        print(f"Final result - Match: {is_match}, Match ID: {match_id}")
-        print(f"=== END SWIPE ===")
+        print(f"Swipe {current_user['id']} -> {swipe.swiped_user_id} (like={swipe.is_like}): match={is_match}, match_id={match_id}")
         return SwipeResponse(is_match=is_match, match_id=match_id)
         
     except Exception as e:
@@ -109,76 +85,115 @@ async def swipe_user(
             detail=f"Failed to process swipe: {str(e)}"
         )
 
+@router.post("/swipes/batch", response_model=SwipeBatchResponse)
+async def swipe_batch(
+    batch: SwipeBatch,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Apply swipes the app queued while offline, in order, as one transaction"""
+    rate_tracker.hit(current_user["id"], "swipe", cost=len(batch.swipes))
+    try:
+        matches = []
+        new_matches = []
+        
+        async with db.transaction():
+            for swipe in batch.swipes:
+                is_match, match_id, is_new_match = await _record_swipe(
+                    db, current_user["id"], swipe.swiped_user_id, swipe.is_like
+                )
+                if is_match:
+                    matches.append(SwipeResult(
+                        swiped_user_id=swipe.swiped_user_id,
+                        is_match=True,
+                        match_id=match_id
+                    ))
+                if is_new_match:
+                    new_matches.append(MatchCreated(
+                        match_id, current_user["id"], current_user["name"], swipe.swiped_user_id
+                    ))
+        
+        for event in new_matches:
+            event_bus.publish(event)
+        
+        print(f"Swipe batch from {current_user['id']}: {len(batch.swipes)} swipes, {len(matches)} matches")
+        return SwipeBatchResponse(processed=len(batch.swipes), matches=matches)
+        
+    except Exception as e:
+        print(f"Swipe batch error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process swipes: {str(e)}"
+        )
+
 @router.get("/")
 async def get_matches(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Get all matches for current user"""
+    """Get matches for current user, newest first; pass X-Next-Cursor as `cursor` for the next page"""
+    before = decode_cursor(cursor, 2)
     try:
-        from services.telegram_service import get_image_url
+        from services.telegram_service import get_image_urls, parse_image_ids, PLACEHOLDER_URL
         
-        matches = await db.fetchall("""
-            SELECT 
-                m.*,
-                u1.id as user1_id, u1.name as user1_name, u1.age as user1_age,
-                u1.bio as user1_bio, u1.profile_images as user1_images,
-                u2.id as user2_id, u2.name as user2_name, u2.age as user2_age,
-                u2.bio as user2_bio, u2.profile_images as user2_images
-            FROM matches m
-            JOIN users u1 ON m.user1_id = u1.id
-            JOIN users u2 ON m.user2_id = u2.id
-            WHERE m.user1_id = ? OR m.user2_id = ?
-            ORDER BY m.created_at DESC
-        """, (current_user["id"], current_user["id"]))
+        # One index range per side instead of an OR over both columns; each
+        # side is limited before the merge
+        keyset = "AND (created_at, id) < (?, ?)" if before else ""
+        side_params = (current_user["id"], *(before or ()), limit)
+        matches = await db.fetchall(f"""
+            SELECT m.id, m.created_at, u.id AS other_id, u.name, u.age, u.bio, u.profile_images
+            FROM (
+                SELECT * FROM (
+                    SELECT id, created_at, user2_id AS other_id FROM matches
+                    WHERE user1_id = ? {keyset}
+                    ORDER BY created_at DESC, id DESC LIMIT ?
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT id, created_at, user1_id AS other_id FROM matches
+                    WHERE user2_id = ? {keyset}
+                    ORDER BY created_at DESC, id DESC LIMIT ?
+                )
+            ) m
+            JOIN users u ON u.id = m.other_id
+            ORDER BY m.created_at DESC, m.id DESC
+            LIMIT ?
+        """, (*side_params, *side_params, limit))
+        
+        page_cursor = next_cursor(matches, limit, "created_at", "id")
+        if page_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = page_cursor
         
         match_list = []
         for match in matches:
             match_dict = dict(match)
             
-            if match_dict["user1_id"] == current_user["id"]:
-                other_user_data = {
-                    "id": match_dict["user2_id"],
-                    "name": match_dict["user2_name"],
-                    "age": match_dict["user2_age"],
-                    "bio": match_dict["user2_bio"],
-                    "profile_images": match_dict["user2_images"]
-                }
-            else:
-                other_user_data = {
-                    "id": match_dict["user1_id"],
-                    "name": match_dict["user1_name"],
-                    "age": match_dict["user1_age"],
-                    "bio": match_dict["user1_bio"],
-                    "profile_images": match_dict["user1_images"]
-                }
-            
-            profile_images = json.loads(other_user_data["profile_images"])
-            image_urls = []
-            for file_id in profile_images[:1]:
-                try:
-                    url = await get_image_url(file_id)
-                    image_urls.append(url)
-                except:
-                    image_urls.append("https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink")
-            
-            if not image_urls:
-                image_urls = ["https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink"]
-            
             match_data = {
                 "id": match_dict["id"],
                 "other_user": {
-                    "id": other_user_data["id"],
-                    "name": other_user_data["name"],
-                    "age": other_user_data["age"],
-                    "bio": other_user_data["bio"],
-                    "profile_images": image_urls
+                    "id": match_dict["other_id"],
+                    "name": match_dict["name"],
+                    "age": match_dict["age"],
+                    "bio": match_dict["bio"],
+                    # file_ids for now, resolved below in one batch
+                    "profile_images": parse_image_ids(match_dict["profile_images"])[:1]
                 },
                 "created_at": match_dict["created_at"]
             }
             
             match_list.append(match_data)
         
+        urls = await get_image_urls(
+            (file_id for match in match_list for file_id in match["other_user"]["profile_images"]),
+            variant='avatar'
+        )
+        for match in match_list:
+            other_user = match["other_user"]
+            other_user["profile_images"] = [urls[file_id] for file_id in other_user["profile_images"]] or [PLACEHOLDER_URL]
+        
         return match_list
         
     except Exception as e:
@@ -209,9 +224,11 @@ async def unmatch_user(
             )
         
         # Delete match and related messages
-        await db.execute("DELETE FROM messages WHERE match_id = ?", (match_id,))
-        await db.execute("DELETE FROM matches WHERE id = ?", (match_id,))
-        await db.commit()
+        async with db.transaction():
+            await db.execute("DELETE FROM messages WHERE match_id = ?", (match_id,))
+            await db.execute("DELETE FROM read_watermarks WHERE match_id = ?", (match_id,))
+            await db.execute("DELETE FROM inbox_entries WHERE match_id = ?", (match_id,))
+            await db.execute("DELETE FROM matches WHERE id = ?", (match_id,))
         
         return {"message": "Successfully unmatched"}
         
@@ -274,16 +291,18 @@ async def undo_last_swipe(
 
 @router.get("/who-liked-me")
 async def who_liked_me(
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Get users who liked you"""
+    """Get users who liked you, most recent first; pass next_cursor as `cursor` for the next page"""
+    before = decode_cursor(cursor, 2)
     try:
-        from services.telegram_service import get_image_url
+        from services.telegram_service import get_image_urls, parse_image_ids, PLACEHOLDER_URL
         
-        # Get users who liked current user (but current user hasn't swiped yet)
-        likes = await db.fetchall("""
-            SELECT u.id, u.name, u.age, u.bio, u.profile_images, s.created_at as liked_at
+        # Users who liked current user (but current user hasn't swiped yet)
+        likers = """
             FROM swipes s
             JOIN users u ON s.swiper_id = u.id
             WHERE s.swiped_id = ? AND s.is_like = 1 AND s.is_undone = 0
@@ -291,24 +310,28 @@ async def who_liked_me(
                 SELECT 1 FROM swipes s2 
                 WHERE s2.swiper_id = ? AND s2.swiped_id = u.id
             )
-            ORDER BY s.created_at DESC
-        """, (current_user["id"], current_user["id"]))
+        """
+        keyset = "AND (s.created_at, s.id) < (?, ?)" if before else ""
+        likes = await db.fetchall(f"""
+            SELECT u.id, u.name, u.age, u.bio, u.profile_images, s.id as swipe_id, s.created_at as liked_at
+            {likers}
+            {keyset}
+            ORDER BY s.created_at DESC, s.id DESC
+            LIMIT ?
+        """, (current_user["id"], current_user["id"], *(before or ()), limit))
+        
+        # "count" is every liker, not just this page
+        total = await db.fetchone(
+            f"SELECT COUNT(*) AS count {likers}", (current_user["id"], current_user["id"])
+        )
+        
+        first_images = [parse_image_ids(user["profile_images"])[:1] for user in likes]
+        urls = await get_image_urls((file_id for ids in first_images for file_id in ids), variant='avatar')
         
         users_list = []
-        for user in likes:
+        for user, image_ids in zip(likes, first_images):
             user_dict = dict(user)
-            profile_images = json.loads(user_dict.get("profile_images", "[]"))
-            image_urls = []
-            
-            if profile_images:
-                for file_id in profile_images[:1]:
-                    try:
-                        url = await get_image_url(file_id)
-                        image_urls.append(url)
-                    except:
-                        image_urls.append("https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink")
-            else:
-                image_urls.append("https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink")
+            image_urls = [urls[file_id] for file_id in image_ids] or [PLACEHOLDER_URL]
             
             users_list.append({
                 "id": user_dict["id"],
@@ -320,8 +343,9 @@ async def who_liked_me(
             })
         
         return {
-            "count": len(users_list),
-            "users": users_list
+            "count": total["count"],
+            "users": users_list,
+            "next_cursor": next_cursor(likes, limit, "liked_at", "swipe_id")
         }
         
     except Exception as e:
@@ -0,0 +1,159 @@
+import re
+from typing import Optional, Tuple
+
+import anyio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+from starlette.background import BackgroundTask
+
+from services.media_cache import media_cache
+from services.media_storage import media_storage
+
+router = APIRouter()
+
+# Storage keys (sha256 hex) and legacy Telegram file_ids (URL-safe base64)
+FILE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{10,256}$")
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+class ReleasingResponse(Response):
+    """A response whose background task runs even if sending fails.
+
+    Starlette skips the background task when the send raises (e.g. the
+    client disconnected), which would leak a cache reader.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self._send(scope, send)
+        finally:
+            if self.background is not None:
+                await self.background()
+
+    async def _send(self, scope, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await send({"type": "http.response.body", "body": self.body})
+
+class MediaFileResponse(ReleasingResponse):
+    """Serves a byte range of a cached file.
+
+    Uses the ASGI zero-copy (sendfile) extension when the server offers it
+    and falls back to chunked reads otherwise. The background task runs once
+    the body is sent or the client goes away.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: str, start: int, length: int, status_code: int,
+                 headers: dict, send_body: bool = True, background: Optional[BackgroundTask] = None):
+        super().__init__(status_code=status_code, headers=headers, background=background)
+        self.path = path
+        self.start = start
+        self.length = length
+        self.send_body = send_body
+
+    async def _send(self, scope, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body or self.length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "offset": self.start,
+                    "count": self.length,
+                })
+            return
+
+        async with await anyio.open_file(self.path, "rb") as file:
+            await file.seek(self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) inclusive for a single byte range; None for the whole file.
+
+    Raises ValueError for a range that cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[6:].strip().partition("-")
+    if not start_text:
+        # Suffix range: the last N bytes
+        if not end_text.isdigit() or int(end_text) == 0:
+            raise ValueError(header)
+        return max(0, size - int(end_text)), size - 1
+    if not start_text.isdigit() or (end_text and not end_text.isdigit()):
+        return None
+    start = int(start_text)
+    end = min(int(end_text), size - 1) if end_text else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+@router.api_route("/media/{file_id}", methods=["GET", "HEAD"])
+async def get_media(file_id: str, request: Request):
+    """Serve an uploaded image from local storage or the media cache"""
+    if not FILE_ID_PATTERN.match(file_id) or file_id.startswith("placeholder_"):
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    release = None
+    try:
+        # Local storage is served in place; remote objects go through the cache
+        media = await media_storage.local_media(file_id)
+        if media is None:
+            media = await media_cache.get(file_id)
+            if media is not None:
+                # Keeps the blob from being evicted until the response is done with it
+                release = BackgroundTask(media_cache.release, media.sha256)
+    except Exception as e:
+        print(f"❌ Media fetch failed for {file_id[:50]}: {e}")
+        raise HTTPException(status_code=502, detail="Failed to fetch media")
+
+    if media is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    etag = f'"{media.sha256}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return ReleasingResponse(status_code=304, headers=headers, background=release)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        range_header = None
+
+    try:
+        byte_range = parse_range(range_header, media.size)
+    except ValueError:
+        return ReleasingResponse(status_code=416, headers={**headers, "Content-Range": f"bytes */{media.size}"}, background=release)
+
+    send_body = request.method != "HEAD"
+    if byte_range is None:
+        headers.update({"Content-Type": media.content_type, "Content-Length": str(media.size)})
+        return MediaFileResponse(media.path, 0, media.size, 200, headers, send_body, release)
+
+    start, end = byte_range
+    length = end - start + 1
+    headers.update({
+        "Content-Type": media.content_type,
+        "Content-Length": str(length),
+        "Content-Range": f"bytes {start}-{end}/{media.size}",
+    })
+    return MediaFileResponse(media.path, start, length, 206, headers, send_body, release)
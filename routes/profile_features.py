@@ -190,21 +190,21 @@ async def share_location(
     # Calculate expiry
     expires_at = datetime.now() + timedelta(hours=duration_hours)
     
-    # Deactivate old shares
-    await db.execute(
-        "UPDATE location_shares SET is_active = FALSE WHERE user_id = ? AND shared_with_user_id = ?",
-        (current_user["id"], shared_with_user_id)
-    )
-    
-    # Create new share
-    await db.execute(
-        """INSERT INTO location_shares 
-        (user_id, shared_with_user_id, latitude, longitude, expires_at, emergency_contact_name, emergency_contact_phone)
-        VALUES (?, ?, ?, ?, ?, ?, ?)""",
-        (current_user["id"], shared_with_user_id, latitude, longitude, expires_at.isoformat(), 
-         emergency_contact_name, emergency_contact_phone)
-    )
-    await db.commit()
+    async with db.transaction():
+        # Deactivate old shares
+        await db.execute(
+            "UPDATE location_shares SET is_active = FALSE WHERE user_id = ? AND shared_with_user_id = ?",
+            (current_user["id"], shared_with_user_id)
+        )
+        
+        # Create new share
+        await db.execute(
+            """INSERT INTO location_shares 
+            (user_id, shared_with_user_id, latitude, longitude, expires_at, emergency_contact_name, emergency_contact_phone)
+            VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (current_user["id"], shared_with_user_id, latitude, longitude, expires_at.isoformat(), 
+             emergency_contact_name, emergency_contact_phone)
+        )
     
     return {
         "message": "Location shared successfully",
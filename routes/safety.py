@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from routes.auth import get_current_user
 from services.anti_scam_service import AntiScamService
+from services.rate_limiter import rate_tracker
 
 router = APIRouter()
 
@@ -16,6 +17,7 @@ async def report_user(
     current_user: dict = Depends(get_current_user)
 ):
     """Report a user for suspicious behavior"""
+    rate_tracker.hit(current_user["id"], "report")
     try:
         await AntiScamService.flag_user(
             request.reported_user_id,
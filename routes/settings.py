@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from typing import Optional
 from config.database import get_db
 from routes.auth import get_current_user
+from services.auth_cache import principal_cache
 
 router = APIRouter(prefix="/api/settings", tags=["settings"])
 
@@ -67,12 +68,6 @@ async def update_user_settings(
         SELECT id FROM user_settings WHERE user_id = ?
     """, (current_user["id"],))
     
-    if not existing:
-        # Create default settings first
-        await db.execute("""
-            INSERT INTO user_settings (user_id) VALUES (?)
-        """, (current_user["id"],))
-    
     # Update settings
     update_fields = []
     params = []
@@ -103,8 +98,15 @@ async def update_user_settings(
             WHERE user_id = ?
         """
         
-        await db.execute(query, params)
-        await db.commit()
+    async with db.transaction():
+        if not existing:
+            # Create default settings first
+            await db.execute("""
+                INSERT INTO user_settings (user_id) VALUES (?)
+            """, (current_user["id"],))
+        
+        if update_fields:
+            await db.execute(query, params)
     
     return {"message": "Settings updated successfully"}
 
@@ -153,7 +155,7 @@ async def change_password(
         SELECT password_hash FROM users WHERE id = ?
     """, (current_user["id"],))
     
-    if not verify_password(request.current_password, user["password_hash"]):
+    if not await verify_password(request.current_password, user["password_hash"]):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
     # Validate new password
@@ -161,11 +163,12 @@ async def change_password(
         raise HTTPException(status_code=400, detail="New password must be at least 6 characters")
     
     # Update password
-    new_hash = get_password_hash(request.new_password)
+    new_hash = await get_password_hash(request.new_password)
     await db.execute("""
         UPDATE users SET password_hash = ? WHERE id = ?
     """, (new_hash, current_user["id"]))
     await db.commit()
+    principal_cache.invalidate(current_user["id"])
     
     return {"message": "Password changed successfully"}
 
@@ -177,16 +180,22 @@ async def delete_account(
     """Delete user account permanently"""
     try:
         # Delete user data in order (foreign key constraints)
-        await db.execute("DELETE FROM feed_likes WHERE user_id = ?", (current_user["id"],))
-        await db.execute("DELETE FROM feed_favorites WHERE user_id = ?", (current_user["id"],))
-        await db.execute("DELETE FROM feed_posts WHERE user_id = ?", (current_user["id"],))
-        await db.execute("DELETE FROM user_settings WHERE user_id = ?", (current_user["id"],))
-        await db.execute("DELETE FROM messages WHERE sender_id = ?", (current_user["id"],))
-        await db.execute("DELETE FROM matches WHERE user1_id = ? OR user2_id = ?", (current_user["id"], current_user["id"]))
-        await db.execute("DELETE FROM swipes WHERE swiper_id = ? OR swiped_id = ?", (current_user["id"], current_user["id"]))
-        await db.execute("DELETE FROM profile_views WHERE viewer_id = ? OR viewed_id = ?", (current_user["id"], current_user["id"]))
-        await db.execute("DELETE FROM users WHERE id = ?", (current_user["id"],))
-        await db.commit()
+        async with db.transaction():
+            await db.execute("DELETE FROM feed_likes WHERE user_id = ?", (current_user["id"],))
+            await db.execute("DELETE FROM feed_favorites WHERE user_id = ?", (current_user["id"],))
+            await db.execute("DELETE FROM feed_posts WHERE user_id = ?", (current_user["id"],))
+            await db.execute("DELETE FROM user_settings WHERE user_id = ?", (current_user["id"],))
+            # Both sides of the user's conversations go with their matches
+            user_matches = "SELECT id FROM matches WHERE user1_id = ? OR user2_id = ?"
+            await db.execute(f"DELETE FROM messages WHERE match_id IN ({user_matches})", (current_user["id"], current_user["id"]))
+            await db.execute(f"DELETE FROM read_watermarks WHERE match_id IN ({user_matches})", (current_user["id"], current_user["id"]))
+            await db.execute("DELETE FROM notification_outbox WHERE user_id = ?", (current_user["id"],))
+            await db.execute("DELETE FROM inbox_entries WHERE user_id = ? OR partner_id = ?", (current_user["id"], current_user["id"]))
+            await db.execute("DELETE FROM matches WHERE user1_id = ? OR user2_id = ?", (current_user["id"], current_user["id"]))
+            await db.execute("DELETE FROM swipes WHERE swiper_id = ? OR swiped_id = ?", (current_user["id"], current_user["id"]))
+            await db.execute("DELETE FROM profile_views WHERE viewer_id = ? OR viewed_id = ?", (current_user["id"], current_user["id"]))
+            await db.execute("DELETE FROM users WHERE id = ?", (current_user["id"],))
+        principal_cache.invalidate(current_user["id"])
         
         return {"message": "Account deleted successfully"}
     except Exception as e:
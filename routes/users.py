@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from typing import List, Optional, Dict
+import asyncio
 import json
 
 from models.schemas import UserProfile, UserUpdate, ImageUpload
@@ -10,25 +11,28 @@ from services.matching_service import MatchingService
 from services.photo_privacy_service import PhotoPrivacyService
 from services.anti_scam_service import AntiScamService
 from services.compatibility_service import CompatibilityService
+from services.event_bus import event_bus
+from services.events import ProfileUpdated
+from services.auth_cache import principal_cache
 from services.filter_service import FilterService
+from services.discovery_service import discovery_deck_service
+from services.geo_index import geo_index
 
 router = APIRouter()
 
+def _changed_fields(update_fields: list) -> frozenset:
+    """Column names from "column = ?" assignments, for ProfileUpdated"""
+    return frozenset(field.split(" = ")[0] for field in update_fields)
+
 @router.get("/profile", response_model=UserProfile)
 async def get_profile(current_user: dict = Depends(get_current_user)):
     """Get current user profile"""
-    from services.telegram_service import get_image_url
-    from services.telegram_service import get_image_url
+    from services.telegram_service import get_image_urls, parse_image_ids
     
     # Convert file_ids to URLs
-    profile_images = json.loads(current_user["profile_images"])
-    image_urls = []
-    for file_id in profile_images:
-        try:
-            url = await get_image_url(file_id)
-            image_urls.append(url)
-        except:
-            image_urls.append("https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink")
+    profile_images = parse_image_ids(current_user["profile_images"])
+    urls = await get_image_urls(profile_images, variant='full')
+    image_urls = [urls[file_id] for file_id in profile_images]
     
     return UserProfile(
         id=current_user["id"],
@@ -95,17 +99,29 @@ async def update_profile(
         update_values.append(json.dumps(profile_update.preferences))
     
     if update_fields:
+        changed = _changed_fields(update_fields)
         update_fields.append("updated_at = CURRENT_TIMESTAMP")
         update_values.append(current_user["id"])
         
         query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = ?"
         await db.execute(query, tuple(update_values))
         await db.commit()
+        principal_cache.invalidate(current_user["id"])
+        event_bus.publish(ProfileUpdated(current_user["id"], changed))
     
     # Get updated user
     updated_user = await db.fetchone("SELECT * FROM users WHERE id = ?", (current_user["id"],))
     user_dict = dict(updated_user)
     
+    if profile_update.latitude is not None or profile_update.longitude is not None:
+        if user_dict.get("latitude") is not None and user_dict.get("longitude") is not None:
+            # Manual edits move the user but keep the last GPS fix time
+            previous = geo_index.position(current_user["id"])
+            geo_index.update(
+                current_user["id"], user_dict["latitude"], user_dict["longitude"],
+                updated_at=previous[2] if previous else 0.0
+            )
+    
     return UserProfile(
         id=user_dict["id"],
         email=user_dict["email"],
@@ -145,23 +161,58 @@ async def upload_profile_image(
         # Check if it's base64 or file_id
         file_id = image_data.telegram_file_id
         
-        # If it looks like base64, upload to Telegram
+        # If it looks like base64, process it and upload the variants
         if len(file_id) > 100:  # Base64 is much longer than file_id
-            from services.telegram_service import upload_image_to_telegram
-            file_id = await upload_image_to_telegram(file_id, is_base64=True)
+            import base64
+            from services.image_pipeline import image_pipeline
+            if 'base64,' in file_id:
+                file_id = file_id.split('base64,')[1]
+            file_id = await image_pipeline.process_and_store(base64.b64decode(file_id))
         
-        current_images.append(file_id)
+        if file_id not in current_images:
+            current_images.append(file_id)
+            await _save_profile_images(db, current_user["id"], current_images)
+            _profile_images_committed(current_user["id"])
         
-        # Update database
-        await db.execute(
-            "UPDATE users SET profile_images = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (json.dumps(current_images), current_user["id"])
+        return {
+            "message": "Image uploaded successfully",
+            "image_count": len(current_images),
+            "file_id": file_id
+        }
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to upload image: {str(e)}"
         )
-        await db.commit()
+
+@router.post("/upload-image/file")
+async def upload_profile_image_file(
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Add a profile image sent as a multipart file (field name is free)"""
+    from services.upload_service import read_image_uploads
+    from services.image_pipeline import image_pipeline
+    
+    current_images = json.loads(current_user["profile_images"])
+    if len(current_images) >= 6:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Maximum 6 images allowed"
+        )
+    
+    # Size and type are enforced while the body streams in
+    images = await read_image_uploads(request, max_files=1)
+    
+    try:
+        file_id = await image_pipeline.process_and_store(images[0].data)
         
-        # Auto-refresh feed posts
-        from services.feed_service import feed_service
-        await feed_service.refresh_user_feed_posts(current_user["id"], current_images)
+        if file_id not in current_images:
+            current_images.append(file_id)
+            await _save_profile_images(db, current_user["id"], current_images)
+            _profile_images_committed(current_user["id"])
         
         return {
             "message": "Image uploaded successfully",
@@ -175,6 +226,75 @@ async def upload_profile_image(
             detail=f"Failed to upload image: {str(e)}"
         )
 
+@router.post("/upload-images")
+async def upload_profile_images(
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Add several profile images in one multipart request"""
+    from services.upload_service import read_image_uploads
+    from services.image_pipeline import image_pipeline
+    
+    current_images = json.loads(current_user["profile_images"])
+    free_slots = 6 - len(current_images)
+    if free_slots <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Maximum 6 images allowed"
+        )
+    
+    images = await read_image_uploads(request, max_files=free_slots)
+    
+    try:
+        # All images are processed and uploaded concurrently; identical bytes
+        # (in this batch or uploaded before) resolve to the same file_id
+        file_ids = await asyncio.gather(*(
+            image_pipeline.process_and_store(image.data) for image in images
+        ))
+        
+        async with db.transaction():
+            # Re-read inside the transaction so concurrent uploads are not lost
+            row = await db.fetchone("SELECT profile_images FROM users WHERE id = ?", (current_user["id"],))
+            profile_images = json.loads(row["profile_images"] or "[]")
+            added = [file_id for file_id in dict.fromkeys(file_ids) if file_id not in profile_images]
+            profile_images = (profile_images + added)[:6]
+            await _save_profile_images(db, current_user["id"], profile_images)
+        _profile_images_committed(current_user["id"])
+        
+        return {
+            "message": f"{len(added)} images uploaded successfully",
+            "image_count": len(profile_images),
+            "file_ids": list(file_ids),
+            "added": added,
+            "duplicates": len(file_ids) - len(added)
+        }
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to upload images: {str(e)}"
+        )
+
+async def _save_profile_images(db, user_id: int, profile_images: list):
+    """Store the image list.
+    
+    Callers run _profile_images_committed once the write has committed,
+    i.e. after their db.transaction() block when there is one; its
+    ProfileUpdated handler rebuilds the feed posts.
+    """
+    await db.execute(
+        "UPDATE users SET profile_images = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        (json.dumps(profile_images), user_id)
+    )
+
+def _profile_images_committed(user_id: int):
+    """Drop the cached principal and publish ProfileUpdated; only after the image write commits"""
+    principal_cache.invalidate(user_id)
+    
+    # Feed posts are rebuilt from the new images after the response
+    event_bus.publish(ProfileUpdated(user_id, frozenset({"profile_images"})))
+
 @router.delete("/image/{image_index}")
 async def delete_profile_image(
     image_index: int,
@@ -200,10 +320,10 @@ async def delete_profile_image(
             (json.dumps(current_images), current_user["id"])
         )
         await db.commit()
+        principal_cache.invalidate(current_user["id"])
         
-        # Auto-refresh feed posts
-        from services.feed_service import feed_service
-        await feed_service.refresh_user_feed_posts(current_user["id"], current_images)
+        # Feed posts are rebuilt from the new images after the response
+        event_bus.publish(ProfileUpdated(current_user["id"], frozenset({"profile_images"})))
         
         return {
             "message": "Image deleted successfully",
@@ -223,47 +343,26 @@ async def discover_users(
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Simple user discovery"""
+    """Next users from the precomputed discovery deck"""
     try:
-        from services.telegram_service import get_image_url
+        from services.telegram_service import get_image_urls, parse_image_ids, PLACEHOLDER_URL
         
         print(f"\n=== DISCOVER REQUEST ===")
         print(f"Current user ID: {current_user['id']}")
         print(f"Limit: {limit}")
         
-        users = await db.fetchall("""
-            SELECT id, name, age, bio, location, profile_images, interests, relationship_intent
-            FROM users 
-            WHERE id != ? AND is_blocked = 0
-            LIMIT ?
-        """, (current_user["id"], limit))
+        users = await discovery_deck_service.next_candidates(current_user["id"], limit)
+        
+        print(f"Found {len(users)} users in discovery deck")
         
-        print(f"Found {len(users)} users in database")
+        # Resolve every image of the page in one concurrent batch
+        image_ids = {user['id']: parse_image_ids(user.get("profile_images"))[:3] for user in users}
+        urls = await get_image_urls((file_id for ids in image_ids.values() for file_id in ids), variant='card')
         
         user_list = []
         for user in users:
             user_dict = dict(user)
-            print(f"Processing user: {user_dict['name']} (ID: {user_dict['id']})")
-            
-            # Convert file_ids to URLs
-            profile_images = json.loads(user_dict.get("profile_images", "[]"))
-            image_urls = []
-            
-            if profile_images:
-                print(f"  Found {len(profile_images)} images")
-                for file_id in profile_images[:3]:
-                    try:
-                        url = await get_image_url(file_id)
-                        image_urls.append(url)
-                        print(f"  Image URL: {url[:50]}...")
-                    except Exception as e:
-                        print(f"  Error getting image URL: {e}")
-                        image_urls.append("https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink")
-            else:
-                print(f"  No images, using placeholder")
-                image_urls.append("https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink")
-            
-            user_dict['profile_images'] = image_urls
+            user_dict['profile_images'] = [urls[file_id] for file_id in image_ids[user_dict['id']]] or [PLACEHOLDER_URL]
             user_dict['interests'] = json.loads(user_dict.get('interests', '[]'))
             user_list.append(user_dict)
         
@@ -286,7 +385,7 @@ async def discover_users_advanced(
 ):
     """Advanced user discovery with smart filters and compatibility"""
     try:
-        from services.telegram_service import get_image_url
+        from services.telegram_service import get_image_urls, parse_image_ids, PLACEHOLDER_URL
         
         # Apply smart filters
         users = await FilterService.apply_smart_filters(
@@ -295,27 +394,15 @@ async def discover_users_advanced(
             limit=limit
         )
         
+        # One vectorized scoring pass for the whole page
+        compatibility_scores = await CompatibilityService.get_compatibility_scores(current_user, users)
+        
+        image_ids = {user['id']: parse_image_ids(user.get("profile_images"))[:3] for user in users}
+        urls = await get_image_urls((file_id for ids in image_ids.values() for file_id in ids), variant='card')
+        
         enhanced_matches = []
         for user in users:
-            # Convert file_ids to URLs
-            profile_images = json.loads(user.get("profile_images", "[]"))
-            image_urls = []
-            
-            if profile_images:
-                for file_id in profile_images[:3]:
-                    try:
-                        url = await get_image_url(file_id)
-                        image_urls.append(url)
-                    except Exception as e:
-                        print(f"Error getting image URL: {e}")
-                        image_urls.append("https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink")
-            else:
-                image_urls.append("https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink")
-            
-            # Get compatibility score
-            compatibility_score = await CompatibilityService.get_compatibility_score(
-                current_user["id"], user['id']
-            )
+            image_urls = [urls[file_id] for file_id in image_ids[user['id']]] or [PLACEHOLDER_URL]
             
             user_data = {
                 'id': user['id'],
@@ -328,7 +415,7 @@ async def discover_users_advanced(
                 'height': user.get('height'),
                 'interests': json.loads(user.get('interests', '[]')),
                 'profile_images': image_urls,
-                'compatibility_score': compatibility_score,
+                'compatibility_score': compatibility_scores.get(user['id'], 0.0),
                 'distance_km': user.get('distance_km', 0),
                 'last_active': user.get('last_active')
             }
@@ -357,40 +444,25 @@ async def get_nearby_users(
 ):
     """Get users within specified radius"""
     try:
-        from services.telegram_service import get_image_url
+        from services.telegram_service import get_image_urls, parse_image_ids, PLACEHOLDER_URL
         
         # Only show users with recent GPS location (within 24 hours)
-        users = await db.fetchall("""
-            SELECT id, name, age, bio, location, profile_images, interests, relationship_intent, created_at, latitude, longitude
-            FROM users 
-            WHERE id != ? AND gps_updated_at > datetime('now', '-24 hours')
-            LIMIT ?
-        """, (current_user["id"], limit))
+        users = []
+        if current_user.get("latitude") is not None and current_user.get("longitude") is not None:
+            users = await LocationService.find_nearby_users(
+                current_user["id"], current_user["latitude"], current_user["longitude"],
+                radius_km=radius_km, limit=limit, max_age_hours=24
+            )
         
         print(f"Found {len(users)} nearby users")
         
+        image_ids = {user['id']: parse_image_ids(user.get("profile_images"))[:3] for user in users}
+        urls = await get_image_urls((file_id for ids in image_ids.values() for file_id in ids), variant='card')
+        
         nearby_users = []
-        for user in users:
-            user_dict = dict(user)
-            
-            # Convert file_ids to URLs
-            profile_images = json.loads(user_dict.get("profile_images", "[]"))
-            image_urls = []
-            
-            if profile_images:
-                for file_id in profile_images[:3]:
-                    try:
-                        url = await get_image_url(file_id)
-                        image_urls.append(url)
-                    except Exception as e:
-                        print(f"Error getting image URL: {e}")
-                        image_urls.append("https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink")
-            else:
-                image_urls.append("https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink")
-            
-            user_dict['profile_images'] = image_urls
-            user_dict['interests'] = json.loads(user_dict.get('interests', '[]'))
-            user_dict['distance_km'] = 2.5  # Mock distance
+        for user_dict in users:
+            user_dict['profile_images'] = [urls[file_id] for file_id in image_ids[user_dict['id']]] or [PLACEHOLDER_URL]
+            user_dict['interests'] = json.loads(user_dict.get('interests') or '[]')
             nearby_users.append(user_dict)
         
         return {
@@ -441,7 +513,7 @@ async def get_profile_views(
 ):
     """Get who viewed your profile"""
     try:
-        from services.telegram_service import get_image_url
+        from services.telegram_service import get_image_urls, parse_image_ids
         
         views = await db.fetchall("""
             SELECT u.id, u.name, u.age, u.profile_images, pv.created_at as viewed_at
@@ -452,17 +524,14 @@ async def get_profile_views(
             LIMIT 50
         """, (current_user["id"],))
         
+        # First image of every viewer, resolved in one batch
+        first_images = [parse_image_ids(view["profile_images"])[:1] for view in views]
+        urls = await get_image_urls((file_id for ids in first_images for file_id in ids), variant='avatar')
+        
         viewers = []
-        for view in views:
+        for view, image_ids in zip(views, first_images):
             view_dict = dict(view)
-            profile_images = json.loads(view_dict.get("profile_images", "[]"))
-            image_url = None
-            
-            if profile_images:
-                try:
-                    image_url = await get_image_url(profile_images[0])
-                except:
-                    image_url = "https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink"
+            image_url = urls[image_ids[0]] if image_ids else None
             
             viewers.append({
                 "id": view_dict["id"],
@@ -525,12 +594,10 @@ async def update_location(
                 detail="GPS accuracy too low. Please enable high accuracy location."
             )
         
-        # Update database with GPS timestamp
-        await db.execute(
-            "UPDATE users SET latitude = ?, longitude = ?, location = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (latitude, longitude, location_name, current_user["id"])
+        # Update database with GPS timestamp and the geo index
+        await LocationService.update_user_location(
+            current_user["id"], latitude, longitude, location_name
         )
-        await db.commit()
         
         return {
             "message": "GPS location updated",
@@ -577,6 +644,8 @@ async def update_interests(
             (json.dumps(interests), current_user["id"])
         )
         await db.commit()
+        principal_cache.invalidate(current_user["id"])
+        event_bus.publish(ProfileUpdated(current_user["id"], frozenset({"interests"})))
         
         return {
             "message": "Interests updated successfully",
@@ -655,6 +724,8 @@ async def update_relationship_intent(
             (intent, current_user["id"])
         )
         await db.commit()
+        principal_cache.invalidate(current_user["id"])
+        event_bus.publish(ProfileUpdated(current_user["id"], frozenset({"relationship_intent"})))
         
         return {
             "message": "Relationship intent updated successfully",
@@ -728,7 +799,7 @@ async def get_user_profile(
 ):
     """Get another user's profile"""
     try:
-        from services.telegram_service import get_image_url
+        from services.telegram_service import get_image_urls, parse_image_ids
         
         user = await db.fetchone(
             "SELECT * FROM users WHERE id = ?",
@@ -741,14 +812,9 @@ async def get_user_profile(
         user_dict = dict(user)
         
         # Convert file_ids to URLs
-        profile_images = json.loads(user_dict["profile_images"])
-        image_urls = []
-        for file_id in profile_images:
-            try:
-                url = await get_image_url(file_id)
-                image_urls.append(url)
-            except:
-                image_urls.append("https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink")
+        profile_images = parse_image_ids(user_dict["profile_images"])
+        urls = await get_image_urls(profile_images, variant='full')
+        image_urls = [urls[file_id] for file_id in profile_images]
         
         return {
             "id": user_dict["id"],
@@ -831,14 +897,15 @@ async def update_fcm_token(
         # Check for pending welcome notification
         try:
             from services.fcm_notification_service import fcm_service as global_fcm
+            from services.notification_outbox import notification_outbox
             pending_notifications = getattr(global_fcm, 'pending_welcome_notifications', {})
             
             if current_user['id'] in pending_notifications:
                 welcome_data = pending_notifications[current_user['id']]
-                print(f"🎉 Sending delayed welcome notification for user {current_user['id']}")
+                print(f"🎉 Queueing delayed welcome notification for user {current_user['id']}")
                 
-                await global_fcm.send_notification(
-                    fcm_token=fcm_token,
+                await notification_outbox.enqueue(
+                    current_user["id"], "welcome",
                     title="Welcome back! 👋",
                     body=f"Hi {welcome_data['name']}, you're successfully logged in to HeartLink!",
                     data={"type": "welcome", "timestamp": welcome_data['timestamp']}
@@ -846,7 +913,7 @@ async def update_fcm_token(
                 
                 # Remove from pending
                 del pending_notifications[current_user['id']]
-                print(f"✅ Delayed welcome notification sent successfully")
+                print(f"✅ Delayed welcome notification queued")
         except Exception as e:
             print(f"⚠️ Delayed welcome notification failed: {e}")
         
@@ -882,14 +949,22 @@ async def delete_account(
         user_id = current_user["id"]
         
         # Delete all user data
-        await db.execute("DELETE FROM messages WHERE sender_id = ?", (user_id,))
-        await db.execute("DELETE FROM matches WHERE user1_id = ? OR user2_id = ?", (user_id, user_id))
-        await db.execute("DELETE FROM swipes WHERE user_id = ? OR swiped_user_id = ?", (user_id, user_id))
-        await db.execute("DELETE FROM profile_views WHERE viewer_id = ? OR viewed_id = ?", (user_id, user_id))
-        await db.execute("DELETE FROM location_shares WHERE user_id = ?", (user_id,))
-        await db.execute("DELETE FROM users WHERE id = ?", (user_id,))
-        
-        await db.commit()
+        async with db.transaction():
+            # Both sides of the user's conversations go with their matches
+            user_matches = "SELECT id FROM matches WHERE user1_id = ? OR user2_id = ?"
+            await db.execute(f"DELETE FROM messages WHERE match_id IN ({user_matches})", (user_id, user_id))
+            await db.execute(f"DELETE FROM read_watermarks WHERE match_id IN ({user_matches})", (user_id, user_id))
+            await db.execute("DELETE FROM notification_outbox WHERE user_id = ?", (user_id,))
+            await db.execute("DELETE FROM inbox_entries WHERE user_id = ? OR partner_id = ?", (user_id, user_id))
+            await db.execute("DELETE FROM matches WHERE user1_id = ? OR user2_id = ?", (user_id, user_id))
+            await db.execute("DELETE FROM swipes WHERE swiper_id = ? OR swiped_id = ?", (user_id, user_id))
+            await db.execute("DELETE FROM profile_views WHERE viewer_id = ? OR viewed_id = ?", (user_id, user_id))
+            await db.execute("DELETE FROM location_shares WHERE user_id = ?", (user_id,))
+            await discovery_deck_service.remove_user(user_id)
+            await db.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        
+        principal_cache.invalidate(user_id)
+        geo_index.remove(user_id)
         
         return {"message": "Account deleted successfully"}
         
@@ -977,12 +1052,15 @@ async def update_rich_profile(
             update_values.append(json.dumps(profile_data['profile_prompts']))
         
         if update_fields:
+            changed = _changed_fields(update_fields)
             update_fields.append("updated_at = CURRENT_TIMESTAMP")
             update_values.append(current_user["id"])
             
             query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = ?"
             await db.execute(query, tuple(update_values))
             await db.commit()
+            principal_cache.invalidate(current_user["id"])
+            event_bus.publish(ProfileUpdated(current_user["id"], changed))
         
         return {"message": "Rich profile updated successfully"}
         
@@ -1,118 +1,88 @@
-import re
 from typing import List, Dict, Optional
 from config.database import db
 import json
 from datetime import datetime
 from services.telegram_service import telegram_service
+from services.scam_matcher import scam_matcher
+from services.rate_limiter import rate_tracker
 
 class AntiScamService:
     
-    # Suspicious patterns
-    PHONE_PATTERNS = [
-        r'\b\d{10}\b',  # 10 digit numbers
-        r'\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b',  # Phone formats
-        r'\+\d{1,3}[-.\s]?\d{8,12}\b',  # International numbers
-    ]
-    
-    SUSPICIOUS_KEYWORDS = [
-        'whatsapp', 'telegram', 'instagram', 'snapchat', 'kik',
-        'phone number', 'call me', 'text me', 'my number',
-        'money', 'cash', 'payment', 'send money', 'bitcoin',
-        'investment', 'business opportunity', 'make money',
-        'sugar daddy', 'sugar baby', 'financial help',
-        'lonely', 'widow', 'military', 'overseas',
-        'verification', 'verify account', 'click link',
-        'cam', 'webcam', 'video call', 'private show'
-    ]
-    
-    INSTANT_REQUEST_KEYWORDS = [
-        'give me your number', 'send your number', 'what\'s your number',
-        'can i have your number', 'share your contact', 'let\'s move to',
-        'add me on', 'follow me on', 'find me on'
-    ]
+    SUSPICIOUS_SCORE = 25  # message is flagged
+    ALERT_SCORE = 50  # admins get a Telegram alert
+    RAPID_MESSAGES = 3  # this many messages from one sender...
+    RAPID_WINDOW_SECONDS = 30  # ...within this many seconds count as rapid messaging
+    THROTTLED_WINDOW_SECONDS = 300  # messages this soon after a 429 count as rate_limited
     
     @staticmethod
-    def analyze_message(content: str, sender_id: int, match_id: int) -> Dict:
-        """Analyze message for suspicious content"""
-        content_lower = content.lower()
-        flags = []
-        risk_score = 0
-        
-        # Check for phone numbers
-        for pattern in AntiScamService.PHONE_PATTERNS:
-            if re.search(pattern, content):
-                flags.append('phone_number_detected')
-                risk_score += 30
-        
-        # Check suspicious keywords
-        for keyword in AntiScamService.SUSPICIOUS_KEYWORDS:
-            if keyword in content_lower:
-                flags.append(f'suspicious_keyword: {keyword}')
-                risk_score += 15
-        
-        # Check instant requests
-        for keyword in AntiScamService.INSTANT_REQUEST_KEYWORDS:
-            if keyword in content_lower:
-                flags.append('instant_contact_request')
-                risk_score += 25
+    def assess(content: str, rapid: bool = False, throttled: bool = False) -> Dict:
+        """Score message content plus the sender's rate signals (see sender_signals)"""
+        # Phone numbers and keywords in one pass; rules live in the rule file
+        risk_score, flags = scam_matcher.score(scam_matcher.scan(content))
         
-        # Check message timing (too fast responses)
-        if AntiScamService._is_too_fast_response(sender_id, match_id):
+        if rapid:
             flags.append('rapid_messaging')
             risk_score += 10
         
-        result = {
-            'is_suspicious': risk_score >= 25,
+        if throttled:
+            flags.append('rate_limited')
+            risk_score += 15
+        
+        return {
+            'is_suspicious': risk_score >= AntiScamService.SUSPICIOUS_SCORE,
             'risk_score': risk_score,
             'flags': flags,
-            'action_required': risk_score >= 50
+            'action_required': risk_score >= AntiScamService.ALERT_SCORE
         }
+    
+    @staticmethod
+    async def analyze_message(content: str, sender_id: int, match_id: int) -> Dict:
+        """Analyze a message that was just sent for suspicious content"""
+        result = AntiScamService.assess(content, **AntiScamService.sender_signals(sender_id))
         
-        # Send alert for high-risk messages
-        if risk_score >= 50:
-            import asyncio
-            asyncio.create_task(telegram_service.send_suspicious_activity_alert({
-                'user_id': sender_id,
-                'activity_type': 'suspicious_message',
-                'risk_score': risk_score,
-                'flags': flags,
-                'message_content': content[:200],  # First 200 chars
-                'auto_action': 'message_flagged'
-            }))
+        if result['action_required']:
+            await AntiScamService.send_alert(sender_id, content, result)
         
         return result
     
     @staticmethod
-    async def _is_too_fast_response(sender_id: int, match_id: int) -> bool:
-        """Check if user is sending messages too quickly"""
-        recent_messages = await db.fetchall("""
-            SELECT created_at FROM messages 
-            WHERE sender_id = ? AND match_id = ? 
-            ORDER BY created_at DESC LIMIT 3
-        """, (sender_id, match_id))
-        
-        if len(recent_messages) >= 3:
-            # Check if 3 messages sent within 30 seconds
-            time_diff = recent_messages[0][0] - recent_messages[2][0]
-            return time_diff.total_seconds() < 30
-        
-        return False
+    async def send_alert(sender_id: int, content: str, result: Dict):
+        """Alert admins about a high-risk message"""
+        await telegram_service.send_suspicious_activity_alert({
+            'user_id': sender_id,
+            'activity_type': 'suspicious_message',
+            'risk_score': result['risk_score'],
+            'flags': result['flags'],
+            'message_content': content[:200],  # First 200 chars
+            'auto_action': 'message_flagged'
+        })
+    
+    @staticmethod
+    def sender_signals(sender_id: int) -> Dict[str, bool]:
+        """Rate signals for a message the sender just had accepted, from the in-memory tracker"""
+        return {
+            'rapid': rate_tracker.recent(
+                sender_id, "message", AntiScamService.RAPID_WINDOW_SECONDS
+            ) >= AntiScamService.RAPID_MESSAGES,
+            'throttled': rate_tracker.throttled(
+                sender_id, "message", AntiScamService.THROTTLED_WINDOW_SECONDS
+            )
+        }
     
     @staticmethod
     async def flag_user(user_id: int, reason: str, reported_by: int, evidence: Dict):
         """Flag a user for suspicious behavior"""
-        await db.execute("""
-            INSERT INTO user_flags (user_id, reason, reported_by, evidence, created_at)
-            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
-        """, (user_id, reason, reported_by, json.dumps(evidence)))
-        
-        # Update user's flag count
-        await db.execute("""
-            UPDATE users SET flag_count = COALESCE(flag_count, 0) + 1 
-            WHERE id = ?
-        """, (user_id,))
-        
-        await db.commit()
+        async with db.transaction():
+            await db.execute("""
+                INSERT INTO user_flags (user_id, reason, reported_by, evidence, created_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """, (user_id, reason, reported_by, json.dumps(evidence)))
+            
+            # Update user's flag count
+            await db.execute("""
+                UPDATE users SET flag_count = COALESCE(flag_count, 0) + 1 
+                WHERE id = ?
+            """, (user_id,))
         
         # Send Telegram notification to admin
         await telegram_service.send_report_notification({
@@ -0,0 +1,121 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config.database import db
+from config.settings import settings
+
+# Columns of users that routes read from current_user. Wide or secret
+# columns (password_hash, profile_prompts, fcm_token, ...) are left out.
+PRINCIPAL_COLUMNS = (
+    "id", "email", "name", "age", "gender", "bio", "location", "latitude", "longitude",
+    "job_title", "education_level", "height", "body_type", "smoking", "drinking",
+    "religion", "diet_preference", "activity_level",
+    "interests", "relationship_intent", "profile_images", "preferences",
+    "is_verified", "is_premium", "created_at",
+)
+PRINCIPAL_QUERY = f"SELECT {', '.join(PRINCIPAL_COLUMNS)} FROM users WHERE email = ?"
+
+# Seconds of history behind saved_reads_per_second
+RATE_WINDOW = 60
+
+class PrincipalCache:
+    """TTL + LRU cache of the slim user record behind get_current_user.
+
+    Entries are keyed by user id with an index from the token subject
+    (email). Writes to cached columns call invalidate(user_id) after they
+    commit; a lookup that raced with an invalidation is returned but not
+    cached, so a stale row never outlives the write that replaced it.
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None):
+        self.max_size = max_size or settings.AUTH_CACHE_SIZE
+        self.ttl = settings.AUTH_CACHE_TTL if ttl is None else ttl
+        self._users: "OrderedDict[int, Tuple[dict, float]]" = OrderedDict()
+        self._ids_by_email: Dict[str, int] = {}
+        self._version = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._hit_buckets = [0] * RATE_WINDOW
+        self._bucket_seconds = [0] * RATE_WINDOW
+        self._started_at = time.monotonic()
+
+    def _count_hit(self):
+        self.hits += 1
+        second = int(time.monotonic())
+        slot = second % RATE_WINDOW
+        if self._bucket_seconds[slot] != second:
+            self._bucket_seconds[slot] = second
+            self._hit_buckets[slot] = 0
+        self._hit_buckets[slot] += 1
+
+    def _lookup(self, email: str) -> Optional[dict]:
+        user_id = self._ids_by_email.get(email)
+        entry = self._users.get(user_id) if user_id is not None else None
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._drop(user_id)
+            return None
+        self._users.move_to_end(user_id)
+        return user
+
+    def _drop(self, user_id: int):
+        entry = self._users.pop(user_id, None)
+        if entry is not None:
+            self._ids_by_email.pop(entry[0]["email"], None)
+
+    def _store(self, user: dict):
+        self._drop(user["id"])
+        self._users[user["id"]] = (user, time.monotonic() + self.ttl)
+        self._ids_by_email[user["email"]] = user["id"]
+        while len(self._users) > self.max_size:
+            user_id, _ = next(iter(self._users.items()))
+            self._drop(user_id)
+
+    async def get(self, email: str) -> Optional[dict]:
+        """Slim user record for a token subject; None if no such user"""
+        user = self._lookup(email)
+        if user is not None:
+            self._count_hit()
+            return dict(user)
+
+        self.misses += 1
+        version = self._version
+        row = await db.fetchone(PRINCIPAL_QUERY, (email,))
+        if row is None:
+            return None
+        user = dict(row)
+        if version == self._version and self.ttl > 0:
+            self._store(user)
+        return dict(user)
+
+    def invalidate(self, user_id: int):
+        """Forget a user after a write to their row"""
+        self._version += 1
+        self.invalidations += 1
+        self._drop(user_id)
+
+    def stats(self) -> Dict:
+        now = int(time.monotonic())
+        recent = sum(
+            count for count, second in zip(self._hit_buckets, self._bucket_seconds)
+            if now - second < RATE_WINDOW
+        )
+        window = min(RATE_WINDOW, max(1.0, time.monotonic() - self._started_at))
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._users),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            # Each hit is a users row read that did not happen
+            "saved_reads_per_second": round(recent / window, 1),
+        }
+
+# Global instance
+principal_cache = PrincipalCache()
@@ -0,0 +1,115 @@
+import json
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+class CompatibilityEngine:
+    """Vectorized form of CompatibilityService's pairwise scoring.
+
+    Scores one user against a whole batch of candidate rows in a single pass
+    over NumPy arrays. Weights and rules mirror
+    CompatibilityService._calculate_*_compatibility exactly.
+    """
+
+    INTEREST_WEIGHT = 0.4
+    LIFESTYLE_WEIGHT = 0.4
+    ACTIVITY_WEIGHT = 0.2
+
+    ACTIVITY_LEVELS = {'Low': 1, 'Medium': 2, 'High': 3}
+    ACTIVITY_SCORES = np.array([1.0, 0.7, 0.4])  # by level difference 0, 1, 2
+
+    @staticmethod
+    def _interests(user: dict) -> set:
+        try:
+            return set(json.loads(user.get('interests', '[]')))
+        except Exception:
+            return set()
+
+    @staticmethod
+    def _encode(values: Sequence, vocabulary: Dict) -> np.ndarray:
+        """Categorical codes, 0 meaning not set"""
+        return np.array([vocabulary.setdefault(v, len(vocabulary) + 1) if v else 0 for v in values])
+
+    @staticmethod
+    def _interest_scores(user: dict, candidates: List[dict]) -> np.ndarray:
+        user_interests = CompatibilityEngine._interests(user)
+        candidate_interests = [CompatibilityEngine._interests(c) for c in candidates]
+        if not user_interests:
+            return np.full(len(candidates), 0.5)
+
+        vocabulary = {interest: i for i, interest in enumerate(user_interests)}
+        columns = [vocabulary.setdefault(i, len(vocabulary)) for interests in candidate_interests for i in interests]
+        sizes = np.array([len(interests) for interests in candidate_interests], dtype=np.float64)
+        rows = np.repeat(np.arange(len(candidates)), sizes.astype(np.int64))
+
+        # Multi-hot candidate matrix against the user's vector
+        matrix = np.zeros((len(candidates), len(vocabulary)), dtype=np.float64)
+        matrix[rows, columns] = 1.0
+        user_vector = np.zeros(len(vocabulary), dtype=np.float64)
+        user_vector[:len(user_interests)] = 1.0
+
+        intersection = matrix @ user_vector
+        union = sizes + len(user_interests) - intersection
+        return np.where(sizes > 0, intersection / np.maximum(union, 1), 0.5)
+
+    @staticmethod
+    def _lifestyle_scores(user: dict, candidates: List[dict]) -> np.ndarray:
+        total = np.zeros(len(candidates))
+        factors = np.zeros(len(candidates))
+
+        def factor(field: str, score_fn):
+            vocabulary = {}
+            mine = CompatibilityEngine._encode([user.get(field)], vocabulary)[0]
+            theirs = CompatibilityEngine._encode([c.get(field) for c in candidates], vocabulary)
+            if mine == 0:
+                return
+            both = theirs != 0
+            total[both] += score_fn(mine, theirs, vocabulary)[both]
+            factors[both] += 1
+
+        def habit(mine, theirs, vocabulary):
+            # Same habit, one side never does it, or otherwise moderate
+            never = vocabulary.get('Never', -1)
+            either_never = (theirs == never) | (mine == never)
+            return np.where(theirs == mine, 1.0, np.where(either_never, 0.3, 0.7))
+
+        def diet(mine, theirs, vocabulary):
+            veg = vocabulary.get('Vegetarian', -1)
+            non_veg = vocabulary.get('Non-Vegetarian', -1)
+            veg_vs_non_veg = ((mine == veg) & (theirs == non_veg)) | ((mine == non_veg) & (theirs == veg))
+            return np.where(theirs == mine, 1.0, np.where(veg_vs_non_veg, 0.4, 0.8))
+
+        def religion(mine, theirs, vocabulary):
+            return np.where(theirs == mine, 1.0, 0.6)
+
+        factor('smoking', habit)
+        factor('drinking', habit)
+        factor('diet_preference', diet)
+        factor('religion', religion)
+
+        return np.where(factors > 0, total / np.maximum(factors, 1), 0.5)
+
+    @staticmethod
+    def _activity_scores(user: dict, candidates: List[dict]) -> np.ndarray:
+        levels = CompatibilityEngine.ACTIVITY_LEVELS
+        mine = levels.get(user.get('activity_level', 'Medium'), 2)
+        theirs = np.array([levels.get(c.get('activity_level', 'Medium'), 2) for c in candidates])
+        return CompatibilityEngine.ACTIVITY_SCORES[np.abs(theirs - mine)]
+
+    @staticmethod
+    def score_batch(user: dict, candidates: List[dict]) -> Dict[str, np.ndarray]:
+        """Component and overall scores of `user` against every candidate row"""
+        if not candidates:
+            empty = np.zeros(0)
+            return {'interest': empty, 'lifestyle': empty, 'activity': empty, 'overall': empty}
+
+        interest = CompatibilityEngine._interest_scores(user, candidates)
+        lifestyle = CompatibilityEngine._lifestyle_scores(user, candidates)
+        activity = CompatibilityEngine._activity_scores(user, candidates)
+        overall = (
+            interest * CompatibilityEngine.INTEREST_WEIGHT +
+            lifestyle * CompatibilityEngine.LIFESTYLE_WEIGHT +
+            activity * CompatibilityEngine.ACTIVITY_WEIGHT
+        )
+
+        return {'interest': interest, 'lifestyle': lifestyle, 'activity': activity, 'overall': overall}
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from typing import Dict, List, Set, Tuple
+
+from config.database import db
+from config.settings import settings
+from services.compatibility_engine import CompatibilityEngine
+
+class CompatibilityRecomputeJob:
+    """Keeps stored compatibility_scores in step with profile edits.
+
+    Profile endpoints mark the editing user dirty. Every interval the job
+    takes the dirty set, rescores the stored pairs of those users against
+    partners active within COMPATIBILITY_ACTIVE_DAYS, and writes each batch
+    back in one transaction. Stored pairs with inactive partners are dropped
+    instead, so they are recalculated on demand if they are needed again.
+    """
+
+    def __init__(self):
+        self.interval = settings.COMPATIBILITY_RECOMPUTE_INTERVAL
+        self.batch_users = settings.COMPATIBILITY_RECOMPUTE_BATCH
+        self.active_days = settings.COMPATIBILITY_ACTIVE_DAYS
+        self._dirty: Set[int] = set()
+        self._task: asyncio.Task = None
+
+        # Throughput counters
+        self.runs = 0
+        self.pairs_total = 0
+        self.last_run_pairs = 0
+        self.last_run_seconds = 0.0
+        self.last_run_at = None
+
+    def mark_dirty(self, user_id: int):
+        self._dirty.add(user_id)
+
+    async def seed_dirty(self):
+        """Pick up profiles edited after the newest stored score, e.g. before a restart"""
+        rows = await db.fetchall("""
+            SELECT u.id FROM users u
+            WHERE u.updated_at > (SELECT MAX(calculated_at) FROM compatibility_scores)
+        """)
+        self._dirty.update(row["id"] for row in rows)
+
+    async def _recompute_users(self, user_ids: List[int], seen: Set[Tuple[int, int]]) -> int:
+        placeholders = ",".join("?" for _ in user_ids)
+        users = {
+            row["id"]: dict(row)
+            for row in await db.fetchall(f"SELECT * FROM users WHERE id IN ({placeholders})", tuple(user_ids))
+        }
+
+        # Every stored pair of a dirty user, with the partner's row
+        pairs = await db.fetchall(f"""
+            SELECT cs.user1_id, cs.user2_id,
+                   CASE WHEN cs.user1_id IN ({placeholders}) THEN cs.user1_id ELSE cs.user2_id END AS dirty_id,
+                   p.*,
+                   (p.is_blocked = 0 AND p.last_active >= datetime('now', ?)) AS partner_active
+            FROM compatibility_scores cs
+            JOIN users p ON p.id = CASE WHEN cs.user1_id IN ({placeholders}) THEN cs.user2_id ELSE cs.user1_id END
+            WHERE cs.user1_id IN ({placeholders}) OR cs.user2_id IN ({placeholders})
+        """, (*user_ids, f"-{self.active_days} days", *user_ids, *user_ids, *user_ids))
+
+        partners: Dict[int, List[dict]] = {}
+        stale = []
+        for pair in pairs:
+            key = (pair["user1_id"], pair["user2_id"])
+            if key in seen:
+                continue
+            seen.add(key)
+            if pair["dirty_id"] not in users:
+                continue
+            if pair["partner_active"]:
+                partners.setdefault(pair["dirty_id"], []).append(dict(pair))
+            else:
+                stale.append(key)
+
+        rows = []
+        for user_id, candidates in partners.items():
+            scores = CompatibilityEngine.score_batch(users[user_id], candidates)
+            for i, candidate in enumerate(candidates):
+                rows.append((
+                    float(scores['interest'][i]), float(scores['lifestyle'][i]),
+                    float(scores['activity'][i]), float(scores['overall'][i]),
+                    candidate["user1_id"], candidate["user2_id"]
+                ))
+
+        async with db.transaction():
+            if rows:
+                await db.executemany("""
+                    UPDATE compatibility_scores
+                    SET interest_score = ?, lifestyle_score = ?, activity_score = ?,
+                        overall_score = ?, calculated_at = CURRENT_TIMESTAMP
+                    WHERE user1_id = ? AND user2_id = ?
+                """, rows)
+            if stale:
+                await db.executemany(
+                    "DELETE FROM compatibility_scores WHERE user1_id = ? AND user2_id = ?", stale
+                )
+
+        return len(rows)
+
+    async def run_once(self) -> int:
+        """Recompute every pair affected since the last run; returns pairs scored"""
+        if not self._dirty:
+            return 0
+
+        dirty, self._dirty = sorted(self._dirty), set()
+        start = time.perf_counter()
+        seen: Set[Tuple[int, int]] = set()
+        pairs = 0
+        try:
+            for i in range(0, len(dirty), self.batch_users):
+                pairs += await self._recompute_users(dirty[i:i + self.batch_users], seen)
+        except Exception:
+            # Retry the whole set next time; rescoring a pair twice is harmless
+            self._dirty.update(dirty)
+            raise
+
+        self.runs += 1
+        self.pairs_total += pairs
+        self.last_run_pairs = pairs
+        self.last_run_seconds = time.perf_counter() - start
+        self.last_run_at = time.time()
+        return pairs
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                pairs = await self.run_once()
+                if pairs:
+                    print(f"[Compatibility] Recomputed {pairs} pairs in {self.last_run_seconds:.2f}s")
+            except Exception as e:
+                print(f"❌ Compatibility recompute failed: {e}")
+
+    async def start(self):
+        await self.seed_dirty()
+        self._task = asyncio.create_task(self._loop())
+        print(f"✅ Compatibility recompute job started ({len(self._dirty)} dirty users)")
+
+    async def shutdown(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "dirty_users": len(self._dirty),
+            "runs": self.runs,
+            "pairs_total": self.pairs_total,
+            "last_run_pairs": self.last_run_pairs,
+            "last_run_seconds": round(self.last_run_seconds, 4),
+            "pairs_per_second": round(self.last_run_pairs / self.last_run_seconds, 1) if self.last_run_seconds else 0.0,
+            "last_run_at": self.last_run_at,
+        }
+
+# Global instance
+compatibility_job = CompatibilityRecomputeJob()
@@ -2,6 +2,7 @@ import json
 import math
 from typing import Dict, List, Tuple
 from config.database import get_db
+from services.compatibility_engine import CompatibilityEngine
 
 class CompatibilityService:
     
@@ -144,6 +145,54 @@ class CompatibilityService:
         # Calculate new score
         return await CompatibilityService.calculate_compatibility_score(user1_id, user2_id)
     
+    @staticmethod
+    async def get_compatibility_scores(user: dict, candidates: List[dict]) -> Dict[int, float]:
+        """Scores of a user against many candidate rows, from compatibility_scores where stored.
+        
+        Candidates must be full user rows (as returned by FilterService).
+        Only pairs with no stored score are computed, in one vectorized pass,
+        and saved with a single bulk write; stored scores are kept fresh by
+        the recompute job.
+        """
+        if not candidates:
+            return {}
+        
+        db = await get_db()
+        placeholders = ",".join("?" for _ in candidates)
+        candidate_ids = tuple(candidate['id'] for candidate in candidates)
+        stored = await db.fetchall(f"""
+            SELECT user2_id AS candidate_id, overall_score FROM compatibility_scores
+            WHERE user1_id = ? AND user2_id IN ({placeholders})
+            UNION ALL
+            SELECT user1_id AS candidate_id, overall_score FROM compatibility_scores
+            WHERE user2_id = ? AND user1_id IN ({placeholders})
+        """, (user['id'], *candidate_ids, user['id'], *candidate_ids))
+        result = {row['candidate_id']: round(row['overall_score'], 2) for row in stored}
+        
+        missing = [candidate for candidate in candidates if candidate['id'] not in result]
+        if not missing:
+            return result
+        
+        scores = CompatibilityEngine.score_batch(user, missing)
+        rows = [
+            (
+                user['id'], candidate['id'],
+                float(scores['interest'][i]), float(scores['lifestyle'][i]),
+                float(scores['activity'][i]), float(scores['overall'][i])
+            )
+            for i, candidate in enumerate(missing)
+        ]
+        
+        # A pair another request stored meanwhile keeps its score
+        await db.executemany("""
+            INSERT OR IGNORE INTO compatibility_scores 
+            (user1_id, user2_id, interest_score, lifestyle_score, activity_score, overall_score)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+        
+        result.update((row[1], round(row[5], 2)) for row in rows)
+        return result
+    
     @staticmethod
     async def get_top_compatible_users(user_id: int, limit: int = 20) -> List[Dict]:
         """Get most compatible users for given user"""
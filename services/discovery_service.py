@@ -0,0 +1,208 @@
+import asyncio
+import json
+from typing import Dict, List, Set, Tuple
+
+from config.database import db
+from config.settings import settings
+from services.matching_service import MatchingService
+
+class DiscoveryDeckService:
+    """Per-user queue of discovery candidates, precomputed and consumed in order.
+
+    Candidates are ranked once when they are added to the deck, so a discover
+    call is just "take the next N unserved cards". Served cards stay in the
+    deck so they are not queued again; once no fresh candidates are left the
+    served ones are recycled. Decks are topped up in the background when they
+    run low.
+    """
+
+    # Unswiped (or undone), unblocked users the viewer has not reported,
+    # narrowed by the viewer's stored preferences
+    CANDIDATES_QUERY = """
+        SELECT u.id, u.interests, u.relationship_intent
+        FROM users u
+        WHERE u.id != ? AND u.is_blocked = 0 {preferences}
+        AND NOT EXISTS (
+            SELECT 1 FROM swipes s
+            WHERE s.swiper_id = ? AND s.swiped_id = u.id
+            AND (s.is_undone = 0 OR s.is_undone IS NULL)
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM discovery_decks d
+            WHERE d.user_id = ? AND d.candidate_id = u.id
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM user_flags f
+            WHERE f.user_id = u.id AND f.reported_by = ?
+        )
+        ORDER BY u.last_active DESC
+        LIMIT ?
+    """
+
+    def __init__(self):
+        self.deck_size = settings.DISCOVERY_DECK_SIZE
+        self.low_water = settings.DISCOVERY_DECK_LOW_WATER
+        self._refilling: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _score(viewer: dict, candidate: dict) -> float:
+        """Rank candidates by shared interests, preferring the same intent"""
+        viewer_interests = json.loads(viewer["interests"]) if viewer["interests"] else []
+        candidate_interests = json.loads(candidate["interests"]) if candidate["interests"] else []
+        score = MatchingService.calculate_interest_compatibility(viewer_interests, candidate_interests)
+
+        if viewer["relationship_intent"] and viewer["relationship_intent"] == candidate["relationship_intent"]:
+            score += 0.2
+
+        return round(score, 3)
+
+    @staticmethod
+    def _preference_filter(preferences_json: str) -> Tuple[str, List]:
+        """The viewer's stored preferences as "AND ..." SQL, with the same predicates as MatchingService"""
+        try:
+            preferences = json.loads(preferences_json or "{}")
+        except ValueError:
+            preferences = {}
+        conditions, params = MatchingService.preference_conditions(preferences)
+        return "".join(f"AND {condition} " for condition in conditions), params
+
+    async def deck_length(self, user_id: int) -> int:
+        row = await db.fetchone(
+            "SELECT COUNT(*) AS count FROM discovery_decks WHERE user_id = ? AND served_at IS NULL",
+            (user_id,)
+        )
+        return row["count"]
+
+    async def refill(self, user_id: int) -> int:
+        """Top the user's deck back up to deck_size; returns cards added"""
+        needed = self.deck_size - await self.deck_length(user_id)
+        if needed <= 0:
+            return 0
+
+        viewer = await db.fetchone(
+            "SELECT interests, relationship_intent, preferences FROM users WHERE id = ?", (user_id,)
+        )
+        if not viewer:
+            return 0
+
+        preference_sql, preference_params = self._preference_filter(viewer["preferences"])
+        query = self.CANDIDATES_QUERY.format(preferences=preference_sql)
+        params = (user_id, *preference_params, user_id, user_id, user_id, needed * 3)
+
+        # Rank a wider slice of recently active users and keep the best;
+        # the rest stay eligible for the next refill
+        candidates = await db.fetchall(query, params)
+        if not candidates:
+            # Everyone left has been shown already: recycle served cards
+            recycled = await db.fetchall(
+                "DELETE FROM discovery_decks WHERE user_id = ? AND served_at IS NOT NULL RETURNING candidate_id",
+                (user_id,)
+            )
+            await db.commit()
+            if recycled:
+                candidates = await db.fetchall(query, params)
+        ranked = sorted(candidates, key=lambda c: self._score(viewer, c), reverse=True)[:needed]
+        if not ranked:
+            return 0
+
+        async with db.transaction():
+            row = await db.fetchone(
+                "SELECT COALESCE(MAX(position), 0) AS position FROM discovery_decks WHERE user_id = ?",
+                (user_id,)
+            )
+            start = row["position"] + 1
+            await db.executemany(
+                "INSERT OR IGNORE INTO discovery_decks (user_id, candidate_id, position, score) VALUES (?, ?, ?, ?)",
+                [
+                    (user_id, candidate["id"], start + i, self._score(viewer, candidate))
+                    for i, candidate in enumerate(ranked)
+                ]
+            )
+
+        return len(ranked)
+
+    def schedule_refill(self, user_id: int):
+        """Refill the deck in the background, at most once at a time per user"""
+        if user_id in self._refilling:
+            return
+        self._refilling.add(user_id)
+
+        async def run():
+            try:
+                added = await self.refill(user_id)
+                print(f"[Discovery] Refilled deck for user {user_id}: +{added}")
+            except Exception as e:
+                print(f"[Discovery] Refill failed for user {user_id}: {e}")
+            finally:
+                self._refilling.discard(user_id)
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def next_candidates(self, user_id: int, limit: int) -> List[Dict]:
+        """Serve the next `limit` candidates from the deck as user rows"""
+        remaining = await self.deck_length(user_id)
+        if remaining < limit:
+            # Cold or nearly empty deck: fill it before answering
+            await self.refill(user_id)
+
+        async with db.transaction():
+            served = await db.fetchall("""
+                UPDATE discovery_decks SET served_at = CURRENT_TIMESTAMP
+                WHERE user_id = ? AND candidate_id IN (
+                    SELECT candidate_id FROM discovery_decks
+                    WHERE user_id = ? AND served_at IS NULL
+                    ORDER BY position LIMIT ?
+                )
+                RETURNING candidate_id, position
+            """, (user_id, user_id, limit))
+            remaining = await self.deck_length(user_id)
+
+        if remaining < self.low_water:
+            self.schedule_refill(user_id)
+
+        if not served:
+            return []
+
+        order = {row["candidate_id"]: row["position"] for row in served}
+        placeholders = ",".join("?" for _ in order)
+
+        # Re-check exclusions: the viewer may have swiped (e.g. via a batch)
+        # or changed preferences, or the candidate been blocked, since the
+        # deck was built
+        viewer = await db.fetchone("SELECT preferences FROM users WHERE id = ?", (user_id,))
+        preference_sql, preference_params = self._preference_filter(viewer["preferences"] if viewer else None)
+        users = await db.fetchall(f"""
+            SELECT u.id, u.name, u.age, u.bio, u.location, u.profile_images, u.interests, u.relationship_intent
+            FROM users u
+            WHERE u.id IN ({placeholders}) AND u.is_blocked = 0 {preference_sql}
+            AND NOT EXISTS (
+                SELECT 1 FROM swipes s
+                WHERE s.swiper_id = ? AND s.swiped_id = u.id
+                AND (s.is_undone = 0 OR s.is_undone IS NULL)
+            )
+        """, (*order.keys(), *preference_params, user_id))
+
+        return sorted((dict(u) for u in users), key=lambda u: order[u["id"]])
+
+    async def shutdown(self):
+        """Wait for in-flight refills before the database closes"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def reset(self, user_id: int):
+        """Drop the user's unserved cards, e.g. after their preferences change"""
+        await db.execute(
+            "DELETE FROM discovery_decks WHERE user_id = ? AND served_at IS NULL", (user_id,)
+        )
+
+    async def remove_user(self, user_id: int):
+        """Drop a user's own deck and every card showing them"""
+        await db.execute(
+            "DELETE FROM discovery_decks WHERE user_id = ? OR candidate_id = ?",
+            (user_id, user_id)
+        )
+
+discovery_deck_service = DiscoveryDeckService()
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Type
+
+from config.settings import settings
+
+Handler = Callable[[tuple], Awaitable[None]]
+
+class EventBus:
+    """In-process bus for side effects that run after a write commits.
+
+    Routes publish() an event once their transaction is done and return;
+    subscribers (push, WebSocket, feed and cache upkeep) run later on
+    EVENT_BUS_WORKERS worker tasks. Each worker has its own bounded queue
+    and events go to a worker by event.key, so one user's events keep
+    their order. A full queue drops the event and counts it rather than
+    making the request wait.
+    """
+
+    def __init__(self):
+        self.workers = settings.EVENT_BUS_WORKERS
+        self.queue_size = settings.EVENT_BUS_QUEUE_SIZE
+        self._handlers: Dict[Type, List[Handler]] = {}
+        self._queues: List[asyncio.Queue] = [
+            asyncio.Queue(maxsize=self.queue_size) for _ in range(self.workers)
+        ]
+        self._tasks: List[asyncio.Task] = []
+
+        # Backpressure counters
+        self.published: Dict[str, int] = {}
+        self.dropped: Dict[str, int] = {}
+        self.handled = 0
+        self.delivered = 0
+        self.failed: Dict[str, int] = {}
+        self.high_water = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.handler_seconds = 0.0
+
+    def subscribe(self, event_type: Type):
+        """Decorator registering an async handler for event_type"""
+        def register(handler: Handler) -> Handler:
+            self._handlers.setdefault(event_type, []).append(handler)
+            return handler
+        return register
+
+    def publish(self, event: tuple):
+        """Queue event for its subscribers; never waits"""
+        name = type(event).__name__
+        if not self._handlers.get(type(event)):
+            return
+        queue = self._queues[event.key % self.workers]
+        try:
+            queue.put_nowait((event, time.monotonic()))
+        except asyncio.QueueFull:
+            self.dropped[name] = self.dropped.get(name, 0) + 1
+            print(f"❌ Event queue full, dropped {name}")
+            return
+        self.published[name] = self.published.get(name, 0) + 1
+        self.high_water = max(self.high_water, queue.qsize())
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            event, published_at = await queue.get()
+            wait = time.monotonic() - published_at
+            self.handled += 1
+            self.wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+            for handler in self._handlers.get(type(event), []):
+                start = time.perf_counter()
+                try:
+                    await handler(event)
+                    self.delivered += 1
+                except Exception as e:
+                    self.failed[handler.__name__] = self.failed.get(handler.__name__, 0) + 1
+                    print(f"❌ Event handler {handler.__name__} failed: {e}")
+                finally:
+                    self.handler_seconds += time.perf_counter() - start
+            queue.task_done()
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker(queue)) for queue in self._queues]
+        print(f"✅ Event bus started ({self.workers} workers)")
+
+    async def shutdown(self, timeout: float = 5.0):
+        """Run the handlers for what is already queued, up to timeout seconds, then stop"""
+        if self._tasks:
+            try:
+                await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout)
+            except asyncio.TimeoutError:
+                print(f"❌ Event bus stopped with {sum(q.qsize() for q in self._queues)} events unhandled")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict:
+        calls = self.delivered + sum(self.failed.values())
+        return {
+            "workers": len(self._tasks),
+            "queued": [q.qsize() for q in self._queues],
+            "queue_limit": self.queue_size,
+            "high_water": self.high_water,
+            "published": dict(self.published),
+            "dropped": dict(self.dropped),
+            "handled": self.handled,
+            "delivered": self.delivered,
+            "failed": dict(self.failed),
+            "avg_wait_ms": round(self.wait_seconds / self.handled * 1000, 2) if self.handled else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+            "avg_handler_ms": round(self.handler_seconds / calls * 1000, 2) if calls else 0.0
+        }
+
+# Global instance
+event_bus = EventBus()
@@ -0,0 +1,83 @@
+import json
+
+from config.database import db
+from services.compatibility_job import compatibility_job
+from services.discovery_service import discovery_deck_service
+from services.event_bus import event_bus
+from services.events import MatchCreated, MessageSent, ProfileUpdated
+from services.feed_service import feed_service
+from services.notification_outbox import notification_outbox
+from services.notification_service import send_match_notification, send_message_notification
+from services.websocket_manager import manager
+
+# Profile columns the compatibility scores are computed from
+COMPATIBILITY_FIELDS = frozenset({"interests", "smoking", "drinking", "diet_preference", "religion"})
+
+@event_bus.subscribe(MessageSent)
+async def push_message_to_websocket(event: MessageSent):
+    """Real-time delivery to the receiver's open WebSocket"""
+    message = event.message
+    await manager.send_message_to_user(event.receiver_id, {
+        "type": "new_message",
+        "message": {
+            "id": message["id"],
+            "match_id": message["match_id"],
+            "sender_id": message["sender_id"],
+            "content": message["content"],
+            "sender_name": event.sender_name,
+            "created_at": message["created_at"]
+        }
+    })
+
+@event_bus.subscribe(MessageSent)
+async def push_message_notification(event: MessageSent):
+    """FCM push to the receiver, one per conversation while a burst is pending"""
+    receiver = await db.fetchone("SELECT fcm_token FROM users WHERE id = ?", (event.receiver_id,))
+    if receiver and receiver["fcm_token"]:
+        content = event.message["content"]
+        await notification_outbox.enqueue(
+            event.receiver_id, f"message:{event.message['match_id']}",
+            title=f"💬 {event.sender_name}",
+            body=content[:50] + '...' if len(content) > 50 else content,
+            data={'type': 'message', 'sender': event.sender_name, 'match_id': str(event.message['match_id'])}
+        )
+    else:
+        print(f"No FCM token for user {event.receiver_id}")
+    await send_message_notification(event.sender_name, event.message["content"])
+
+@event_bus.subscribe(MatchCreated)
+async def push_match_notification(event: MatchCreated):
+    """FCM push to the user who was matched"""
+    other_user = await db.fetchone("SELECT name, fcm_token FROM users WHERE id = ?", (event.matched_user_id,))
+    if not other_user:
+        return
+    await send_match_notification(event.user_name, other_user["name"])
+    if other_user["fcm_token"]:
+        await notification_outbox.enqueue(
+            event.matched_user_id, f"match:{event.match_id}",
+            title="🎉 It's a Match!",
+            body=f"You and {event.user_name} liked each other!",
+            data={'type': 'match', 'user_name': event.user_name}
+        )
+    else:
+        print(f"No FCM token for user {event.matched_user_id}")
+
+@event_bus.subscribe(ProfileUpdated)
+async def refresh_feed_posts(event: ProfileUpdated):
+    """Rebuild feed posts from the images as they are now, so the latest edit wins"""
+    if "profile_images" not in event.fields:
+        return
+    user = await db.fetchone("SELECT profile_images FROM users WHERE id = ?", (event.user_id,))
+    if user:
+        await feed_service.refresh_user_feed_posts(event.user_id, json.loads(user["profile_images"] or "[]"))
+
+@event_bus.subscribe(ProfileUpdated)
+async def mark_compatibility_dirty(event: ProfileUpdated):
+    if event.fields & COMPATIBILITY_FIELDS:
+        compatibility_job.mark_dirty(event.user_id)
+
+@event_bus.subscribe(ProfileUpdated)
+async def reset_discovery_deck(event: ProfileUpdated):
+    """Queued cards were picked with the old preferences; the next discover refills"""
+    if "preferences" in event.fields:
+        await discovery_deck_service.reset(event.user_id)
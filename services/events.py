@@ -0,0 +1,32 @@
+from typing import Dict, FrozenSet, NamedTuple
+
+# Domain events published on event_bus after the write they describe has
+# committed. key picks the worker, so events with the same key are handled
+# in the order they were published.
+
+class MessageSent(NamedTuple):
+    message: Dict  # the inserted messages row
+    sender_name: str
+    receiver_id: int
+
+    @property
+    def key(self) -> int:
+        return self.receiver_id
+
+class MatchCreated(NamedTuple):
+    match_id: int
+    user_id: int  # the user whose swipe completed the match
+    user_name: str
+    matched_user_id: int
+
+    @property
+    def key(self) -> int:
+        return self.matched_user_id
+
+class ProfileUpdated(NamedTuple):
+    user_id: int
+    fields: FrozenSet[str]  # users columns that changed
+
+    @property
+    def key(self) -> int:
+        return self.user_id
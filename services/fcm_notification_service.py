@@ -1,12 +1,30 @@
+import asyncio
 import os
+import time
 import aiohttp
 import json
 from typing import Optional
 
+from config.settings import settings
+
+SERVICE_ACCOUNT_FILE = 'heartlink-c3c2d-firebase-adminsdk-fbsvc-9739f1a00e.json'
+
+# push() outcomes
+SENT = "sent"
+INVALID_TOKEN = "invalid_token"  # the app was uninstalled or the token rotated; clear it
+RETRY = "retry"  # FCM or the network failed transiently
+FAILED = "failed"  # the request itself was rejected; retrying will not help
+
+# Legacy API per-token errors that mean the token is dead
+LEGACY_INVALID_ERRORS = {"NotRegistered", "InvalidRegistration", "MismatchSenderId"}
+LEGACY_RETRY_ERRORS = {"Unavailable", "InternalServerError", "DeviceMessageRateExceeded"}
+
 class FCMNotificationService:
     def __init__(self):
         # Try V1 API first, fallback to Legacy
-        self.use_legacy = not os.path.exists('heartlink-c3c2d-firebase-adminsdk-fbsvc-9739f1a00e.json')
+        self.use_legacy = not os.path.exists(SERVICE_ACCOUNT_FILE)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._credentials = None
         
         if self.use_legacy:
             # Legacy API
@@ -19,6 +37,19 @@ class FCMNotificationService:
             self.fcm_url = f'https://fcm.googleapis.com/v1/projects/{self.project_id}/messages:send'
             print("📱 Using FCM V1 API")
     
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Long-lived session so pushes reuse connections to FCM"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=settings.FCM_MAX_CONNECTIONS, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._session
+    
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+    
     async def send_notification(
         self,
         fcm_token: str,
@@ -31,16 +62,30 @@ class FCMNotificationService:
             print("⚠️ No FCM token provided")
             return False
         
-        if self.use_legacy:
-            return await self._send_legacy(fcm_token, title, body, data)
-        else:
-            return await self._send_v1(fcm_token, title, body, data)
+        return await self.push(fcm_token, title, body, data) == SENT
+    
+    async def push(
+        self,
+        fcm_token: str,
+        title: str,
+        body: str,
+        data: dict = None,
+        collapse_key: str = None
+    ) -> str:
+        """Send one notification; returns SENT, INVALID_TOKEN, RETRY or FAILED"""
+        try:
+            if self.use_legacy:
+                return await self._send_legacy(fcm_token, title, body, data, collapse_key)
+            return await self._send_v1(fcm_token, title, body, data, collapse_key)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"❌ Notification failed: {e}")
+            return RETRY
     
-    async def _send_legacy(self, fcm_token: str, title: str, body: str, data: dict = None) -> bool:
+    async def _send_legacy(self, fcm_token: str, title: str, body: str, data: dict = None, collapse_key: str = None) -> str:
         """Send using Legacy API (Server Key)"""
         if not self.server_key:
             print("⚠️ FCM_SERVER_KEY not configured")
-            return False
+            return FAILED
         
         headers = {
             'Authorization': f'key={self.server_key}',
@@ -64,58 +109,86 @@ class FCMNotificationService:
                 }
             }
         }
+        if collapse_key:
+            payload['collapse_key'] = collapse_key
+            payload['notification']['tag'] = collapse_key
         
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.fcm_url, headers=headers, json=payload) as response:
-                    result = await response.json()
-                    if response.status == 200 and result.get('success', 0) > 0:
-                        print(f"✅ Notification sent: {title}")
-                        return True
-                    else:
-                        print(f"❌ FCM error: {response.status} - {result}")
-                        return False
-        except Exception as e:
-            print(f"❌ Notification failed: {e}")
-            return False
+        session = self._get_session()
+        async with session.post(self.fcm_url, headers=headers, json=payload) as response:
+            if response.status == 429 or response.status >= 500:
+                print(f"❌ FCM error: {response.status}")
+                return RETRY
+            if response.status != 200:
+                print(f"❌ FCM error: {response.status}")
+                return FAILED
+            result = await response.json()
+            if result.get('success', 0) > 0:
+                print(f"✅ Notification sent: {title}")
+                return SENT
+            error = (result.get('results') or [{}])[0].get('error')
+            print(f"❌ FCM error: {response.status} - {result}")
+            if error in LEGACY_INVALID_ERRORS:
+                return INVALID_TOKEN
+            return RETRY if error in LEGACY_RETRY_ERRORS else FAILED
     
-    async def _send_v1(self, fcm_token: str, title: str, body: str, data: dict = None) -> bool:
-        """Send using V1 API (Service Account)"""
-        try:
-            from google.oauth2 import service_account
-            from google.auth.transport.requests import Request
-            
-            credentials = service_account.Credentials.from_service_account_file(
-                'heartlink-c3c2d-firebase-adminsdk-fbsvc-9739f1a00e.json',
+    async def _access_token(self) -> str:
+        """OAuth token for the V1 API, refreshed off the event loop shortly before it expires"""
+        from google.oauth2 import service_account
+        from google.auth.transport.requests import Request
+        
+        if self._credentials is None:
+            self._credentials = service_account.Credentials.from_service_account_file(
+                SERVICE_ACCOUNT_FILE,
                 scopes=['https://www.googleapis.com/auth/firebase.messaging']
             )
-            credentials.refresh(Request())
-            
-            headers = {
-                'Authorization': f'Bearer {credentials.token}',
-                'Content-Type': 'application/json',
-            }
-            
-            payload = {
-                'message': {
-                    'token': fcm_token,
-                    'notification': {'title': title, 'body': body},
-                    'data': data or {},
-                    'android': {'priority': 'high'}
-                }
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.fcm_url, headers=headers, json=payload) as response:
-                    if response.status == 200:
-                        print(f"✅ Notification sent: {title}")
-                        return True
-                    else:
-                        print(f"❌ FCM error: {response.status}")
-                        return False
+        expiry = self._credentials.expiry
+        if not self._credentials.token or expiry is None or expiry.timestamp() - 300 < time.time():
+            await asyncio.to_thread(self._credentials.refresh, Request())
+        return self._credentials.token
+    
+    async def _send_v1(self, fcm_token: str, title: str, body: str, data: dict = None, collapse_key: str = None) -> str:
+        """Send using V1 API (Service Account)"""
+        try:
+            token = await self._access_token()
         except Exception as e:
             print(f"❌ V1 API failed: {e}")
-            return False
+            return RETRY
+        
+        headers = {
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json',
+        }
+        
+        payload = {
+            'message': {
+                'token': fcm_token,
+                'notification': {'title': title, 'body': body},
+                'data': data or {},
+                'android': {'priority': 'high'}
+            }
+        }
+        if collapse_key:
+            payload['message']['android']['collapse_key'] = collapse_key
+            payload['message']['android']['notification'] = {'tag': collapse_key}
+        
+        session = self._get_session()
+        async with session.post(self.fcm_url, headers=headers, json=payload) as response:
+            if response.status == 200:
+                print(f"✅ Notification sent: {title}")
+                return SENT
+            print(f"❌ FCM error: {response.status}")
+            if response.status == 404:
+                return INVALID_TOKEN  # UNREGISTERED
+            if response.status == 400:
+                error = await response.json(content_type=None)
+                details = error.get('error', {}).get('details', [])
+                if any(detail.get('errorCode') == 'UNREGISTERED' for detail in details):
+                    return INVALID_TOKEN
+                return FAILED
+            if response.status == 401:
+                self._credentials = None
+                return RETRY
+            return RETRY if response.status == 429 or response.status >= 500 else FAILED
     
     async def send_match_notification(self, fcm_token: str, matched_user_name: str):
         """Send match notification"""
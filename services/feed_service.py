@@ -8,18 +8,26 @@ class FeedService:
         db = await get_db()
         
         try:
-            # Deactivate existing posts
-            await db.execute("""
-                UPDATE feed_posts SET is_active = 0 WHERE user_id = ?
-            """, (user_id,))
+            async with db.transaction():
+                active = await db.fetchall("""
+                    SELECT id, image_file_id FROM feed_posts WHERE user_id = ? AND is_active = 1
+                """, (user_id,))
+                
+                # Keep posts (and their likes) for images that are still there
+                keep = set(profile_images)
+                stale = [(post["id"],) for post in active if post["image_file_id"] not in keep]
+                posted = {post["image_file_id"] for post in active}
+                
+                if stale:
+                    await db.executemany("UPDATE feed_posts SET is_active = 0 WHERE id = ?", stale)
+                
+                # Add new posts for each new profile image
+                new_images = [(user_id, img_id) for img_id in dict.fromkeys(profile_images) if img_id not in posted]
+                if new_images:
+                    await db.executemany("""
+                        INSERT INTO feed_posts (user_id, image_file_id) VALUES (?, ?)
+                    """, new_images)
             
-            # Add new posts for each profile image
-            for img_id in profile_images:
-                await db.execute("""
-                    INSERT INTO feed_posts (user_id, image_file_id) VALUES (?, ?)
-                """, (user_id, img_id))
-            
-            await db.commit()
             return True
         except Exception as e:
             print(f"Error refreshing feed posts: {e}")
@@ -1,5 +1,7 @@
 from typing import Dict, List, Optional
 from config.database import get_db
+from config.settings import settings
+from services.geo_index import geo_index, haversine_km
 import json
 
 class FilterService:
@@ -27,21 +29,17 @@ class FilterService:
             where_conditions.append("u.age <= ?")
             params.append(filters['max_age'])
         
-        # Distance filter (if user has location)
-        if filters.get('max_distance_km'):
-            # Add distance calculation in query
-            where_conditions.append("""
-                (6371 * acos(cos(radians(?)) * cos(radians(u.latitude)) * 
-                cos(radians(u.longitude) - radians(?)) + sin(radians(?)) * 
-                sin(radians(u.latitude)))) <= ?
-            """)
-            # Get current user's location
-            current_user = await db.fetchone("SELECT latitude, longitude FROM users WHERE id = ?", (user_id,))
-            if current_user and current_user[0] and current_user[1]:
-                params.extend([current_user[0], current_user[1], current_user[0], filters['max_distance_km']])
-            else:
-                # Skip distance filter if no location
-                where_conditions.pop()
+        # Distance filter/sort uses the geo index rather than evaluating
+        # acos() on every row
+        current_user = await db.fetchone("SELECT latitude, longitude FROM users WHERE id = ?", (user_id,))
+        has_location = bool(current_user and current_user[0] is not None and current_user[1] is not None)
+        sort_by = filters.get('sort_by', 'recent')
+        
+        nearby = None
+        if has_location and filters.get('max_distance_km'):
+            nearby = geo_index.within(current_user[0], current_user[1], filters['max_distance_km'], exclude=user_id)
+        elif has_location and sort_by == 'distance':
+            nearby = geo_index.nearest(current_user[0], current_user[1], settings.GEO_SORT_CANDIDATES, exclude=user_id)
         
         # Education level filter
         if filters.get('education_levels'):
@@ -100,16 +98,27 @@ class FilterService:
         # Build final query
         where_clause = " AND ".join(where_conditions)
         
+        near_join = ""
+        near_params = []
+        distance_column = "NULL"
+        if nearby is not None:
+            # Within a distance filter only indexed hits qualify; when just
+            # sorting, users outside the nearest set sort last
+            join_type = "JOIN" if filters.get('max_distance_km') else "LEFT JOIN"
+            near_join = f"""
+                {join_type} (
+                    SELECT json_extract(value, '$[0]') AS user_id,
+                           json_extract(value, '$[1]') AS km
+                    FROM json_each(?)
+                ) near ON near.user_id = u.id
+            """
+            near_params = [json.dumps([[uid, round(distance, 2)] for uid, distance in nearby])]
+            distance_column = "near.km"
+        
         query = f"""
-            SELECT u.*, 
-                   CASE 
-                       WHEN u.latitude IS NOT NULL AND u.longitude IS NOT NULL 
-                       THEN (6371 * acos(cos(radians(?)) * cos(radians(u.latitude)) * 
-                            cos(radians(u.longitude) - radians(?)) + sin(radians(?)) * 
-                            sin(radians(u.latitude))))
-                       ELSE 999999 
-                   END as distance_km
+            SELECT u.*, {distance_column} as distance_km
             FROM users u
+            {near_join}
             WHERE {where_clause}
             ORDER BY 
                 CASE WHEN ? = 'compatibility' THEN 
@@ -117,26 +126,27 @@ class FilterService:
                      WHERE (cs.user1_id = ? AND cs.user2_id = u.id) OR 
                            (cs.user2_id = ? AND cs.user1_id = u.id)) 
                 END DESC,
-                CASE WHEN ? = 'distance' THEN distance_km END ASC,
+                CASE WHEN ? = 'distance' THEN COALESCE(distance_km, 999999) END ASC,
                 CASE WHEN ? = 'activity' THEN u.last_active END DESC,
                 u.created_at DESC
             LIMIT ?
         """
         
-        # Get current user location for distance calculation
-        current_user = await db.fetchone("SELECT latitude, longitude FROM users WHERE id = ?", (user_id,))
-        user_lat = current_user[0] if current_user and current_user[0] else 0
-        user_lon = current_user[1] if current_user and current_user[1] else 0
-        
-        # Sort preference
-        sort_by = filters.get('sort_by', 'recent')
+        # Add parameters for the distance join and sorting
+        final_params = near_params + params + [sort_by, user_id, user_id, sort_by, sort_by, limit]
         
-        # Add parameters for distance calculation and sorting
-        final_params = [user_lat, user_lon, user_lat] + params + [sort_by, user_id, user_id, sort_by, sort_by, limit]
+        users = [dict(user) for user in await db.fetchall(query, tuple(final_params))]
         
-        users = await db.fetchall(query, tuple(final_params))
+        # Rows the geo index did not place get their distance computed here;
+        # it stays None when either side has no location
+        if has_location:
+            for user in users:
+                if user['distance_km'] is None and user['latitude'] is not None and user['longitude'] is not None:
+                    user['distance_km'] = round(
+                        haversine_km(current_user[0], current_user[1], user['latitude'], user['longitude']), 2
+                    )
         
-        return [dict(user) for user in users]
+        return users
     
     @staticmethod
     def get_filter_options() -> Dict:
@@ -37,20 +37,20 @@ class GameService:
     
     async def create_zone(self, db, creator_id: int, zone_name: str):
         """Create new friend zone"""
-        cursor = await db.execute("""
-            INSERT INTO friend_zones (creator_id, zone_name, current_players)
-            VALUES (?, ?, 1)
-        """, (creator_id, zone_name))
-        
-        zone_id = cursor.lastrowid
+        async with db.transaction():
+            cursor = await db.execute("""
+                INSERT INTO friend_zones (creator_id, zone_name, current_players)
+                VALUES (?, ?, 1)
+            """, (creator_id, zone_name))
+            
+            zone_id = cursor.lastrowid
+            
+            # Add creator as admin
+            await db.execute("""
+                INSERT INTO zone_members (zone_id, user_id, role)
+                VALUES (?, ?, 'admin')
+            """, (zone_id, creator_id))
         
-        # Add creator as admin
-        await db.execute("""
-            INSERT INTO zone_members (zone_id, user_id, role)
-            VALUES (?, ?, 'admin')
-        """, (zone_id, creator_id))
-        
-        await db.commit()
         return zone_id
     
     async def join_zone(self, db, zone_id: int, user_id: int):
@@ -72,19 +72,19 @@ class GameService:
         if existing:
             return False
         
-        # Add member
-        await db.execute("""
-            INSERT INTO zone_members (zone_id, user_id, role)
-            VALUES (?, ?, 'member')
-        """, (zone_id, user_id))
-        
-        # Update player count
-        await db.execute("""
-            UPDATE friend_zones SET current_players = current_players + 1
-            WHERE id = ?
-        """, (zone_id,))
+        async with db.transaction():
+            # Add member
+            await db.execute("""
+                INSERT INTO zone_members (zone_id, user_id, role)
+                VALUES (?, ?, 'member')
+            """, (zone_id, user_id))
+            
+            # Update player count
+            await db.execute("""
+                UPDATE friend_zones SET current_players = current_players + 1
+                WHERE id = ?
+            """, (zone_id,))
         
-        await db.commit()
         return True
     
     async def start_game(self, db, zone_id: int):
@@ -3,6 +3,8 @@ import io
 from PIL import Image
 import numpy as np
 
+from services.auth_cache import principal_cache
+
 class GenderDetectionService:
     """
     Lightweight gender detection service
@@ -85,6 +87,7 @@ class GenderDetectionService:
                 (gender, confidence, user_id)
             )
             await db.commit()
+            principal_cache.invalidate(user_id)
             return True
         except Exception as e:
             print(f"Error storing verification: {e}")
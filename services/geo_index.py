@@ -0,0 +1,141 @@
+import math
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config.settings import settings
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE = 111.32
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two coordinates in km"""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
+
+    a = (math.sin(delta_lat / 2) ** 2 +
+         math.cos(lat1_rad) * math.cos(lat2_rad) *
+         math.sin(delta_lon / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+class GeoIndex:
+    """In-memory grid index of user GPS positions.
+
+    Positions are bucketed into fixed lat/lon cells. Radius and k-nearest
+    queries only visit the cells that can hold a hit and rank those points by
+    haversine distance. The index is loaded from `users` at startup and kept
+    current by the location endpoints; it is per process.
+    """
+
+    def __init__(self, cell_deg: float = None):
+        self.cell_deg = cell_deg or settings.GEO_INDEX_CELL_DEG
+        self.columns = int(math.ceil(360 / self.cell_deg))
+        self._cells: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+        # user_id -> (latitude, longitude, gps_updated_at as epoch seconds)
+        self._points: Dict[int, Tuple[float, float, float]] = {}
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        row = int(math.floor(latitude / self.cell_deg))
+        col = int(math.floor((longitude + 180) / self.cell_deg)) % self.columns
+        return row, col
+
+    def update(self, user_id: int, latitude: float, longitude: float, updated_at: Optional[float] = None):
+        """Insert or move a user; updated_at defaults to now"""
+        self.remove(user_id)
+        self._points[user_id] = (latitude, longitude, time.time() if updated_at is None else updated_at)
+        self._cells[self._cell(latitude, longitude)].add(user_id)
+
+    def remove(self, user_id: int):
+        point = self._points.pop(user_id, None)
+        if point:
+            cell = self._cell(point[0], point[1])
+            self._cells[cell].discard(user_id)
+            if not self._cells[cell]:
+                del self._cells[cell]
+
+    def position(self, user_id: int) -> Optional[Tuple[float, float, float]]:
+        return self._points.get(user_id)
+
+    def _cells_within(self, latitude: float, longitude: float, radius_km: float) -> Iterable[Tuple[int, int]]:
+        lat_span = radius_km / KM_PER_DEGREE
+        min_row, _ = self._cell(max(-90.0, latitude - lat_span), longitude)
+        max_row, _ = self._cell(min(90.0, latitude + lat_span), longitude)
+
+        # Widest longitude span is at the box edge closest to a pole
+        widest_lat = min(89.9, abs(latitude) + lat_span)
+        lon_span = radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest_lat)))
+        if lon_span >= 180:
+            cols = range(self.columns)
+        else:
+            _, first = self._cell(latitude, longitude - lon_span)
+            count = int(math.ceil(2 * lon_span / self.cell_deg)) + 1
+            cols = [(first + i) % self.columns for i in range(min(count, self.columns))]
+
+        for row in range(min_row, max_row + 1):
+            for col in cols:
+                if (row, col) in self._cells:
+                    yield row, col
+
+    def within(self, latitude: float, longitude: float, radius_km: float,
+               limit: Optional[int] = None, exclude: Optional[int] = None,
+               max_age_seconds: Optional[float] = None) -> List[Tuple[int, float]]:
+        """[(user_id, distance_km)] within radius_km, nearest first"""
+        cutoff = time.time() - max_age_seconds if max_age_seconds else None
+        hits = []
+        for cell in self._cells_within(latitude, longitude, radius_km):
+            for user_id in self._cells[cell]:
+                if user_id == exclude:
+                    continue
+                lat, lon, updated_at = self._points[user_id]
+                if cutoff and updated_at < cutoff:
+                    continue
+                distance = haversine_km(latitude, longitude, lat, lon)
+                if distance <= radius_km:
+                    hits.append((user_id, distance))
+
+        hits.sort(key=lambda hit: hit[1])
+        return hits[:limit] if limit else hits
+
+    def nearest(self, latitude: float, longitude: float, k: int,
+                exclude: Optional[int] = None, max_age_seconds: Optional[float] = None,
+                max_radius_km: float = MAX_DISTANCE_KM) -> List[Tuple[int, float]]:
+        """The k nearest users, found by widening the search radius"""
+        radius = self.cell_deg * KM_PER_DEGREE
+        while True:
+            hits = self.within(latitude, longitude, radius, exclude=exclude, max_age_seconds=max_age_seconds)
+            # Every point inside the radius has been seen, so the first k are exact
+            if len(hits) >= k or radius >= max_radius_km:
+                return hits[:k]
+            radius = min(radius * 2, max_radius_km)
+
+    async def load(self, db):
+        """Rebuild the index from every user with GPS coordinates"""
+        rows = await db.fetchall("""
+            SELECT id, latitude, longitude, gps_updated_at FROM users
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        """)
+        self._cells.clear()
+        self._points.clear()
+        for row in rows:
+            self.update(row["id"], row["latitude"], row["longitude"], _epoch(row["gps_updated_at"]))
+        print(f"✅ Geo index loaded ({len(self)} users)")
+
+def _epoch(timestamp) -> float:
+    """SQLite CURRENT_TIMESTAMP text (UTC) to epoch seconds"""
+    if not timestamp:
+        return 0.0
+    try:
+        parsed = datetime.strptime(str(timestamp)[:19], "%Y-%m-%d %H:%M:%S")
+        return parsed.replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return 0.0
+
+# Global instance
+geo_index = GeoIndex()
@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import io
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+
+from PIL import Image, ImageFilter, ImageOps
+
+from config.database import db
+from config.settings import settings
+
+# Longest edge in pixels, smallest first
+VARIANT_SIZES = {
+    'avatar': 160,
+    'card': 720,
+    'full': 1440,
+}
+BLURRED_VARIANTS = ('avatar', 'card')
+
+def blurred(variant: str) -> str:
+    return f"{variant}_blur"
+
+def render_variants(data: bytes, quality: int) -> Dict[str, Tuple[bytes, int, int]]:
+    """Decode an upload and encode every variant as WebP: {name: (bytes, width, height)}.
+
+    Runs in a worker process. Orientation is applied from EXIF and the
+    metadata itself is dropped, so no variant carries location or camera data.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    variants = {}
+    for name, edge in VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((edge, edge), Image.LANCZOS)
+        variants[name] = resized
+
+        if name in BLURRED_VARIANTS:
+            # Blur at 1/8 scale: cheaper and stronger than a large-radius blur
+            small = resized.resize((max(1, resized.width // 8), max(1, resized.height // 8)), Image.BILINEAR)
+            variants[blurred(name)] = small.filter(ImageFilter.GaussianBlur(2)).resize(resized.size, Image.BILINEAR)
+
+    encoded = {}
+    for name, variant in variants.items():
+        buffer = io.BytesIO()
+        variant.save(buffer, format='WEBP', quality=quality, method=4)
+        encoded[name] = (buffer.getvalue(), variant.width, variant.height)
+    return encoded
+
+class ImagePipeline:
+    """Upload-time image processing: EXIF strip, WebP, fixed sizes, blurred copies.
+
+    Rendering runs in a process pool so large decodes do not block the event
+    loop. Every variant is put in the media storage backend and recorded in
+    image_variants against the key of the 'full' variant, which is the id
+    kept in profile_images. Uploads are keyed by content hash, so the same
+    bytes uploaded again reuse the existing file_id.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.deduplicated = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=settings.IMAGE_PROCESS_WORKERS)
+        return self._executor
+
+    async def render(self, data: bytes) -> Dict[str, Tuple[bytes, int, int]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(), render_variants, data, settings.IMAGE_WEBP_QUALITY)
+
+    async def process_and_store(self, data: bytes) -> str:
+        """file_id for an upload: reused if these bytes were seen before, else rendered and stored"""
+        content_hash = hashlib.sha256(data).hexdigest()
+        row = await db.fetchone("SELECT file_id FROM image_hashes WHERE content_hash = ?", (content_hash,))
+        if row:
+            self.deduplicated += 1
+            return row["file_id"]
+
+        # Identical uploads in flight at the same time share one render
+        inflight = self._inflight.get(content_hash)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._store(data, content_hash))
+            self._inflight[content_hash] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(content_hash, None))
+        else:
+            self.deduplicated += 1
+        return await asyncio.shield(inflight)
+
+    async def _store(self, data: bytes, content_hash: str) -> str:
+        from services.media_storage import media_storage
+
+        variants = await self.render(data)
+        names = list(variants)
+        file_ids = await asyncio.gather(*(media_storage.put(variants[name][0]) for name in names))
+        uploaded = dict(zip(names, file_ids))
+        file_id = uploaded['full']
+
+        async with db.transaction():
+            await db.executemany("""
+                INSERT OR REPLACE INTO image_variants (file_id, variant, variant_file_id, width, height, bytes)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (file_id, name, uploaded[name], width, height, len(encoded))
+                for name, (encoded, width, height) in variants.items()
+            ])
+            await db.execute(
+                "INSERT OR IGNORE INTO image_hashes (content_hash, file_id) VALUES (?, ?)",
+                (content_hash, file_id)
+            )
+
+        print(f"✅ Image processed: {len(data)} bytes -> "
+              + ", ".join(f"{name} {len(variants[name][0])}" for name in names))
+        return file_id
+
+    async def variant_ids(self, file_ids: Iterable[str], variant: str) -> Dict[str, str]:
+        """{file_id: variant file_id} for the images that have the variant"""
+        file_ids = list({file_id for file_id in file_ids if file_id})
+        if not file_ids:
+            return {}
+        placeholders = ",".join("?" for _ in file_ids)
+        rows = await db.fetchall(f"""
+            SELECT file_id, variant_file_id FROM image_variants
+            WHERE variant = ? AND file_id IN ({placeholders})
+        """, (variant, *file_ids))
+        return {row["file_id"]: row["variant_file_id"] for row in rows}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+# Global instance
+image_pipeline = ImagePipeline()
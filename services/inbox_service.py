@@ -0,0 +1,125 @@
+from typing import Dict, List, Optional
+
+from config.database import db
+
+# Characters of the last message kept in the chat list
+PREVIEW_LENGTH = 100
+
+class InboxService:
+    """Denormalized chat list kept in inbox_entries.
+
+    Each match has one row per member holding the partner, the last message
+    and that member's unread count, so the chat list is a single index
+    range per user. Writers keep the rows current inside the transaction
+    that changes the underlying data.
+    """
+
+    @staticmethod
+    async def open_match(match_id: int, user1_id: int, user2_id: int):
+        """Add both sides of a new match; must run inside db.transaction()"""
+        await db.executemany("""
+            INSERT OR IGNORE INTO inbox_entries (user_id, match_id, partner_id, last_activity_at)
+            VALUES (?, ?, ?, COALESCE((SELECT created_at FROM matches WHERE id = ?), CURRENT_TIMESTAMP))
+        """, [
+            (user1_id, match_id, user2_id, match_id),
+            (user2_id, match_id, user1_id, match_id),
+        ])
+
+    @staticmethod
+    async def record_message(match_id: int, sender_id: int, receiver_id: int, message: Dict):
+        """Make a new message the last one on both sides and count it as unread for the receiver.
+
+        Must run inside db.transaction() together with the message insert.
+        """
+        update = """
+            UPDATE inbox_entries SET
+                last_message_id = ?,
+                last_message_sender_id = ?,
+                last_message_preview = ?,
+                last_message_type = ?,
+                last_activity_at = ?,
+                unread_count = unread_count + (user_id != ?)
+            WHERE match_id = ?
+        """
+        params = (
+            message["id"], sender_id, message["content"][:PREVIEW_LENGTH], message["message_type"],
+            message["created_at"], sender_id, match_id
+        )
+        cursor = await db.execute(update, params)
+        if cursor.rowcount < 2:
+            # Match predates the inbox rows
+            await InboxService.open_match(match_id, sender_id, receiver_id)
+            await InboxService.refresh_match(match_id)
+
+    @staticmethod
+    async def clear_unread(match_id: int, user_id: int, message_id: int) -> bool:
+        """Zero a member's unread count if message_id is the match's last message; False if it is not"""
+        cursor = await db.execute("""
+            UPDATE inbox_entries SET unread_count = 0
+            WHERE user_id = ? AND match_id = ? AND COALESCE(last_message_id, 0) <= ?
+        """, (user_id, match_id, message_id))
+        return cursor.rowcount > 0
+
+    @staticmethod
+    async def refresh_unread(match_id: int, user_id: int):
+        """Recount a member's unread messages from their read watermark"""
+        await db.execute("""
+            UPDATE inbox_entries SET unread_count = (
+                SELECT COUNT(*) FROM messages
+                WHERE match_id = ?
+                  AND id > COALESCE((SELECT last_read_message_id FROM read_watermarks
+                                     WHERE match_id = ? AND user_id = ?), 0)
+                  AND sender_id != ?
+            )
+            WHERE user_id = ? AND match_id = ?
+        """, (match_id, match_id, user_id, user_id, user_id, match_id))
+
+    @staticmethod
+    async def refresh_match(match_id: int):
+        """Rebuild both rows of a match from its messages, e.g. after a message is deleted"""
+        latest = await db.fetchone("""
+            SELECT id, sender_id, content, message_type, created_at FROM messages
+            WHERE match_id = ? ORDER BY id DESC LIMIT 1
+        """, (match_id,))
+        await db.execute("""
+            UPDATE inbox_entries SET
+                last_message_id = ?,
+                last_message_sender_id = ?,
+                last_message_preview = ?,
+                last_message_type = ?,
+                last_activity_at = COALESCE(?, last_activity_at)
+            WHERE match_id = ?
+        """, (
+            latest["id"] if latest else None,
+            latest["sender_id"] if latest else None,
+            latest["content"][:PREVIEW_LENGTH] if latest else None,
+            latest["message_type"] if latest else None,
+            latest["created_at"] if latest else None,
+            match_id
+        ))
+        rows = await db.fetchall("SELECT user_id FROM inbox_entries WHERE match_id = ?", (match_id,))
+        for row in rows:
+            await InboxService.refresh_unread(match_id, row["user_id"])
+
+    @staticmethod
+    async def get_page(user_id: int, limit: int, before: Optional[List] = None) -> List[Dict]:
+        """A user's conversations, most recent activity first, after an optional (last_activity_at, match_id) key"""
+        if before is None:
+            rows = await db.fetchall("""
+                SELECT i.*, u.name AS partner_name, u.age AS partner_age, u.profile_images AS partner_images
+                FROM inbox_entries i
+                JOIN users u ON u.id = i.partner_id
+                WHERE i.user_id = ?
+                ORDER BY i.last_activity_at DESC, i.match_id DESC
+                LIMIT ?
+            """, (user_id, limit))
+        else:
+            rows = await db.fetchall("""
+                SELECT i.*, u.name AS partner_name, u.age AS partner_age, u.profile_images AS partner_images
+                FROM inbox_entries i
+                JOIN users u ON u.id = i.partner_id
+                WHERE i.user_id = ? AND (i.last_activity_at, i.match_id) < (?, ?)
+                ORDER BY i.last_activity_at DESC, i.match_id DESC
+                LIMIT ?
+            """, (user_id, before[0], before[1], limit))
+        return [dict(row) for row in rows]
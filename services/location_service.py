@@ -1,6 +1,8 @@
 import math
 from typing import List, Tuple, Optional
 from config.database import db
+from services.geo_index import geo_index
+from services.auth_cache import principal_cache
 
 class LocationService:
     @staticmethod
@@ -22,54 +24,57 @@ class LocationService:
     
     @staticmethod
     async def find_nearby_users(user_id: int, latitude: float, longitude: float, 
-                               radius_km: float = 5.0, limit: int = 50) -> List[dict]:
-        """Find users within specified radius"""
-        query = """
+                               radius_km: float = 5.0, limit: int = 50,
+                               max_age_hours: Optional[float] = None) -> List[dict]:
+        """Find users within specified radius, nearest first"""
+        hits = geo_index.within(
+            latitude, longitude, radius_km, limit=limit, exclude=user_id,
+            max_age_seconds=max_age_hours * 3600 if max_age_hours else None
+        )
+        if not hits:
+            return []
+        
+        distances = dict(hits)
+        placeholders = ",".join("?" for _ in distances)
+        users = await db.fetchall(f"""
             SELECT id, name, age, bio, latitude, longitude, interests, relationship_intent,
-                   profile_images, location
+                   profile_images, location, created_at
             FROM users 
-            WHERE id != ? 
-            AND latitude IS NOT NULL 
-            AND longitude IS NOT NULL
-            LIMIT ?
-        """
-        
-        users = await db.fetchall(query, (user_id, limit * 3))  # Get more to filter by distance
+            WHERE id IN ({placeholders})
+        """, tuple(distances))
         
-        nearby_users = []
-        for user in users:
-            if user[4] and user[5]:  # latitude and longitude exist
-                distance = LocationService.calculate_distance(
-                    latitude, longitude, user[4], user[5]
-                )
-                
-                if distance <= radius_km:
-                    nearby_users.append({
-                        'id': user[0],
-                        'name': user[1],
-                        'age': user[2],
-                        'bio': user[3],
-                        'latitude': user[4],
-                        'longitude': user[5],
-                        'interests': user[6],
-                        'relationship_intent': user[7],
-                        'profile_images': user[8],
-                        'location': user[9],
-                        'distance_km': round(distance, 2)
-                    })
+        nearby_users = [
+            {
+                'id': user[0],
+                'name': user[1],
+                'age': user[2],
+                'bio': user[3],
+                'latitude': user[4],
+                'longitude': user[5],
+                'interests': user[6],
+                'relationship_intent': user[7],
+                'profile_images': user[8],
+                'location': user[9],
+                'created_at': user[10],
+                'distance_km': round(distances[user[0]], 2)
+            }
+            for user in users
+        ]
         
-        # Sort by distance and limit results
         nearby_users.sort(key=lambda x: x['distance_km'])
-        return nearby_users[:limit]
+        return nearby_users
     
     @staticmethod
     async def update_user_location(user_id: int, latitude: float, longitude: float, 
                                   location_name: Optional[str] = None):
-        """Update user's location coordinates"""
+        """Update user's GPS coordinates in the database and the geo index"""
         query = """
             UPDATE users 
-            SET latitude = ?, longitude = ?, location = ?
+            SET latitude = ?, longitude = ?, location = ?,
+                gps_updated_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
             WHERE id = ?
         """
         await db.execute(query, (latitude, longitude, location_name, user_id))
-        await db.commit()
\ No newline at end of file
+        await db.commit()
+        principal_cache.invalidate(user_id)
+        geo_index.update(user_id, latitude, longitude)
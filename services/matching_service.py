@@ -1,5 +1,5 @@
 import json
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from config.database import db
 from services.location_service import LocationService
 
@@ -26,6 +26,36 @@ class MatchingService:
         
         return len(common_interests) / len(total_interests) if total_interests else 0.0
     
+    @staticmethod
+    def preference_conditions(filters: Dict) -> Tuple[List[str], List]:
+        """SQL predicates on candidate rows `u` for age, intent and gender preferences.
+        
+        Keys: min_age, max_age, relationship_intent, gender; missing keys
+        do not filter.
+        """
+        conditions = []
+        params = []
+        
+        # Age filter
+        if filters.get('min_age'):
+            conditions.append("u.age >= ?")
+            params.append(filters['min_age'])
+        if filters.get('max_age'):
+            conditions.append("u.age <= ?")
+            params.append(filters['max_age'])
+        
+        # Relationship intent filter
+        if filters.get('relationship_intent'):
+            conditions.append("u.relationship_intent = ?")
+            params.append(filters['relationship_intent'])
+        
+        # Gender filter
+        if filters.get('gender'):
+            conditions.append("u.gender = ?")
+            params.append(filters['gender'])
+        
+        return conditions, params
+    
     @staticmethod
     async def get_filtered_matches(user_id: int, filters: Dict) -> List[dict]:
         """Get potential matches with advanced filtering"""
@@ -46,27 +76,18 @@ class MatchingService:
         conditions = ["u.id != ?"]
         params = [user_id]
         
-        # Age filter
-        if filters.get('min_age'):
-            conditions.append("u.age >= ?")
-            params.append(filters['min_age'])
-        if filters.get('max_age'):
-            conditions.append("u.age <= ?")
-            params.append(filters['max_age'])
-        
-        # Relationship intent filter
-        if filters.get('relationship_intent'):
-            conditions.append("u.relationship_intent = ?")
-            params.append(filters['relationship_intent'])
+        preference_conditions, preference_params = MatchingService.preference_conditions(filters)
+        conditions.extend(preference_conditions)
+        params.extend(preference_params)
         
         # Location filter (if user has location)
         if user_lat and user_lon and filters.get('max_distance_km'):
             conditions.append("u.latitude IS NOT NULL AND u.longitude IS NOT NULL")
         
-        # Exclude already swiped users
+        # Exclude already swiped users (probes the swipes unique index per row)
         conditions.append("""
-            u.id NOT IN (
-                SELECT swiped_id FROM swipes WHERE swiper_id = ?
+            NOT EXISTS (
+                SELECT 1 FROM swipes s WHERE s.swiper_id = ? AND s.swiped_id = u.id
             )
         """)
         params.append(user_id)
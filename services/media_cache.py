@@ -0,0 +1,288 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from typing import AsyncIterator, BinaryIO, Dict, List, NamedTuple, Optional, Tuple
+
+from config.settings import settings
+
+class CachedMedia(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+    content_type: str
+
+def sniff_content_type(head: bytes) -> str:
+    """Media type from the first bytes of a file"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if head[4:8] == b'ftyp':
+        return 'video/mp4'
+    return 'application/octet-stream'
+
+class MediaCache:
+    """Size-bounded, content-addressed disk cache of media served by /media.
+
+    Bytes are stored once per content hash under blobs/<sha[:2]>/<sha>, so
+    file_ids with identical content share a blob; refs/<sha1(file_id)> maps a
+    file_id to its blob and content type. Blob mtimes record the last time a
+    blob was served and the least recently served ones are evicted when the
+    total exceeds MEDIA_CACHE_MAX_BYTES, skipping blobs a response is still
+    reading. File IO runs in worker threads. Misses are fetched once from the
+    media storage backend (or Telegram for legacy file_ids), with concurrent
+    requests for the same id sharing the download.
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = None):
+        self.directory = directory or settings.MEDIA_CACHE_DIR
+        self.max_bytes = max_bytes or settings.MEDIA_CACHE_MAX_BYTES
+        self._blobs: "OrderedDict[str, int]" = OrderedDict()  # sha256 -> size, LRU first
+        self.total_bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._readers: Dict[str, int] = {}  # sha256 -> responses still streaming it
+        self._disk_lock = asyncio.Lock()  # orders blob placement against eviction deletes
+        self._loaded = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.directory, "blobs", sha256[:2], sha256)
+
+    def _ref_path(self, file_id: str) -> str:
+        key = hashlib.sha1(file_id.encode()).hexdigest()
+        return os.path.join(self.directory, "refs", key[:2], key)
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        """(mtime, sha256, size) of every blob on disk, least recently served first"""
+        blobs = []
+        blob_root = os.path.join(self.directory, "blobs")
+        for root, _, files in os.walk(blob_root):
+            for name in files:
+                stat = os.stat(os.path.join(root, name))
+                blobs.append((stat.st_mtime, name, stat.st_size))
+        return sorted(blobs)
+
+    def _apply_scan(self, blobs: List[Tuple[float, str, int]]):
+        self._blobs.clear()
+        for _, sha256, size in blobs:
+            self._blobs[sha256] = size
+        self.total_bytes = sum(self._blobs.values())
+        self._loaded = True
+        print(f"✅ Media cache loaded ({len(self._blobs)} files, {self.total_bytes // (1024 * 1024)}MB)")
+
+    async def load(self):
+        """Rebuild the LRU order and size total from the blobs on disk"""
+        self._apply_scan(await asyncio.to_thread(self._scan))
+
+    async def _ensure_loaded(self):
+        if not self._loaded:
+            await self.load()
+
+    def _read_ref(self, file_id: str) -> Optional[Tuple[str, str]]:
+        try:
+            with open(self._ref_path(file_id)) as ref:
+                sha256, content_type = ref.read().split("\n", 1)
+        except (FileNotFoundError, ValueError):
+            return None
+        return sha256, content_type
+
+    def _acquire(self, sha256: str):
+        self._readers[sha256] = self._readers.get(sha256, 0) + 1
+
+    async def release(self, sha256: str):
+        """End a read started by get(); the blob may be evicted again once nobody reads it"""
+        readers = self._readers.get(sha256, 0) - 1
+        if readers > 0:
+            self._readers[sha256] = readers
+            return
+        self._readers.pop(sha256, None)
+        if self.total_bytes > self.max_bytes:
+            await self._remove(self._evict())
+
+    async def lookup(self, file_id: str) -> Optional[CachedMedia]:
+        """Cached media for a file_id, marking it recently used.
+
+        The blob is held for reading until release(sha256) is called.
+        """
+        await self._ensure_loaded()
+        ref = await asyncio.to_thread(self._read_ref, file_id)
+        if ref is None:
+            return None
+        sha256, content_type = ref
+
+        size = self._blobs.get(sha256)
+        if size is None:
+            # Blob was evicted; the stale ref is rewritten on the next store
+            return None
+        self._acquire(sha256)
+        path = self._blob_path(sha256)
+        try:
+            await asyncio.to_thread(os.utime, path)
+        except FileNotFoundError:
+            await self.release(sha256)
+            self._drop(sha256)
+            return None
+        self._blobs.move_to_end(sha256)
+        return CachedMedia(path, sha256, size, content_type)
+
+    def _drop(self, sha256: str):
+        size = self._blobs.pop(sha256, None)
+        if size is not None:
+            self.total_bytes -= size
+
+    def _evict(self) -> List[str]:
+        """Drop the least recently served blobs until the cache fits; returns their hashes.
+
+        Blobs with readers are skipped, as is the most recent one.
+        """
+        victims = []
+        if self.total_bytes <= self.max_bytes:
+            return victims
+        for sha256 in list(self._blobs)[:-1]:
+            if self.total_bytes <= self.max_bytes:
+                break
+            if sha256 in self._readers:
+                continue
+            self._drop(sha256)
+            victims.append(sha256)
+            self.evictions += 1
+        return victims
+
+    async def _remove(self, victims: List[str]):
+        """Delete evicted blobs from disk"""
+        def remove(paths: List[str]):
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        if not victims:
+            return
+        async with self._disk_lock:
+            # A store may have brought a blob back since it was evicted
+            paths = [self._blob_path(sha256) for sha256 in victims if sha256 not in self._blobs]
+            await asyncio.to_thread(remove, paths)
+
+    def _open_tmp(self) -> Tuple[BinaryIO, str]:
+        tmp_dir = os.path.join(self.directory, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        return os.fdopen(fd, "wb"), tmp_path
+
+    def _place_blob(self, tmp_path: str, path: str, exists: bool):
+        if exists:
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+
+    def _discard_tmp(self, tmp_path: str):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    def _write_ref(self, file_id: str, sha256: str, content_type: str):
+        ref_path = self._ref_path(file_id)
+        os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+        with open(ref_path, "w") as ref:
+            ref.write(f"{sha256}\n{content_type}")
+
+    async def store(self, file_id: str, chunks: AsyncIterator[bytes]) -> CachedMedia:
+        """Write a stream to the cache under its content hash"""
+        await self._ensure_loaded()
+
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+        tmp, tmp_path = await asyncio.to_thread(self._open_tmp)
+        try:
+            with tmp:
+                async for chunk in chunks:
+                    if len(head) < 16:
+                        head += chunk[:16 - len(head)]
+                    digest.update(chunk)
+                    await asyncio.to_thread(tmp.write, chunk)
+                    size += len(chunk)
+
+            sha256 = digest.hexdigest()
+            path = self._blob_path(sha256)
+            async with self._disk_lock:
+                exists = sha256 in self._blobs
+                await asyncio.to_thread(self._place_blob, tmp_path, path, exists)
+                if not exists:
+                    self._blobs[sha256] = size
+                    self.total_bytes += size
+        except BaseException:
+            await asyncio.to_thread(self._discard_tmp, tmp_path)
+            raise
+
+        content_type = sniff_content_type(head)
+        await asyncio.to_thread(self._write_ref, file_id, sha256, content_type)
+
+        if sha256 in self._blobs:
+            self._blobs.move_to_end(sha256)
+        await self._remove(self._evict())
+        return CachedMedia(path, sha256, size, content_type)
+
+    async def _fetch(self, file_id: str) -> Optional[CachedMedia]:
+        from services.media_storage import is_content_hash, media_storage
+        from services.telegram_service import telegram_service
+
+        if is_content_hash(file_id):
+            if await media_storage.stat(file_id) is None:
+                return None
+            return await self.store(file_id, media_storage.stream(file_id))
+
+        # Legacy uploads are addressed by their Telegram file_id
+        file_path = await telegram_service.get_file_path(file_id)
+        if file_path is None:
+            return None
+        return await self.store(file_id, telegram_service.iter_file(file_path))
+
+    async def get(self, file_id: str) -> Optional[CachedMedia]:
+        """Cached media for a file_id, downloading it on a miss.
+
+        The caller must release(media.sha256) once it has finished reading
+        the file, so the blob is not evicted while it is being served.
+        """
+        media = await self.lookup(file_id)
+        if media is not None:
+            self.hits += 1
+            return media
+
+        while True:
+            inflight = self._inflight.get(file_id)
+            if inflight is None:
+                self.misses += 1
+                inflight = asyncio.ensure_future(self._fetch(file_id))
+                self._inflight[file_id] = inflight
+                inflight.add_done_callback(lambda _: self._inflight.pop(file_id, None))
+            media = await asyncio.shield(inflight)
+            if media is None:
+                return None
+            # Another store may have evicted the blob before this waiter resumed
+            if media.sha256 in self._blobs:
+                self._acquire(media.sha256)
+                return media
+
+    def stats(self) -> Dict:
+        return {
+            "files": len(self._blobs),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "open_readers": sum(self._readers.values()),
+        }
+
+# Global instance
+media_cache = MediaCache()
@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+from typing import AsyncIterator, NamedTuple, Optional
+
+from config.database import db
+from config.settings import settings
+from services.media_cache import CachedMedia, sniff_content_type
+
+CONTENT_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+def is_content_hash(key: str) -> bool:
+    """True for storage keys; anything else is a legacy Telegram file_id"""
+    return bool(key) and bool(CONTENT_HASH_PATTERN.match(key))
+
+class StoredMedia(NamedTuple):
+    key: str
+    size: int
+    content_type: str
+
+class MediaStorage:
+    """Content-addressed media store.
+
+    Objects are written as bytes and addressed by the sha256 of those bytes,
+    so putting the same content twice is a no-op that returns the same key.
+    """
+
+    name = "base"
+    chunk_size = 64 * 1024
+
+    async def put(self, data: bytes) -> str:
+        raise NotImplementedError
+
+    def stream(self, key: str) -> AsyncIterator[bytes]:
+        raise NotImplementedError
+
+    async def stat(self, key: str) -> Optional[StoredMedia]:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if await self.stat(key) is None:
+            return None
+        return b"".join([chunk async for chunk in self.stream(key)])
+
+    async def local_media(self, key: str) -> Optional[CachedMedia]:
+        """The object as a local file, when the backend keeps one"""
+        return None
+
+class LocalMediaStorage(MediaStorage):
+    """Objects as files under <root>/<aa>/<bb>/<sha256>"""
+
+    name = "local"
+
+    def __init__(self, root: str = None):
+        self.root = root or settings.MEDIA_STORAGE_DIR
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def _write(self, key: str, data: bytes):
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    async def put(self, data: bytes) -> str:
+        key = hashlib.sha256(data).hexdigest()
+        await asyncio.to_thread(self._write, key, data)
+        return key
+
+    async def stream(self, key: str) -> AsyncIterator[bytes]:
+        with open(self._path(key), "rb") as file:
+            while True:
+                chunk = await asyncio.to_thread(file.read, self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _stat(self, key: str) -> Optional[StoredMedia]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                head = file.read(16)
+                size = os.fstat(file.fileno()).st_size
+        except FileNotFoundError:
+            return None
+        return StoredMedia(key, size, sniff_content_type(head))
+
+    async def stat(self, key: str) -> Optional[StoredMedia]:
+        if not is_content_hash(key):
+            return None
+        return await asyncio.to_thread(self._stat, key)
+
+    async def delete(self, key: str) -> bool:
+        if not is_content_hash(key):
+            return False
+        try:
+            await asyncio.to_thread(os.remove, self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def local_media(self, key: str) -> Optional[CachedMedia]:
+        if not is_content_hash(key):
+            return None
+        stored = await asyncio.to_thread(self._stat, key)
+        if stored is None:
+            return None
+        return CachedMedia(self._path(key), key, stored.size, stored.content_type)
+
+class TelegramMediaStorage(MediaStorage):
+    """Objects as documents in the storage chat; media_objects maps hash -> file_id.
+
+    The Bot API cannot delete a document by file_id, so delete only forgets
+    the mapping.
+    """
+
+    name = "telegram"
+
+    async def _file_id(self, key: str) -> Optional[str]:
+        row = await db.fetchone("SELECT file_id FROM media_objects WHERE content_hash = ?", (key,))
+        return row["file_id"] if row else None
+
+    async def put(self, data: bytes) -> str:
+        from services.telegram_service import telegram_service
+
+        key = hashlib.sha256(data).hexdigest()
+        if await self._file_id(key):
+            return key
+
+        content_type = sniff_content_type(data[:16])
+        extension = content_type.split("/")[-1]
+        file_id = await telegram_service.upload_document(data, f"{key[:16]}.{extension}")
+        await db.execute("""
+            INSERT OR IGNORE INTO media_objects (content_hash, file_id, size, content_type)
+            VALUES (?, ?, ?, ?)
+        """, (key, file_id, len(data), content_type))
+        await db.commit()
+        return key
+
+    async def stream(self, key: str) -> AsyncIterator[bytes]:
+        from services.telegram_service import telegram_service
+
+        file_id = await self._file_id(key)
+        file_path = await telegram_service.get_file_path(file_id) if file_id else None
+        if file_path is None:
+            raise FileNotFoundError(key)
+        async for chunk in telegram_service.iter_file(file_path, self.chunk_size):
+            yield chunk
+
+    async def stat(self, key: str) -> Optional[StoredMedia]:
+        row = await db.fetchone(
+            "SELECT size, content_type FROM media_objects WHERE content_hash = ?", (key,)
+        )
+        return StoredMedia(key, row["size"], row["content_type"]) if row else None
+
+    async def delete(self, key: str) -> bool:
+        row = await db.fetchone("DELETE FROM media_objects WHERE content_hash = ? RETURNING content_hash", (key,))
+        await db.commit()
+        return row is not None
+
+STORAGE_BACKENDS = {
+    LocalMediaStorage.name: LocalMediaStorage,
+    TelegramMediaStorage.name: TelegramMediaStorage,
+}
+
+def create_storage(backend: str = None) -> MediaStorage:
+    backend = (backend or settings.MEDIA_STORAGE_BACKEND).lower()
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown MEDIA_STORAGE_BACKEND '{backend}' (expected one of {', '.join(STORAGE_BACKENDS)})")
+    return STORAGE_BACKENDS[backend]()
+
+# Global instance
+media_storage = create_storage()
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from typing import Dict, List
+
+from config.database import db
+from config.settings import settings
+from services.anti_scam_service import AntiScamService
+
+class ModerationPipeline:
+    """Scores chat messages after they are committed, off the send path.
+
+    Send endpoints hand each new message to submit(), which only enqueues
+    it. Worker tasks take up to MODERATION_BATCH_SIZE queued messages at a
+    time, score them, write risk_score/is_flagged for the non-zero results
+    in one transaction and alert admins about the high-risk ones. When the
+    queue is full the message is left unscored and counted as dropped, so
+    a moderation backlog never slows chat down.
+    """
+
+    def __init__(self):
+        self.workers = settings.MODERATION_WORKERS
+        self.batch_size = settings.MODERATION_BATCH_SIZE
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=settings.MODERATION_QUEUE_SIZE)
+        self._tasks: List[asyncio.Task] = []
+
+        # Throughput counters
+        self.submitted = 0
+        self.dropped = 0
+        self.scored = 0
+        self.flagged = 0
+        self.alerts = 0
+        self.failed = 0
+        self.batches = 0
+        self.batch_seconds = 0.0
+
+    def submit(self, message: Dict):
+        """Queue a committed message row for scoring; never waits"""
+        # Rate signals are read now, while they describe the moment of sending
+        signals = AntiScamService.sender_signals(message["sender_id"])
+        try:
+            self._queue.put_nowait((message["id"], message["sender_id"], message["content"], signals))
+            self.submitted += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+            print(f"❌ Moderation queue full, message {message['id']} not scored")
+
+    async def _score_batch(self, batch: List[tuple]):
+        results = [
+            (message_id, sender_id, content, AntiScamService.assess(content, **signals))
+            for message_id, sender_id, content, signals in batch
+        ]
+
+        # Columns default to 0/FALSE, so clean messages need no write
+        updates = [
+            (result['risk_score'], result['is_suspicious'], message_id)
+            for message_id, _, _, result in results if result['risk_score']
+        ]
+        if updates:
+            async with db.transaction():
+                await db.executemany(
+                    "UPDATE messages SET risk_score = ?, is_flagged = ? WHERE id = ?", updates
+                )
+
+        self.scored += len(results)
+        self.flagged += sum(1 for _, _, _, result in results if result['is_suspicious'])
+        for _, sender_id, content, result in results:
+            if result['action_required']:
+                self.alerts += 1
+                await AntiScamService.send_alert(sender_id, content, result)
+
+    async def _worker(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            start = time.perf_counter()
+            try:
+                await self._score_batch(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                print(f"❌ Moderation batch failed: {e}")
+            finally:
+                self.batches += 1
+                self.batch_seconds += time.perf_counter() - start
+                for _ in batch:
+                    self._queue.task_done()
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        print(f"✅ Moderation pipeline started ({self.workers} workers)")
+
+    async def shutdown(self, timeout: float = 5.0):
+        """Score what is already queued, up to timeout seconds, then stop the workers"""
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                print(f"❌ Moderation pipeline stopped with {self._queue.qsize()} messages unscored")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize(),
+            "queue_limit": self._queue.maxsize,
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "scored": self.scored,
+            "flagged": self.flagged,
+            "alerts": self.alerts,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_batch_size": round((self.scored + self.failed) / self.batches, 1) if self.batches else 0.0,
+            "avg_batch_ms": round(self.batch_seconds / self.batches * 1000, 2) if self.batches else 0.0
+        }
+
+# Global instance
+moderation_pipeline = ModerationPipeline()
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List, Optional
+
+from config.database import db
+from config.settings import settings
+from services.fcm_notification_service import fcm_service, SENT, INVALID_TOKEN, RETRY
+
+class NotificationOutbox:
+    """Push notifications through the durable notification_outbox table.
+
+    enqueue() upserts one pending row per (user, collapse key): a burst of
+    messages in one conversation becomes a single push with the latest
+    text and a count, sent NOTIFICATION_COLLAPSE_SECONDS after the first.
+    The worker claims due rows in batches under a lease, pushes them
+    concurrently over the shared FCM session and records the results in
+    one transaction. Transient failures are retried with exponential
+    backoff up to NOTIFICATION_MAX_ATTEMPTS; tokens FCM rejects as invalid
+    are cleared from users. Delivery is at least once: a row whose lease
+    runs out, e.g. after a crash, is sent again.
+    """
+
+    def __init__(self):
+        self.batch_size = settings.NOTIFICATION_BATCH_SIZE
+        self.poll_interval = settings.NOTIFICATION_POLL_INTERVAL
+        self.collapse_seconds = settings.NOTIFICATION_COLLAPSE_SECONDS
+        self.max_attempts = settings.NOTIFICATION_MAX_ATTEMPTS
+        self.retry_base = settings.NOTIFICATION_RETRY_BASE
+        self.retry_max = settings.NOTIFICATION_RETRY_MAX
+        self.lease_seconds = settings.NOTIFICATION_LEASE_SECONDS
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+        # Throughput counters
+        self.enqueued = 0
+        self.collapsed = 0
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.no_token = 0
+        self.tokens_cleared = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_batch_seconds = 0.0
+
+    async def enqueue(self, user_id: int, collapse_key: str, title: str, body: str, data: Dict = None):
+        """Add a push for user_id, merging it into a pending one with the same collapse key"""
+        row = await db.fetchone("""
+            INSERT INTO notification_outbox (user_id, collapse_key, title, body, data, next_attempt_at)
+            VALUES (?, ?, ?, ?, ?, datetime('now', ?))
+            ON CONFLICT (user_id, collapse_key) DO UPDATE SET
+                title = excluded.title,
+                body = excluded.body,
+                data = excluded.data,
+                pending_count = pending_count + 1
+            RETURNING pending_count
+        """, (
+            user_id, collapse_key, title, body, json.dumps(data or {}),
+            f"+{self.collapse_seconds} seconds"
+        ))
+        await db.commit()
+        self.enqueued += 1
+        if row["pending_count"] > 1:
+            self.collapsed += 1
+        if self._wake is not None and self.collapse_seconds <= 0:
+            self._wake.set()
+
+    async def _claim(self) -> List[Dict]:
+        """Due rows with the recipient's current token, leased so no other run sends them meanwhile"""
+        async with db.transaction():
+            rows = await db.fetchall("""
+                SELECT o.id, o.user_id, o.collapse_key, o.title, o.body, o.data,
+                       o.pending_count, o.attempts, u.fcm_token
+                FROM notification_outbox o
+                LEFT JOIN users u ON u.id = o.user_id
+                WHERE o.next_attempt_at <= CURRENT_TIMESTAMP
+                ORDER BY o.next_attempt_at
+                LIMIT ?
+            """, (self.batch_size,))
+            if rows:
+                await db.executemany(
+                    "UPDATE notification_outbox SET next_attempt_at = datetime('now', ?) WHERE id = ?",
+                    [(f"+{self.lease_seconds} seconds", row["id"]) for row in rows]
+                )
+        return [dict(row) for row in rows]
+
+    async def _push(self, row: Dict) -> str:
+        body = row["body"]
+        if row["pending_count"] > 1:
+            body = f"{body} (+{row['pending_count'] - 1} more)"
+        return await fcm_service.push(
+            row["fcm_token"], row["title"], body, json.loads(row["data"] or "{}"), row["collapse_key"]
+        )
+
+    def _backoff(self, attempts: int) -> int:
+        """Seconds before retry number attempts, doubling with jitter"""
+        delay = min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+        return max(1, int(delay * random.uniform(0.8, 1.2)))
+
+    async def run_once(self) -> int:
+        """Send one batch of due notifications; returns rows handled"""
+        rows = await self._claim()
+        if not rows:
+            return 0
+
+        start = time.perf_counter()
+        sendable = [row for row in rows if row["fcm_token"]]
+        results = await asyncio.gather(*(self._push(row) for row in sendable))
+
+        sent, retry, remove, invalid = [], [], [], []
+        remove.extend((row["id"],) for row in rows if not row["fcm_token"])
+        for row, result in zip(sendable, results):
+            if result == SENT:
+                sent.append((row["pending_count"], row["id"]))
+            elif result == INVALID_TOKEN:
+                invalid.append((row["user_id"], row["fcm_token"]))
+                remove.append((row["id"],))
+            elif result == RETRY and row["attempts"] + 1 < self.max_attempts:
+                attempts = row["attempts"] + 1
+                retry.append((attempts, f"+{self._backoff(attempts)} seconds", row["id"]))
+            else:
+                remove.append((row["id"],))
+                self.dead += 1
+                print(f"❌ Dropping notification {row['id']} for user {row['user_id']} after {row['attempts'] + 1} attempts")
+
+        async with db.transaction():
+            if sent:
+                # Pushes collapsed in while this one was in flight stay pending and go out next
+                await db.executemany("""
+                    UPDATE notification_outbox
+                    SET pending_count = pending_count - ?, attempts = 0, next_attempt_at = datetime('now', ?)
+                    WHERE id = ?
+                """, [(count, f"+{self.collapse_seconds} seconds", row_id) for count, row_id in sent])
+                await db.executemany(
+                    "DELETE FROM notification_outbox WHERE id = ? AND pending_count <= 0",
+                    [(row_id,) for _, row_id in sent]
+                )
+            if retry:
+                await db.executemany("""
+                    UPDATE notification_outbox
+                    SET attempts = ?, next_attempt_at = datetime('now', ?)
+                    WHERE id = ?
+                """, retry)
+            if remove:
+                await db.executemany("DELETE FROM notification_outbox WHERE id = ?", remove)
+            if invalid:
+                # Only if the app has not registered a new token meanwhile
+                await db.executemany(
+                    "UPDATE users SET fcm_token = NULL WHERE id = ? AND fcm_token = ?", invalid
+                )
+
+        self.sent += len(sent)
+        self.retried += len(retry)
+        self.no_token += len(rows) - len(sendable)
+        self.tokens_cleared += len(invalid)
+        self.batches += 1
+        self.last_batch_size = len(rows)
+        self.last_batch_seconds = time.perf_counter() - start
+        return len(rows)
+
+    async def _loop(self):
+        while True:
+            try:
+                handled = await self.run_once()
+            except Exception as e:
+                print(f"❌ Notification outbox batch failed: {e}")
+                handled = 0
+            if handled >= self.batch_size:
+                continue  # more are probably due
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self):
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._loop())
+        print("✅ Notification outbox worker started")
+
+    async def shutdown(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "enqueued": self.enqueued,
+            "collapsed": self.collapsed,
+            "sent": self.sent,
+            "retried": self.retried,
+            "dead": self.dead,
+            "no_token": self.no_token,
+            "tokens_cleared": self.tokens_cleared,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "last_batch_ms": round(self.last_batch_seconds * 1000, 2)
+        }
+
+# Global instance
+notification_outbox = NotificationOutbox()
@@ -0,0 +1,33 @@
+import base64
+import json
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException, status
+
+# List endpoints keep their JSON array bodies and return cursors as headers
+NEXT_CURSOR_HEADER = "X-Next-Cursor"  # pass back to fetch the next (older) page
+LATEST_CURSOR_HEADER = "X-Latest-Cursor"  # newest row returned; chat "after" polling
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque keyset cursor for the sort key of the last row of a page"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[Any]]:
+    """Sort key values from a cursor, or None for the first page; 400 when malformed"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+def next_cursor(rows: Sequence, limit: int, *keys: str) -> Optional[str]:
+    """Cursor after the last row of a full page; None when the page is the last one"""
+    if not rows or len(rows) < limit:
+        return None
+    return encode_cursor(*(rows[-1][key] for key in keys))
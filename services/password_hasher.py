@@ -0,0 +1,96 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from config.settings import settings
+
+class PasswordHasher:
+    """bcrypt hashing and verification on a bounded worker pool.
+
+    bcrypt releases the GIL, so a small thread pool keeps the event loop
+    free without pickling passwords to another process. At most
+    PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE calls are admitted at once;
+    beyond that requests fail fast with 503 instead of queueing unbounded
+    CPU work behind a login burst. Hashes whose cost differs from
+    BCRYPT_ROUNDS are reported by verify_and_update for rehashing.
+    """
+
+    def __init__(self, rounds: int = None, workers: int = None, queue: int = None):
+        self.rounds = rounds or settings.BCRYPT_ROUNDS
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS
+        self.queue = settings.PASSWORD_HASH_QUEUE if queue is None else queue
+        self.context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=self.rounds, deprecated="auto")
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self.hashed = 0
+        self.verified = 0
+        self.rehashed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers + self.queue)
+        if self._slots.locked():
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many sign-in attempts in progress, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
+            try:
+                return await loop.run_in_executor(self._pool(), fn, *args)
+            finally:
+                self.busy_seconds += time.perf_counter() - start
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(self.context.hash, password)
+        self.hashed += 1
+        return hashed
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        verified, _ = await self.verify_and_update(password, hashed)
+        return verified
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(matches, new hash or None); a new hash is returned when the stored cost is outdated"""
+        verified, new_hash = await self._run(self.context.verify_and_update, password, hashed)
+        self.verified += 1
+        if new_hash:
+            self.rehashed += 1
+        return verified, new_hash
+
+    def stats(self) -> Dict:
+        calls = self.hashed + self.verified
+        return {
+            "rounds": self.rounds,
+            "workers": self.workers,
+            "queue_limit": self.queue,
+            "hashed": self.hashed,
+            "verified": self.verified,
+            "rehashed": self.rehashed,
+            "rejected": self.rejected,
+            "avg_latency_ms": round(self.busy_seconds / calls * 1000, 1) if calls else 0.0,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+# Global instance
+password_hasher = PasswordHasher()
@@ -1,5 +1,6 @@
 from typing import Optional
 from config.database import db
+from services.auth_cache import principal_cache
 
 class PhotoPrivacyService:
     
@@ -37,11 +38,15 @@ class PhotoPrivacyService:
     @staticmethod
     async def get_photo_url(photo_id: str, viewer_id: int, profile_owner_id: int) -> dict:
         """Get photo URL with blur status"""
+        from services.telegram_service import get_image_urls
         should_blur = await PhotoPrivacyService.should_blur_photos(viewer_id, profile_owner_id)
         
+        # Blurred copies are rendered server side at upload time
+        urls = await get_image_urls([photo_id], variant='card_blur' if should_blur else 'card')
+        
         return {
             'photo_id': photo_id,
-            'url': f"https://api.telegram.org/file/bot{photo_id}",
+            'url': urls[photo_id],
             'is_blurred': should_blur,
             'blur_level': 'medium' if should_blur else 'none'
         }
@@ -66,4 +71,5 @@ class PhotoPrivacyService:
             UPDATE users SET preferences = ? WHERE id = ?
         """, (json.dumps(prefs), user_id))
         
-        await db.commit()
\ No newline at end of file
+        await db.commit()
+        principal_cache.invalidate(user_id)
\ No newline at end of file
@@ -0,0 +1,103 @@
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Tuple
+
+from fastapi import HTTPException, status
+
+from config.settings import settings
+
+def parse_limit(spec: str) -> Tuple[int, float]:
+    """Parse "30/60" as 30 requests per 60 seconds; a count of 0 disables the limit"""
+    count, seconds = spec.split("/")
+    return int(count), float(seconds)
+
+class RateTracker:
+    """Sliding-window request log per (user, action), held in memory.
+
+    Each key keeps the times of its accepted requests inside the window, at
+    most the limit of them, so a check is a few deque operations and never
+    touches the database. Least recently used keys are evicted beyond
+    RATE_TRACKER_MAX_KEYS. Limits are per process: with several server
+    processes each one enforces its own window.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, float]] = None, max_keys: int = None):
+        self.limits = limits or {
+            "message": parse_limit(settings.RATE_LIMIT_MESSAGE),
+            "swipe": parse_limit(settings.RATE_LIMIT_SWIPE),
+            "report": parse_limit(settings.RATE_LIMIT_REPORT),
+        }
+        self.max_keys = max_keys or settings.RATE_TRACKER_MAX_KEYS
+        # (user_id, action) -> [accepted request times, time of the last 429]
+        self._keys: "OrderedDict[Tuple[int, str], List]" = OrderedDict()
+
+        self.allowed = {action: 0 for action in self.limits}
+        self.rejected = {action: 0 for action in self.limits}
+
+    def _entry(self, user_id: int, action: str, now: float) -> List:
+        key = (user_id, action)
+        entry = self._keys.get(key)
+        if entry is None:
+            entry = self._keys[key] = [deque(maxlen=max(self.limits[action][0], 1)), None]
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+        else:
+            self._keys.move_to_end(key)
+
+        log: Deque[float] = entry[0]
+        window_start = now - self.limits[action][1]
+        while log and log[0] <= window_start:
+            log.popleft()
+        return entry
+
+    def hit(self, user_id: int, action: str, cost: int = 1):
+        """Count cost requests against the user's limit for action; 429 when over it"""
+        limit, window = self.limits[action]
+        if limit <= 0:
+            return
+        now = time.monotonic()
+        entry = self._entry(user_id, action, now)
+        log: Deque[float] = entry[0]
+
+        if len(log) + cost > limit:
+            self.rejected[action] += 1
+            entry[1] = now
+            # Wait until enough of the logged requests leave the window
+            if cost > limit:
+                retry_after = window
+            else:
+                retry_after = log[len(log) + cost - limit - 1] + window - now
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Too many {action} requests, please slow down",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+        self.allowed[action] += 1
+        log.extend([now] * cost)
+
+    def recent(self, user_id: int, action: str, seconds: float) -> int:
+        """Accepted requests in the last seconds (up to the action's window)"""
+        entry = self._keys.get((user_id, action))
+        if entry is None:
+            return 0
+        since = time.monotonic() - seconds
+        return sum(1 for at in entry[0] if at > since)
+
+    def throttled(self, user_id: int, action: str, seconds: float) -> bool:
+        """Whether the user got a 429 for action in the last seconds"""
+        entry = self._keys.get((user_id, action))
+        return bool(entry and entry[1] is not None and entry[1] > time.monotonic() - seconds)
+
+    def stats(self) -> Dict:
+        return {
+            "keys": len(self._keys),
+            "max_keys": self.max_keys,
+            "limits": {action: f"{limit}/{window:g}s" for action, (limit, window) in self.limits.items()},
+            "allowed": dict(self.allowed),
+            "rejected": dict(self.rejected)
+        }
+
+# Global instance
+rate_tracker = RateTracker()
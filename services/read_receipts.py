@@ -0,0 +1,54 @@
+from typing import Dict
+
+from config.database import db
+from services.inbox_service import InboxService
+
+class ReadReceiptService:
+    """Read state as one watermark per (match, user).
+
+    A user has read every message in the match with id <= their
+    last_read_message_id, so marking a conversation read is a single row
+    upsert and unread counts are an index range scan above the watermark.
+    """
+
+    @staticmethod
+    async def get_watermarks(match_id: int) -> Dict[int, int]:
+        """{user_id: last_read_message_id} for the members who have read anything"""
+        rows = await db.fetchall(
+            "SELECT user_id, last_read_message_id FROM read_watermarks WHERE match_id = ?",
+            (match_id,)
+        )
+        return {row["user_id"]: row["last_read_message_id"] for row in rows}
+
+    @staticmethod
+    async def mark_read(match_id: int, user_id: int, message_id: int):
+        """Move the watermark up to message_id; it never moves backwards"""
+        async with db.transaction():
+            await db.execute("""
+                INSERT INTO read_watermarks (match_id, user_id, last_read_message_id)
+                VALUES (?, ?, ?)
+                ON CONFLICT (match_id, user_id) DO UPDATE SET
+                    last_read_message_id = excluded.last_read_message_id,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE excluded.last_read_message_id > read_watermarks.last_read_message_id
+            """, (match_id, user_id, message_id))
+            # Read up to the last message means nothing is unread; only a partial watermark needs a recount
+            if not await InboxService.clear_unread(match_id, user_id, message_id):
+                await InboxService.refresh_unread(match_id, user_id)
+
+    @staticmethod
+    async def latest_message_id(match_id: int) -> int:
+        row = await db.fetchone("SELECT MAX(id) AS id FROM messages WHERE match_id = ?", (match_id,))
+        return row["id"] or 0
+
+    @staticmethod
+    async def unread_count(match_id: int, user_id: int) -> int:
+        """Messages from the partner above the user's watermark"""
+        row = await db.fetchone("""
+            SELECT COUNT(*) AS count FROM messages
+            WHERE match_id = ?
+              AND id > COALESCE((SELECT last_read_message_id FROM read_watermarks
+                                 WHERE match_id = ? AND user_id = ?), 0)
+              AND sender_id != ?
+        """, (match_id, match_id, user_id, user_id))
+        return row["count"]
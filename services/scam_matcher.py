@@ -0,0 +1,79 @@
+import json
+import re
+from typing import Dict, Iterable, List, NamedTuple, Pattern, Tuple
+
+import ahocorasick
+
+from config.settings import settings
+
+# Every phone rule needs a digit, so text without one skips the regex
+_DIGIT = re.compile(r"\d")
+
+class ScamHit(NamedTuple):
+    category: str
+    term: str  # the keyword, or the name of the phone pattern
+    start: int
+    end: int
+
+class ScamCategory(NamedTuple):
+    score: int  # added once per distinct term hit
+    block: bool  # chat refuses messages with a hit
+
+class ScamMatcher:
+    """All anti-scam rules compiled into two scanners.
+
+    Keywords from every category go into one Aho-Corasick automaton run
+    over the lowercased text. Phone patterns overlap (a ten digit number
+    matches several), so each keeps its own compiled regex and reports
+    its hits separately; they only run on text containing a digit.
+    scan() returns every hit, overlapping ones included.
+    """
+
+    def __init__(self, rules: Dict):
+        self.categories: Dict[str, ScamCategory] = {}
+        self._automaton = ahocorasick.Automaton()
+        keyword_categories: Dict[str, List[str]] = {}
+        # (category, term, compiled pattern)
+        self._patterns: List[Tuple[str, str, Pattern]] = []
+
+        for name, rule in rules["categories"].items():
+            self.categories[name] = ScamCategory(int(rule.get("score", 0)), bool(rule.get("block", False)))
+            for keyword in rule.get("keywords", []):
+                keyword_categories.setdefault(keyword.lower(), []).append(name)
+            for term, pattern in rule.get("patterns", {}).items():
+                self._patterns.append((name, term, re.compile(pattern)))
+
+        for keyword, names in keyword_categories.items():
+            self._automaton.add_word(keyword, (keyword, tuple(names)))
+        if keyword_categories:
+            self._automaton.make_automaton()
+        self._has_keywords = bool(keyword_categories)
+
+    @classmethod
+    def from_file(cls, path: str) -> "ScamMatcher":
+        with open(path) as rules:
+            return cls(json.load(rules))
+
+    def scan(self, text: str) -> List[ScamHit]:
+        hits = []
+        if self._has_keywords:
+            for end, (keyword, names) in self._automaton.iter(text.lower()):
+                start = end - len(keyword) + 1
+                hits.extend(ScamHit(name, keyword, start, end + 1) for name in names)
+        if self._patterns and _DIGIT.search(text):
+            for name, term, pattern in self._patterns:
+                hits.extend(ScamHit(name, term, match.start(), match.end()) for match in pattern.finditer(text))
+        return hits
+
+    def is_blocked(self, hits: Iterable[ScamHit]) -> bool:
+        return any(self.categories[hit.category].block for hit in hits)
+
+    def score(self, hits: Iterable[ScamHit]) -> Tuple[int, List[str]]:
+        """(risk score, flags) with one flag per distinct category and term"""
+        seen = dict.fromkeys((hit.category, hit.term) for hit in hits)
+        risk_score = sum(self.categories[category].score for category, _ in seen)
+        flags = [f"{category}: {term}" for category, term in seen]
+        return risk_score, flags
+
+# Global instance, built once from the rule file
+scam_matcher = ScamMatcher.from_file(settings.ANTI_SCAM_RULES_PATH)
@@ -1,14 +1,52 @@
 import os
+import asyncio
+import time
 import aiohttp
 import json
+from collections import OrderedDict, defaultdict
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config.settings import settings
+from services.media_storage import is_content_hash
+
+PLACEHOLDER_URL = "https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink"
 
 class TelegramService:
     def __init__(self):
         self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.admin_chat_id = os.getenv('TELEGRAM_ADMIN_CHAT_ID', '@storagecat')
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self._session: Optional[aiohttp.ClientSession] = None
+        
+        # file_id -> (file_path, expires_at), least recently used first.
+        # Telegram keeps a getFile path valid for at least an hour.
+        self._file_paths: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._file_cache_size = settings.TELEGRAM_FILE_CACHE_SIZE
+        self._file_cache_ttl = settings.TELEGRAM_FILE_CACHE_TTL
+        # In-flight getFile calls, shared by concurrent callers
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.file_cache_hits = 0
+        self.file_cache_misses = 0
+        self.file_cache_coalesced = 0
+        self.file_lookup_errors = 0
+        self._resolve_semaphore: Optional[asyncio.Semaphore] = None
+        self._background: Set[asyncio.Task] = set()
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Long-lived session so connections to the Bot API are reused"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=settings.TELEGRAM_MAX_CONNECTIONS, ttl_dns_cache=300)
+            )
+        return self._session
+    
+    async def close(self):
+        for task in list(self._background):
+            task.cancel()
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
     
     async def send_report_notification(self, report_data: dict):
         """Send user report notification to admin"""
@@ -67,34 +105,155 @@ class TelegramService:
             'parse_mode': 'Markdown'
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as response:
-                if response.status != 200:
-                    raise Exception(f"Telegram API error: {response.status}")
-                return await response.json()
+        session = self._get_session()
+        async with session.post(url, json=payload) as response:
+            if response.status != 200:
+                raise Exception(f"Telegram API error: {response.status}")
+            return await response.json()
+    
+    def _cached_file_path(self, file_id: str) -> Optional[str]:
+        entry = self._file_paths.get(file_id)
+        if entry is None:
+            return None
+        file_path, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._file_paths[file_id]
+            return None
+        self._file_paths.move_to_end(file_id)
+        return file_path
+    
+    def _cache_file_path(self, file_id: str, file_path: str):
+        self._file_paths[file_id] = (file_path, time.monotonic() + self._file_cache_ttl)
+        self._file_paths.move_to_end(file_id)
+        while len(self._file_paths) > self._file_cache_size:
+            self._file_paths.popitem(last=False)
+    
+    async def _fetch_file_path(self, file_id: str) -> Optional[str]:
+        """One getFile call; None when Telegram does not know the file"""
+        print(f"[TelegramService] Getting file URL for: {file_id[:50]}...")
+        
+        url = f"{self.base_url}/getFile"
+        timeout = aiohttp.ClientTimeout(total=10)
+        
+        session = self._get_session()
+        async with session.get(url, params={'file_id': file_id}, timeout=timeout) as response:
+            if response.status == 200:
+                data = await response.json()
+                if data.get('ok'):
+                    file_path = data['result']['file_path']
+                    self._cache_file_path(file_id, file_path)
+                    return file_path
+        return None
+    
+    async def get_file_path(self, file_id: str) -> Optional[str]:
+        """Resolve a file_id to its Telegram file path, cached and single-flight"""
+        file_path = self._cached_file_path(file_id)
+        if file_path is not None:
+            self.file_cache_hits += 1
+            return file_path
+        
+        inflight = self._inflight.get(file_id)
+        if inflight is not None:
+            self.file_cache_coalesced += 1
+            # Shielded so one caller giving up does not cancel the others
+            return await asyncio.shield(inflight)
+        
+        self.file_cache_misses += 1
+        future = asyncio.ensure_future(self._fetch_file_path(file_id))
+        self._inflight[file_id] = future
+        future.add_done_callback(lambda _: self._inflight.pop(file_id, None))
+        return await asyncio.shield(future)
+    
+    async def _resolve_bounded(self, file_id: str) -> str:
+        if self._resolve_semaphore is None:
+            self._resolve_semaphore = asyncio.Semaphore(settings.IMAGE_URL_CONCURRENCY)
+        async with self._resolve_semaphore:
+            return await self.get_file_url(file_id)
+    
+    async def get_file_urls(self, file_ids: Iterable[str], deadline: float = None) -> Dict[str, str]:
+        """Resolve every file_id of a response concurrently.
+        
+        At most IMAGE_URL_CONCURRENCY lookups run at once and the batch waits
+        at most `deadline` seconds. Ids still pending then get the placeholder;
+        their lookups keep running in the background to warm the cache.
+        """
+        urls = {}
+        pending = {}
+        for file_id in file_ids:
+            if file_id in urls or file_id in pending:
+                continue
+            if not file_id or file_id.startswith('placeholder_'):
+                urls[file_id] = PLACEHOLDER_URL
+                continue
+            if settings.MEDIA_PROXY or is_content_hash(file_id):
+                # Served through /media, resolved only when first requested
+                urls[file_id] = self.media_url(file_id)
+                continue
+            file_path = self._cached_file_path(file_id)
+            if file_path is not None:
+                self.file_cache_hits += 1
+                urls[file_id] = self.file_url(file_path)
+                continue
+            pending[file_id] = asyncio.ensure_future(self._resolve_bounded(file_id))
+        
+        if not pending:
+            return urls
+        
+        deadline = settings.IMAGE_URL_DEADLINE if deadline is None else deadline
+        await asyncio.wait(pending.values(), timeout=deadline)
+        for file_id, task in pending.items():
+            if task.done() and not task.cancelled() and task.exception() is None:
+                urls[file_id] = task.result()
+            else:
+                urls[file_id] = PLACEHOLDER_URL
+                if not task.done():
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
+        return urls
+    
+    def file_url(self, file_path: str) -> str:
+        """Direct Bot API download URL; contains the bot token, keep server side"""
+        return f"https://api.telegram.org/file/bot{self.bot_token}/{file_path}"
+    
+    def media_url(self, file_id: str) -> str:
+        """Public URL of a file behind the /media proxy"""
+        return f"{settings.PUBLIC_BASE_URL}/media/{file_id}"
+    
+    async def iter_file(self, file_path: str, chunk_size: int = 64 * 1024):
+        """Stream a file's bytes from Telegram"""
+        timeout = aiohttp.ClientTimeout(total=60)
+        session = self._get_session()
+        async with session.get(self.file_url(file_path), timeout=timeout) as response:
+            if response.status != 200:
+                raise Exception(f"Telegram file download error: {response.status}")
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield chunk
     
     async def get_file_url(self, file_id: str) -> str:
         """Get file URL from Telegram"""
+        if settings.MEDIA_PROXY or is_content_hash(file_id):
+            return self.media_url(file_id)
         try:
-            print(f"[TelegramService] Getting file URL for: {file_id[:50]}...")
-            
-            url = f"{self.base_url}/getFile"
-            timeout = aiohttp.ClientTimeout(total=10)
-            
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(url, params={'file_id': file_id}) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get('ok'):
-                            file_path = data['result']['file_path']
-                            final_url = f"https://api.telegram.org/file/bot{self.bot_token}/{file_path}"
-                            print(f"[TelegramService] Got URL successfully")
-                            return final_url
+            file_path = await self.get_file_path(file_id)
+            if file_path is not None:
+                return self.file_url(file_path)
             
-            return "https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink"
+            return PLACEHOLDER_URL
         except Exception as e:
+            self.file_lookup_errors += 1
             print(f"[TelegramService] Network error, using placeholder: {e}")
-            return "https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink"
+            return PLACEHOLDER_URL
+    
+    def file_cache_stats(self) -> Dict:
+        lookups = self.file_cache_hits + self.file_cache_misses + self.file_cache_coalesced
+        return {
+            "size": len(self._file_paths),
+            "hits": self.file_cache_hits,
+            "misses": self.file_cache_misses,
+            "coalesced": self.file_cache_coalesced,
+            "errors": self.file_lookup_errors,
+            "hit_rate": round((self.file_cache_hits + self.file_cache_coalesced) / lookups, 3) if lookups else 0.0,
+        }
     
     async def upload_image_from_base64(self, base64_data: str) -> str:
         """Upload base64 image to Telegram and return file_id"""
@@ -117,23 +276,45 @@ class TelegramService:
             data.add_field('photo', io.BytesIO(image_bytes), filename='image.jpg')
             
             timeout = aiohttp.ClientTimeout(total=30)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(url, data=data) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        if result.get('ok'):
-                            photos = result['result']['photo']
-                            file_id = photos[-1]['file_id']
-                            print(f"[TelegramService] Upload successful: {file_id[:50]}...")
-                            return file_id
-                    
-                    response_text = await response.text()
-                    print(f"[TelegramService] Upload failed: {response.status} - {response_text}")
+            session = self._get_session()
+            async with session.post(url, data=data, timeout=timeout) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    if result.get('ok'):
+                        photos = result['result']['photo']
+                        file_id = photos[-1]['file_id']
+                        print(f"[TelegramService] Upload successful: {file_id[:50]}...")
+                        return file_id
+                
+                response_text = await response.text()
+                print(f"[TelegramService] Upload failed: {response.status} - {response_text}")
             
             raise Exception("Upload failed")
         except Exception as e:
             print(f"[TelegramService] Upload error: {e}")
             raise
+    
+    async def upload_document(self, content: bytes, filename: str) -> str:
+        """Upload bytes as a document (stored as-is, no Telegram recompression); returns file_id"""
+        if not self.bot_token:
+            raise Exception("TELEGRAM_BOT_TOKEN not set")
+        
+        url = f"{self.base_url}/sendDocument"
+        data = aiohttp.FormData()
+        data.add_field('chat_id', self.admin_chat_id)
+        data.add_field('disable_content_type_detection', 'true')
+        data.add_field('document', content, filename=filename)
+        
+        timeout = aiohttp.ClientTimeout(total=30)
+        session = self._get_session()
+        async with session.post(url, data=data, timeout=timeout) as response:
+            if response.status == 200:
+                result = await response.json()
+                if result.get('ok'):
+                    return result['result']['document']['file_id']
+            
+            response_text = await response.text()
+            raise Exception(f"Document upload failed: {response.status} - {response_text}")
 
 # Global instance
 telegram_service = TelegramService()
@@ -153,17 +334,43 @@ async def upload_image_to_telegram(image_data: str, is_base64: bool = True):
 async def get_image_url(file_id: str):
     """Helper function to get image URL"""
     try:
-        print(f"[get_image_url] Fetching URL for file_id: {file_id[:50]}...")
-        
         if file_id.startswith('placeholder_'):
-            print(f"[get_image_url] Placeholder detected, returning placeholder URL")
-            return "https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink"
+            return PLACEHOLDER_URL
         
-        url = await telegram_service.get_file_url(file_id)
-        print(f"[get_image_url] Got URL: {url[:80]}...")
-        return url
+        return await telegram_service.get_file_url(file_id)
     except Exception as e:
         print(f"[get_image_url] ERROR: {e}")
         import traceback
         traceback.print_exc()
-        return "https://via.placeholder.com/400x400/FF6B6B/FFFFFF?text=HeartLink"
+        return PLACEHOLDER_URL
+
+async def get_image_urls(file_ids: Iterable[str], deadline: float = None, variant: str = None) -> Dict[str, str]:
+    """Helper function to resolve all image URLs of a list response at once.
+    
+    With a variant ('avatar', 'card', 'full' or a '_blur' form) images that
+    went through the image pipeline are served at that size; older uploads
+    fall back to the original, or to the placeholder for blurred variants.
+    """
+    if not variant:
+        return await telegram_service.get_file_urls(file_ids, deadline)
+    
+    from services.image_pipeline import image_pipeline
+    file_ids = list(file_ids)
+    variants = await image_pipeline.variant_ids(file_ids, variant)
+    if variant.endswith('_blur'):
+        # Never fall back to the unblurred original
+        file_ids = [f for f in file_ids if f in variants]
+    urls = await telegram_service.get_file_urls((variants.get(f, f) for f in file_ids), deadline)
+    resolved = {file_id: urls[variants.get(file_id, file_id)] for file_id in file_ids}
+    return defaultdict(lambda: PLACEHOLDER_URL, resolved) if variant.endswith('_blur') else resolved
+
+def parse_image_ids(profile_images) -> List[str]:
+    """file_ids from a profile_images column (JSON text or an already parsed list)"""
+    if not profile_images:
+        return []
+    if isinstance(profile_images, str):
+        try:
+            profile_images = json.loads(profile_images)
+        except (ValueError, TypeError):
+            return []
+    return [file_id for file_id in profile_images if isinstance(file_id, str)]
@@ -0,0 +1,153 @@
+from typing import List, NamedTuple, Optional
+
+from fastapi import HTTPException, Request, status
+
+from config.settings import settings
+from services.media_cache import sniff_content_type
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:
+    from multipart.multipart import MultipartParser, parse_options_header
+
+class UploadedImage(NamedTuple):
+    field: str
+    filename: Optional[str]
+    content_type: str
+    data: bytes
+
+class _ImagePartCollector:
+    """MultipartParser callbacks that keep file parts as raw bytes.
+
+    Limits are checked as each chunk arrives; a violation is recorded and
+    raised by the caller, which then stops reading the request body.
+    """
+
+    def __init__(self, max_files: int, max_bytes: int):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.images: List[UploadedImage] = []
+        self.error: Optional[HTTPException] = None
+
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._part: Optional[dict] = None
+
+    def _fail(self, status_code: int, detail: str):
+        if self.error is None:
+            self.error = HTTPException(status_code=status_code, detail=detail)
+
+    def on_part_begin(self):
+        self._headers = {}
+        self._part = None
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_field.decode("latin-1").lower()] = self._header_value.decode("latin-1")
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, disposition = parse_options_header(self._headers.get("content-disposition", ""))
+        filename = disposition.get(b"filename")
+        if filename is None:
+            # Plain form field, ignored
+            return
+
+        content_type = self._headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type not in settings.ALLOWED_IMAGE_TYPES:
+            self._fail(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                       f"Unsupported image type: {content_type or 'unknown'}")
+            return
+        if len(self.images) >= self.max_files:
+            self._fail(status.HTTP_400_BAD_REQUEST, f"Maximum {self.max_files} images per upload")
+            return
+
+        self._part = {
+            "field": disposition.get(b"name", b"").decode("utf-8", "replace"),
+            "filename": filename.decode("utf-8", "replace"),
+            "content_type": content_type,
+            "data": bytearray(),
+        }
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._part is None or self.error:
+            return
+        buffer = self._part["data"]
+        if len(buffer) + (end - start) > self.max_bytes:
+            self._fail(413,
+                       f"Image exceeds {self.max_bytes // (1024 * 1024)}MB limit")
+            return
+        buffer += data[start:end]
+
+    def on_part_end(self):
+        if self._part is None or self.error:
+            return
+        data = bytes(self._part["data"])
+        # The declared type must match the actual bytes
+        if sniff_content_type(data[:16]) != self._part["content_type"]:
+            self._fail(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, "Image content does not match its type")
+            return
+        self.images.append(UploadedImage(self._part["field"], self._part["filename"], self._part["content_type"], data))
+        self._part = None
+
+async def read_image_uploads(request: Request, max_files: int = 1,
+                             max_bytes: int = None) -> List[UploadedImage]:
+    """Stream a multipart/form-data body and return its image file parts.
+
+    The body is parsed as it arrives, so an oversized or disallowed file is
+    rejected as soon as it is seen instead of after the whole request has been
+    buffered; accepted parts are kept as raw bytes (no base64, no spooling).
+    """
+    max_bytes = max_bytes or settings.MAX_FILE_SIZE
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail="Expected multipart/form-data")
+
+    # Small allowance for part headers and boundaries
+    body_limit = max_files * max_bytes + 64 * 1024
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > body_limit:
+        raise HTTPException(status_code=413,
+                            detail=f"Upload exceeds {body_limit // (1024 * 1024)}MB limit")
+
+    collector = _ImagePartCollector(max_files, max_bytes)
+    parser = MultipartParser(options[b"boundary"], {
+        "on_part_begin": collector.on_part_begin,
+        "on_part_data": collector.on_part_data,
+        "on_part_end": collector.on_part_end,
+        "on_header_field": collector.on_header_field,
+        "on_header_value": collector.on_header_value,
+        "on_header_end": collector.on_header_end,
+        "on_headers_finished": collector.on_headers_finished,
+    })
+
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > body_limit:
+            raise HTTPException(status_code=413,
+                                detail=f"Upload exceeds {body_limit // (1024 * 1024)}MB limit")
+        try:
+            parser.write(chunk)
+        except Exception:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed multipart body")
+        if collector.error:
+            raise collector.error
+    try:
+        parser.finalize()
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed multipart body")
+    if collector.error:
+        raise collector.error
+
+    if not collector.images:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No image file in upload")
+    return collector.images
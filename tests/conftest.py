@@ -0,0 +1,47 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app reads its settings at import, so point them at a scratch
+# directory before anything from the project is imported
+_scratch = tempfile.mkdtemp(prefix="heartlink-tests-")
+os.environ["DB_PATH"] = os.path.join(_scratch, "heartlink.db")
+os.environ["MEDIA_CACHE_DIR"] = os.path.join(_scratch, "media_cache")
+os.environ["MEDIA_STORAGE_DIR"] = os.path.join(_scratch, "media_storage")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def sql():
+    """Direct connection for arranging and checking rows"""
+    import sqlite3
+
+    conn = sqlite3.connect(os.environ["DB_PATH"], isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def register(client):
+    def register(name: str, age: int = 25):
+        response = client.post("/api/auth/register", json={
+            "name": name, "email": f"{name}@example.com", "password": "secret1",
+            "age": age, "interests": ["Music"]
+        })
+        assert response.status_code == 200, response.text
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+        return user_id, headers
+    return register
@@ -0,0 +1,24 @@
+def test_discover_advanced_reuses_stored_scores(client, sql, register):
+    viewer_id, viewer = register("carol")
+    stored_id, _ = register("dave")
+    missing_id, _ = register("erin")
+
+    # A score the recompute job keeps fresh, stored from the other direction
+    sql.execute("""
+        INSERT INTO compatibility_scores (user1_id, user2_id, overall_score)
+        VALUES (?, ?, 0.123)
+    """, (stored_id, viewer_id))
+
+    response = client.request("GET", "/api/users/discover-advanced", json={}, headers=viewer)
+    assert response.status_code == 200, response.text
+    scores = {user["id"]: user["compatibility_score"] for user in response.json()["users"]}
+
+    assert scores[stored_id] == 0.12
+    assert missing_id in scores
+    rows = sql.execute("""
+        SELECT user1_id, user2_id, overall_score FROM compatibility_scores
+        WHERE user1_id = ? OR user2_id = ?
+    """, (viewer_id, viewer_id)).fetchall()
+    pairs = {(row["user1_id"], row["user2_id"]): row["overall_score"] for row in rows}
+    assert pairs[(stored_id, viewer_id)] == 0.123
+    assert (viewer_id, missing_id) in pairs
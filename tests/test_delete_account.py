@@ -0,0 +1,41 @@
+def _count(sql, query, params):
+    return sql.execute(query, params).fetchone()[0]
+
+
+def test_delete_account_with_swipes_matches_and_messages(client, sql, register):
+    alice_id, alice = register("alice")
+    bob_id, bob = register("bob")
+
+    client.post("/api/matches/swipe", json={"swiped_user_id": bob_id, "is_like": True}, headers=alice)
+    response = client.post("/api/matches/swipe", json={"swiped_user_id": alice_id, "is_like": True}, headers=bob)
+    match_id = response.json()["match_id"]
+    assert match_id
+
+    for headers, content in ((alice, "hi bob"), (bob, "hi alice")):
+        response = client.post(f"/api/chat/{match_id}/messages",
+                               json={"match_id": match_id, "content": content, "message_type": "text"},
+                               headers=headers)
+        assert response.status_code == 200, response.text
+    # Reading the conversation leaves a read watermark for each side
+    client.get(f"/api/chat/{match_id}/messages", headers=alice)
+    client.get(f"/api/chat/{match_id}/messages", headers=bob)
+    assert _count(sql, "SELECT COUNT(*) FROM read_watermarks WHERE match_id = ?", (match_id,)) == 2
+
+    # A push still waiting in the outbox for the deleted user
+    sql.execute("""
+        INSERT INTO notification_outbox (user_id, collapse_key, title, body, next_attempt_at)
+        VALUES (?, ?, 'title', 'body', datetime('now', '+1 hour'))
+    """, (alice_id, f"message:{match_id}"))
+
+    response = client.delete("/api/users/account", headers=alice)
+    assert response.status_code == 200, response.text
+
+    assert _count(sql, "SELECT COUNT(*) FROM users WHERE id = ?", (alice_id,)) == 0
+    assert _count(sql, "SELECT COUNT(*) FROM swipes WHERE swiper_id = ? OR swiped_id = ?", (alice_id, alice_id)) == 0
+    assert _count(sql, "SELECT COUNT(*) FROM matches WHERE id = ?", (match_id,)) == 0
+    # The partner's messages, watermark and inbox row go with the match
+    assert _count(sql, "SELECT COUNT(*) FROM messages WHERE match_id = ?", (match_id,)) == 0
+    assert _count(sql, "SELECT COUNT(*) FROM read_watermarks WHERE match_id = ?", (match_id,)) == 0
+    assert _count(sql, "SELECT COUNT(*) FROM inbox_entries WHERE match_id = ?", (match_id,)) == 0
+    assert _count(sql, "SELECT COUNT(*) FROM notification_outbox WHERE user_id = ?", (alice_id,)) == 0
+    assert _count(sql, "SELECT COUNT(*) FROM users WHERE id = ?", (bob_id,)) == 1
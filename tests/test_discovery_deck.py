@@ -0,0 +1,41 @@
+import time
+
+
+def _discover(client, headers):
+    response = client.get("/api/users/discover", params={"limit": 50}, headers=headers)
+    assert response.status_code == 200, response.text
+    return {user["id"] for user in response.json()["users"]}
+
+
+def test_deck_applies_viewer_age_preferences(client, sql, register):
+    viewer_id, viewer = register("heidi", age=40)
+    young_id, _ = register("ivan", age=22)
+    older_id, _ = register("judy", age=38)
+
+    response = client.put("/api/users/profile", json={"preferences": {"min_age": 30}}, headers=viewer)
+    assert response.status_code == 200, response.text
+
+    served = _discover(client, viewer)
+    assert older_id in served
+    assert young_id not in served
+
+
+def test_deck_is_rebuilt_when_preferences_change(client, sql, register):
+    viewer_id, viewer = register("kim", age=30)
+    young_id, _ = register("leo", age=21)
+    sql.execute("UPDATE users SET last_active = datetime('now', '-1 day') WHERE id != ?", (young_id,))
+
+    # Fill the deck, then narrow the preferences before the young card is served
+    client.get("/api/users/discover", params={"limit": 1}, headers=viewer)
+    response = client.put("/api/users/profile", json={"preferences": {"min_age": 29}}, headers=viewer)
+    assert response.status_code == 200, response.text
+
+    # The deck reset runs on the event bus after the response
+    for _ in range(50):
+        if not sql.execute(
+            "SELECT 1 FROM discovery_decks WHERE user_id = ? AND served_at IS NULL", (viewer_id,)
+        ).fetchone():
+            break
+        time.sleep(0.02)
+
+    assert young_id not in _discover(client, viewer)
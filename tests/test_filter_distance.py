@@ -0,0 +1,17 @@
+from services.geo_index import haversine_km
+
+
+def test_discover_advanced_returns_real_distance_without_distance_filter(client, sql, register):
+    viewer_id, viewer = register("frank")
+    other_id, _ = register("grace")
+    for user_id, latitude, longitude in ((viewer_id, 12.9716, 77.5946), (other_id, 13.0827, 80.2707)):
+        sql.execute("""
+            UPDATE users SET latitude = ?, longitude = ?, gps_updated_at = CURRENT_TIMESTAMP WHERE id = ?
+        """, (latitude, longitude, user_id))
+
+    response = client.request("GET", "/api/users/discover-advanced", json={}, headers=viewer)
+    assert response.status_code == 200, response.text
+    distances = {user["id"]: user["distance_km"] for user in response.json()["users"]}
+
+    expected = round(haversine_km(12.9716, 77.5946, 13.0827, 80.2707), 2)
+    assert distances[other_id] == expected
@@ -0,0 +1,25 @@
+import asyncio
+
+import pytest
+from starlette.background import BackgroundTask
+
+
+@pytest.mark.parametrize("status_code", [304, 416])
+def test_bodyless_responses_release_when_the_send_fails(status_code):
+    from routes.media import ReleasingResponse
+
+    released = []
+
+    async def release():
+        released.append(True)
+
+    async def send(message):
+        raise OSError("client went away")
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    response = ReleasingResponse(status_code=status_code, background=BackgroundTask(release))
+    with pytest.raises(OSError):
+        asyncio.run(response({"type": "http"}, receive, send))
+    assert released == [True]
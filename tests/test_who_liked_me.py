@@ -0,0 +1,15 @@
+def test_count_is_every_liker_on_every_page(client, register):
+    viewer_id, viewer = register("wendy")
+    for name in ("liam", "lena", "luca"):
+        _, headers = register(name)
+        client.post("/api/matches/swipe", json={"swiped_user_id": viewer_id, "is_like": True}, headers=headers)
+
+    first = client.get("/api/matches/who-liked-me", params={"limit": 2}, headers=viewer).json()
+    assert first["count"] == 3
+    assert len(first["users"]) == 2
+    assert first["next_cursor"]
+
+    second = client.get("/api/matches/who-liked-me",
+                        params={"limit": 2, "cursor": first["next_cursor"]}, headers=viewer).json()
+    assert second["count"] == 3
+    assert len(second["users"]) == 1